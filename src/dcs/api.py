@@ -1,33 +1,413 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Annotated, Any
 
-app = FastAPI(title="👀 Dienstencatalogus Search API", version="0.1.0")
+from elasticsearch import NotFoundError
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import State
 
+from dcs.lexicalsearch.backend import memory_index_path
+from dcs.lexicalsearch.cache import MemoryBackend, SearchCache, cache_key
+from dcs.lexicalsearch.es_client import get_async_client
+from dcs.lexicalsearch.memory import InMemoryIndex
+from dcs.lexicalsearch.pagination import InvalidCursorError, async_search_page
+from dcs.lexicalsearch.personalization import async_profile_synced
+from dcs.lexicalsearch.rerank import (
+    RerankWeights,
+    async_rerank_search,
+    single_stage,
+    wants_rerank,
+)
+from dcs.lexicalsearch.search import (
+    SEARCH_SECONDS,
+    SearchParams,
+    async_msearch_diensten,
+    async_search_diensten,
+    async_search_facets,
+)
+from dcs.lexicalsearch.suggest import (
+    SUGGEST_SIZE,
+    SuggestStore,
+    async_suggest_es,
+    suggest_path,
+)
+from dcs.models.search import BatchSearchRequest, SearchRequest, VerenigingProfile
+from dcs.semanticsearch.embed import load_embedder
+from dcs.semanticsearch.hybrid import async_hybrid_search, wants_hybrid
+from dcs.utils.config import (
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL,
+    HYBRID_WINDOW,
+    RERANK_K,
+    RERANK_LEXICAL_WEIGHT,
+    RERANK_TIER_WEIGHT,
+    RRF_RANK_CONSTANT,
+    SEARCH_BACKEND,
+    SEARCH_INDEX,
+    SUGGEST_BACKEND,
+    TIERS_INDEX,
+)
+from dcs.utils.metrics import CONTENT_TYPE, REGISTRY
 
-class VerenigingProfile(BaseModel):
-    """Profile for a Vereniging (Association) in the Dienstencatalogus."""
+__all__ = ["BatchSearchRequest", "SearchRequest", "VerenigingProfile", "app"]
 
-    gemeente: str | None = None
-    regio: str | None = None
-    doelgroep: list[str] | None = []
-    sector: str | None = None
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create one pooled Elasticsearch client per worker and close it on exit.
 
-class SearchRequest(BaseModel):
-    """Request model for searching the Dienstencatalogus."""
+    With the memory backend the persisted in-process index is loaded instead
+    and Elasticsearch is never contacted. The embedding model for hybrid
+    search is loaded when the index was built with one.
+    """
+    memory = SEARCH_BACKEND == "memory"
+    app.state.es = None if memory else get_async_client()
+    app.state.memory = (
+        InMemoryIndex.load(memory_index_path(SEARCH_INDEX)) if memory else None
+    )
+    app.state.embedder = None if memory else load_embedder()
+    app.state.suggest = SuggestStore(suggest_path(SEARCH_INDEX))
+    app.state.cache = SearchCache(
+        MemoryBackend(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+    )
+    # Facets only depend on the filter set, so they get their own cache
+    app.state.facet_cache = SearchCache(
+        MemoryBackend(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
+    )
+    try:
+        yield
+    finally:
+        if app.state.es is not None:
+            await app.state.es.close()
 
-    query: str | None = None
-    filters: dict[str, object] | None = {}
-    profile: VerenigingProfile | None = None
-    sort: str | None = "relevance"  # or "date"
-    page: int | None = 1
-    size: int | None = 10
+
+app = FastAPI(
+    title="👀 Dienstencatalogus Search API", version="0.1.0", lifespan=lifespan
+)
+
+
+def format_response(
+    result: dict[str, Any],
+    request: SearchRequest,
+    facets: dict[str, Any] | None = None,
+) -> dict[str, object]:
+    """Reshape an Elasticsearch response into the public API response.
+
+    Facet buckets are read from `facets` when given, else from `result`.
+    """
+    with SEARCH_SECONDS.time(request="api", stage="serialize"):
+        return _format_response(result, request, facets)
+
+
+def _format_response(
+    result: dict[str, Any],
+    request: SearchRequest,
+    facets: dict[str, Any] | None = None,
+) -> dict[str, object]:
+    aggregations = (facets or result).get("aggregations", {})
+    response: dict[str, object] = {
+        "total": result["hits"]["total"]["value"],
+        "page": None if request.uses_cursor else request.page,
+        "size": request.size,
+        "took": result.get("took"),
+        "results": [
+            {**hit["_source"], "score": hit.get("_score")}
+            for hit in result["hits"]["hits"]
+        ],
+        "facets": {
+            name: [
+                {"key": bucket["key"], "count": bucket["doc_count"]}
+                for bucket in agg["buckets"]
+            ]
+            for name, agg in aggregations.items()
+        },
+    }
+    if request.uses_cursor:
+        response["next_cursor"] = result.get("next_cursor")
+    if "phase" in result:
+        response["phase"] = result["phase"]
+    return response
+
+
+async def generation(state: State, cache: SearchCache, ix: str) -> str | None:
+    """Return the index generation; the in-process index never changes."""
+    if state.memory is not None:
+        return None
+    return await cache.generation(state.es, ix)
+
+
+async def run_search(
+    state: State, ix: str, params: SearchParams, mode: str = "lexical"
+) -> dict[str, Any]:
+    """Search the configured backend, hybrid or in two stages when asked."""
+    if state.memory is not None:
+        return state.memory.search(**params)  # type: ignore[no-any-return]
+    if wants_hybrid(params, mode):
+        return await async_hybrid_search(
+            state.es,
+            state.embedder,
+            ix,
+            HYBRID_WINDOW,
+            RRF_RANK_CONSTANT,
+            **params,
+        )
+    if wants_rerank(params):
+        weights = RerankWeights(tier=RERANK_TIER_WEIGHT, lexical=RERANK_LEXICAL_WEIGHT)
+        return await async_rerank_search(state.es, ix, RERANK_K, weights, **params)
+    return await async_search_diensten(state.es, ix=ix, **single_stage(params))
+
+
+async def run_facets(  # noqa: PLR0913
+    state: State,
+    ix: str,
+    query: str | None,
+    themas: list[str] | None,
+    gemeente: str | None,
+    matching: str,
+) -> dict[str, Any]:
+    """Compute facets on the configured backend."""
+    if state.memory is not None:
+        return state.memory.search(  # type: ignore[no-any-return]
+            query=query, themas=themas, gemeente=gemeente, size=0
+        )
+    return await async_search_facets(state.es, ix, query, themas, gemeente, matching)
+
+
+async def run_msearch(
+    state: State, ix: str, searches: list[SearchParams]
+) -> list[dict[str, Any]]:
+    """Run several searches on the configured backend."""
+    if state.memory is not None:
+        return state.memory.msearch(searches)  # type: ignore[no-any-return]
+    return await async_msearch_diensten(
+        state.es, ix, [single_stage(params) for params in searches]
+    )
+
+
+async def cached_search(
+    state: State, ix: str, params: SearchParams, mode: str = "lexical"
+) -> dict[str, Any]:
+    """Search through the result cache of this worker."""
+    cache: SearchCache = state.cache
+    key = cache_key(
+        {"ix": ix, "mode": mode, **params}, await generation(state, cache, ix)
+    )
+    return await cache.get_or_fetch(key, lambda: run_search(state, ix, params, mode))
+
+
+async def cached_facets(
+    state: State, ix: str, params: SearchParams, phase: str | None = None
+) -> dict[str, Any]:
+    """Compute facets through the facet cache of this worker.
+
+    The key only holds the query, filters and matching, so every page, sort
+    order and profile of the same filter set shares one entry. `phase` is
+    the matching an adaptive search was answered with.
+    """
+    cache: SearchCache = state.facet_cache
+    query = params.get("query")
+    themas = params.get("themas")
+    gemeente = params.get("gemeente")
+    matching = phase or params.get("matching", "fuzzy")
+    key = cache_key(
+        {
+            "ix": ix,
+            "query": query,
+            "themas": themas,
+            "gemeente": gemeente,
+            "matching": matching,
+        },
+        await generation(state, cache, ix),
+    )
+    return await cache.get_or_fetch(
+        key, lambda: run_facets(state, ix, query, themas, gemeente, matching)
+    )
+
+
+def check_hybrid(state: State, request: SearchRequest) -> None:
+    """Reject a hybrid search the configured backend cannot answer."""
+    if state.memory is not None:
+        raise HTTPException(status_code=400, detail="Hybrid search needs Elasticsearch")
+    if request.uses_cursor:
+        raise HTTPException(
+            status_code=400, detail="Cursor pagination is not supported for hybrid"
+        )
+    if state.embedder is None:
+        raise HTTPException(
+            status_code=503, detail="No embedding model; index with --embed first"
+        )
+
+
+async def check_profile(state: State, profile_id: str) -> None:
+    """Reject a profile id whose tiers were never synced.
+
+    Its lookups would match nothing and silently score every product at the
+    `none` tier. A newly registered profile needs `dcs profiles sync` first.
+    """
+    if not await async_profile_synced(state.es, profile_id, TIERS_INDEX):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown profile: {profile_id}; run `dcs profiles sync`",
+        )
 
 
 @app.post("/search")
-def search(request: SearchRequest) -> dict[str, object]:
-    """Handle search requests."""
+async def search(request: SearchRequest, http_request: Request) -> dict[str, object]:
+    """Handle search requests.
+
+    Hits and facets are fetched concurrently and cached separately, so
+    paging through a result set only costs a hits request. Cursor pages are
+    read from a point in time and bypass the result cache. Hybrid searches
+    get the facets of their lexical matches. Adaptive searches fetch facets
+    after the hits, for the phase that answered them.
+    """
+    state = http_request.app.state
+    if request.uses_cursor and state.memory is not None:
+        raise HTTPException(
+            status_code=400, detail="Cursor pagination needs Elasticsearch"
+        )
+    if request.profile_id and state.memory is not None:
+        raise HTTPException(
+            status_code=400, detail="Registered profiles need Elasticsearch"
+        )
+    if request.mode == "hybrid":
+        check_hybrid(state, request)
+    if request.profile_id:
+        await check_profile(state, request.profile_id)
+    params: SearchParams = {**request.to_search_kwargs(), "facets": False}
+    hits = (
+        async_search_page(
+            state.es, SEARCH_INDEX, request.cursor, **single_stage(params)
+        )
+        if request.uses_cursor
+        else cached_search(state, SEARCH_INDEX, params, request.mode)
+    )
+    try:
+        if not request.facets:
+            return format_response(await hits, request)
+        if request.matching == "adaptive" and not request.uses_cursor:
+            result = await hits
+            facets = await cached_facets(
+                state, SEARCH_INDEX, params, result.get("phase")
+            )
+        else:
+            result, facets = await asyncio.gather(
+                hits, cached_facets(state, SEARCH_INDEX, params)
+            )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except NotFoundError as e:
+        if not request.uses_cursor:
+            raise
+        raise HTTPException(status_code=410, detail="Cursor expired") from e
+    return format_response(result, request, facets)
+
+
+def format_error(item: dict[str, Any]) -> dict[str, object]:
+    """Reshape a failed `_msearch` item into the public error format."""
+    error = item.get("error", {})
+    return {
+        "error": {
+            "status": item.get("status", 500),
+            "type": error.get("type"),
+            "reason": error.get("reason"),
+        }
+    }
+
+
+@app.post("/search/batch")
+async def search_batch(
+    batch: BatchSearchRequest, http_request: Request
+) -> dict[str, list[dict[str, object]]]:
+    """Handle several searches with a single `_msearch` round trip.
+
+    Responses are returned in request order. Searches already in the result
+    cache are answered from it; a failed search yields an `error` item and
+    does not affect the others. Cursor pagination and hybrid search are not
+    supported here; an unknown profile id rejects the whole batch.
+    """
+    if any(request.uses_cursor for request in batch.searches):
+        raise HTTPException(
+            status_code=400, detail="Cursor pagination is not supported in a batch"
+        )
+    if any(request.mode == "hybrid" for request in batch.searches):
+        raise HTTPException(
+            status_code=400, detail="Hybrid search is not supported in a batch"
+        )
+    state = http_request.app.state
+    profile_ids = {r.profile_id for r in batch.searches if r.profile_id}
+    if profile_ids and state.memory is not None:
+        raise HTTPException(
+            status_code=400, detail="Registered profiles need Elasticsearch"
+        )
+    await asyncio.gather(*(check_profile(state, pid) for pid in sorted(profile_ids)))
+    cache: SearchCache = state.cache
+    current = await generation(state, cache, SEARCH_INDEX)
+
+    searches: list[SearchParams] = [
+        {**request.to_search_kwargs(), "facets": request.facets}
+        for request in batch.searches
+    ]
+    keys = [cache_key({"ix": SEARCH_INDEX, **p}, current) for p in searches]
+    results = [await cache.get(key) for key in keys]
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    fetched = await run_msearch(state, SEARCH_INDEX, [searches[i] for i in misses])
+    fetched_by_index = dict(zip(misses, fetched, strict=True))
+    for i, item in fetched_by_index.items():
+        if "error" not in item:
+            await cache.set(keys[i], item)
+
+    responses = []
+    for i, request in enumerate(batch.searches):
+        result = results[i] or fetched_by_index[i]
+        responses.append(
+            format_error(result)
+            if "error" in result
+            else format_response(result, request)
+        )
+    return {"responses": responses}
+
+
+@app.get("/suggest")
+async def suggest(
+    http_request: Request,
+    q: Annotated[str, Query(max_length=100, description="Wat er al getypt is")],
+    size: Annotated[int, Query(ge=1, le=50)] = SUGGEST_SIZE,
+) -> dict[str, object]:
+    """Suggest product names and themes for a partially typed query.
+
+    Answered from the in-process prefix index built at index time, without
+    a round trip; with `DCS_SUGGEST_BACKEND=elasticsearch` names come from
+    the `naam.suggest` field instead.
+    """
+    state = http_request.app.state
+    if SUGGEST_BACKEND == "elasticsearch" and state.es is not None:
+        suggestions = await async_suggest_es(state.es, SEARCH_INDEX, q, size)
+        return {"query": q, "suggestions": suggestions}
+    index = state.suggest.current()
+    if index is None:
+        raise HTTPException(
+            status_code=503, detail="No suggestions; index the products first"
+        )
+    with SEARCH_SECONDS.time(request="suggest", stage="lookup"):
+        suggestions = index.suggest(q, size)
+    return {"query": q, "suggestions": suggestions}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Expose the metrics of this worker in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/cache/stats")
+async def cache_stats(http_request: Request) -> dict[str, dict[str, int]]:
+    """Return hit, miss, coalesced and invalidation counters of the caches."""
+    state = http_request.app.state
     return {
-        "message": "Search endpoint is live",
-        "received": request.model_dump(),
+        "results": state.cache.stats_dict(),
+        "facets": state.facet_cache.stats_dict(),
     }
@@ -0,0 +1,177 @@
+import json
+import random
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from dcs.ingest.cleaner import clean_item
+from dcs.models.product import Product
+
+THEMAS = [
+    "Cultuur, Sport en Vrije Tijd",
+    "Economie en Werk",
+    "Technologie en Wetenschap",
+    "Welzijn en Gezondheid",
+    "Onderwijs en Vorming",
+]
+REGIOS = ["Leuven", "Gent", "Antwerpen", "Vlaams-Brabant", "Vlaanderen"]
+TYPES = ["Subsidie", "Advies", "Materiaal", "Financieel voordeel", "Toelating"]
+WORDS = [
+    "vereniging",
+    "subsidie",
+    "aanvraag",
+    "vergunning",
+    "evenement",
+    "sport",
+    "jeugd",
+    "cultuur",
+    "erkenning",
+    "werking",
+    "vrijwilligers",
+    "infrastructuur",
+    "zaal",
+    "materiaal",
+    "uitleendienst",
+    "premie",
+    "kamp",
+    "speelplein",
+    "muziek",
+    "erfgoed",
+    "welzijn",
+    "senioren",
+    "gemeente",
+    "provincie",
+    "organisatie",
+    "activiteit",
+    "ondersteuning",
+    "verzekering",
+    "lokaal",
+    "project",
+]
+VORMEN = ["VZW", "Feitelijke vereniging", "Stichting"]
+NAMEN = ["L.M.A.C.", "Jeugdhuis De Kelder", "Harmonie Sint-Cecilia", "KSA Leuven"]
+
+# Change dates of the catalogue run back this many days from NEWEST
+NEWEST = datetime(2025, 5, 1, 12, tzinfo=UTC)
+SPAN_DAYS = 1500
+# Share of descriptions with markup the fast `strip_html` path hands over to
+# BeautifulSoup, like comments and stray angle brackets in the CMS
+IRREGULAR_SHARE = 0.03
+
+
+def _sentence(rng: random.Random, lo: int = 6, hi: int = 14) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(lo, hi))).capitalize()
+
+
+def _inline(rng: random.Random) -> str:
+    """Return a sentence with some inline markup and character references."""
+    words = _sentence(rng).split()
+    at = rng.randrange(len(words))
+    kind = rng.random()
+    if kind < 0.3:  # noqa: PLR2004
+        words[at] = f"<strong>{words[at]}</strong>"
+    elif kind < 0.5:  # noqa: PLR2004
+        words[at] = f"<em>{words[at]}</em>"
+    elif kind < 0.7:  # noqa: PLR2004
+        words[at] = f'<a href="https://www.vlaanderen.be/{words[at]}">{words[at]}</a>'
+    elif kind < 0.85:  # noqa: PLR2004
+        words.insert(at, "&amp;")
+    else:
+        words.insert(at, "categorie&euml;n&nbsp;en")
+    return " ".join(words) + "."
+
+
+def _omschrijving(rng: random.Random) -> str:
+    """Return an HTML description shaped like the ones in the catalogue."""
+    blocks = []
+    if rng.random() < 0.3:  # noqa: PLR2004
+        blocks.append(f"<h3>{_sentence(rng, 2, 4)}</h3>")
+    blocks.extend(
+        f"<p>{' '.join(_inline(rng) for _ in range(rng.randint(1, 3)))}</p>"
+        for _ in range(rng.randint(1, 4))
+    )
+    if rng.random() < 0.5:  # noqa: PLR2004
+        items = "".join(f"<li>{_inline(rng)}</li>" for _ in range(rng.randint(2, 6)))
+        blocks.append(f"<ul>{items}</ul>")
+    if rng.random() < IRREGULAR_SHARE:
+        blocks.insert(0, rng.choice(["<!-- intern -->", "<p>Leeftijd < 18 jaar</p>"]))
+    return "".join(blocks)
+
+
+def synthetic_record(i: int, seed: int = 0) -> dict[str, Any]:
+    """Build raw record `i`, shaped like the Dienstencatalogus API output.
+
+    Each record has its own generator, derived from the seed and `i`, so a
+    record is the same whatever the size of the catalogue it is part of.
+    """
+    rng = random.Random(f"{seed}:{i}")  # noqa: S311
+    changed = NEWEST - timedelta(
+        days=rng.randint(0, SPAN_DAYS), seconds=rng.randint(0, 86_399)
+    )
+    return {
+        "product": {
+            "id": f"synthetic-{i}",
+            "naam": _sentence(rng, 2, 6),
+            "type": rng.choice(TYPES),
+            "omschrijving": _omschrijving(rng),
+            "themas": {
+                "elementen": [
+                    {"naam": t} for t in rng.sample(THEMAS, rng.randint(0, 3))
+                ]
+            },
+            "ipdcProduct": {
+                "geografischeToepassingsgebieden": {
+                    "elementen": [
+                        {"label": r} for r in rng.sample(REGIOS, rng.randint(0, 2))
+                    ]
+                }
+            },
+            "metadata": {"laatsteWijzigingsdatum": changed.isoformat()},
+        }
+    }
+
+
+def iter_synthetic_records(n: int, seed: int = 0) -> Iterator[dict[str, Any]]:
+    """Yield `n` raw records; the catalogue is never held in memory."""
+    for i in range(n):
+        yield synthetic_record(i, seed)
+
+
+def synthetic_records(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Build `n` raw records shaped like the Dienstencatalogus API output."""
+    return list(iter_synthetic_records(n, seed))
+
+
+def write_catalogue(path: Path, n: int, seed: int = 0) -> int:
+    """Write `n` raw records as a JSON array, like `fetch` does."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        f.write("[")
+        for i, record in enumerate(iter_synthetic_records(n, seed)):
+            f.write(",\n" if i else "\n")
+            json.dump(record, f, ensure_ascii=False)
+        f.write("\n]" if n else "]")
+    return n
+
+
+def synthetic_products(n: int, seed: int = 0) -> list[Product]:
+    """Clean `n` synthetic records into products, as `clean --seed` does."""
+    return [
+        clean_item(record, i, random.Random(f"{seed}:{i}"))  # noqa: S311
+        for i, record in enumerate(iter_synthetic_records(n, seed))
+    ]
+
+
+def synthetic_profiles(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Build `n` random vereniging profiles."""
+    rng = random.Random(seed)  # noqa: S311
+    return [
+        {
+            "werkingsgebieden": rng.sample(REGIOS, rng.randint(0, 2)),
+            "type_vereniging": rng.sample(VORMEN, rng.randint(0, 1)),
+            "hoofdactiviteiten": rng.sample(THEMAS, rng.randint(0, 2)),
+            "namen": {"nl": rng.choice(NAMEN)} if rng.random() < 0.5 else {},  # noqa: PLR2004
+        }
+        for _ in range(n)
+    ]
@@ -0,0 +1,105 @@
+import random
+import time
+from collections import defaultdict
+from typing import Any
+
+import numpy as np
+
+from dcs.bench.catalogue import REGIOS, THEMAS, WORDS, synthetic_profiles
+from dcs.lexicalsearch.backend import SearchBackend
+from dcs.lexicalsearch.search import SearchParams
+
+# Share of each kind of search in the mix, roughly as the loket sends them
+MIX = {
+    "browse": 0.2,
+    "term": 0.25,
+    "multi": 0.15,
+    "filtered": 0.15,
+    "date": 0.1,
+    "profile": 0.1,
+    "rerank": 0.05,
+}
+# First searches of each kind that warm up caches and are not timed
+WARMUP = 5
+
+
+def _words(rng: random.Random, lo: int, hi: int) -> str:
+    return " ".join(rng.sample(WORDS, rng.randint(lo, hi)))
+
+
+def search_params(kind: str, rng: random.Random) -> SearchParams:
+    """Build the parameters of one search of `kind` in the mix."""
+    if kind == "browse":
+        return {"facets": True}
+    if kind == "term":
+        return {"query": _words(rng, 1, 1), "sort_by": "relevance"}
+    if kind == "multi":
+        return {
+            "query": _words(rng, 2, 3),
+            "sort_by": "relevance",
+            "matching": "adaptive",
+        }
+    if kind == "filtered":
+        return {
+            "query": _words(rng, 1, 2),
+            "themas": rng.sample(THEMAS, 1),
+            "gemeente": rng.choice(REGIOS),
+            "sort_by": "relevance",
+        }
+    if kind == "date":
+        return {
+            "themas": rng.sample(THEMAS, 1) if rng.random() < 0.5 else None,  # noqa: PLR2004
+            "sort_by": "laatste_wijzigingsdatum",
+            "sort_order": "desc",
+            "facets": False,
+        }
+    # A profile search, scored in Elasticsearch or re-ranked afterwards
+    (profile,) = synthetic_profiles(1, rng.randrange(2**32))
+    return {
+        "query": _words(rng, 1, 1) if rng.random() < 0.5 else None,  # noqa: PLR2004
+        "sort_by": "relevance",
+        "vereniging_profile": profile,
+        "personalization": "rerank" if kind == "rerank" else "script",
+    }
+
+
+def search_mix(n: int, seed: int = 0) -> list[tuple[str, SearchParams]]:
+    """Draw `n` searches from `MIX`, each labelled with its kind."""
+    rng = random.Random(seed)  # noqa: S311
+    kinds = rng.choices(list(MIX), weights=list(MIX.values()), k=n)
+    return [(kind, search_params(kind, rng)) for kind in kinds]
+
+
+def _percentiles(kind: str, millis: list[float]) -> dict[str, Any]:
+    return {
+        "kind": kind,
+        "searches": len(millis),
+        "p50_ms": round(float(np.percentile(millis, 50)), 3),
+        "p95_ms": round(float(np.percentile(millis, 95)), 3),
+        "p99_ms": round(float(np.percentile(millis, 99)), 3),
+    }
+
+
+def search_latency(
+    backend: SearchBackend, mix: list[tuple[str, SearchParams]]
+) -> list[dict[str, Any]]:
+    """Run the mix on `backend` and report latency percentiles per kind.
+
+    Latency is wall time as the API sees it, including the round trip to
+    Elasticsearch. The last row covers every search of the mix.
+    """
+    warmed: defaultdict[str, int] = defaultdict(int)
+    millis: defaultdict[str, list[float]] = defaultdict(list)
+    for kind, params in mix:
+        start = time.perf_counter()
+        backend.search(**params)
+        elapsed = (time.perf_counter() - start) * 1000
+        if warmed[kind] < WARMUP:
+            warmed[kind] += 1
+            continue
+        millis[kind].append(elapsed)
+    rows = [_percentiles(kind, millis[kind]) for kind in MIX if millis[kind]]
+    everything = [ms for kind in MIX for ms in millis[kind]]
+    if everything:
+        rows.append(_percentiles("all", everything))
+    return rows
@@ -0,0 +1,69 @@
+import random
+import statistics
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from dcs.bench.catalogue import synthetic_records
+from dcs.bench.latency import search_mix
+from dcs.ingest.cleaner import clean_item, compute_match
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.lexicalsearch.rerank import single_stage
+from dcs.lexicalsearch.search import build_search_body
+from dcs.utils.string_utils import strip_html, strip_html_soup
+
+
+def time_calls(
+    fn: Callable[[Any], object], inputs: Sequence[Any], repeat: int
+) -> dict[str, float]:
+    """Call `fn` on every input, `repeat` times, and report per-call cost.
+
+    The median round is reported, which is stable against a noisy machine;
+    the fastest round is what the code costs without interference.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        rounds.append((time.perf_counter() - start) / len(inputs))
+    median = statistics.median(rounds)
+    return {
+        "median_us": round(median * 1e6, 3),
+        "min_us": round(min(rounds) * 1e6, 3),
+        "ops_per_s": round(1 / median),
+    }
+
+
+def run_micro(records: int, seed: int = 0, repeat: int = 5) -> list[dict[str, Any]]:
+    """Time the per-record and per-search building blocks of ingest and search.
+
+    Inputs are `records` synthetic records and as many searches of the
+    latency mix; each function is timed on the inputs it sees in production.
+    """
+    raw = synthetic_records(records, seed)
+    texts = [r["product"]["omschrijving"] for r in raw]
+    products = [
+        clean_item(r, i, random.Random(f"{seed}:{i}"))  # noqa: S311
+        for i, r in enumerate(raw)
+    ]
+    voorwaarden = [p.voorwaarden for p in products]
+    searches = [single_stage(params) for _, params in search_mix(records, seed)]
+    rng = random.Random(seed)  # noqa: S311
+
+    cases: list[tuple[str, Callable[[Any], object], Sequence[Any]]] = [
+        ("strip_html", strip_html, texts),
+        ("strip_html_soup", strip_html_soup, texts),
+        (
+            "clean_item",
+            lambda item: clean_item(item[1], item[0], rng),
+            list(enumerate(raw)),
+        ),
+        ("compute_match", compute_match, voorwaarden),
+        ("product_to_es_doc", product_to_es_doc, products),
+        ("build_search_body", lambda params: build_search_body(**params), searches),
+    ]
+    return [
+        {"function": name, "calls": len(inputs), **time_calls(fn, inputs, repeat)}
+        for name, fn, inputs in cases
+    ]
@@ -0,0 +1,46 @@
+import statistics
+import time
+from typing import Any
+
+from elasticsearch import Elasticsearch
+
+from dcs.lexicalsearch.personalization import PERSONALIZATION_ENGINES
+from dcs.lexicalsearch.search import search_diensten
+
+
+def compare_personalization(  # noqa: PLR0913
+    client: Elasticsearch,
+    ix: str,
+    vereniging_profile: dict[str, Any],
+    queries: list[str | None],
+    size: int = 50,
+    runs: int = 10,
+) -> list[dict[str, Any]]:
+    """Time the personalization engines on a live index.
+
+    For every query each engine is run `runs` times to collect the median
+    `took` (server) and round-trip latency in milliseconds. That the engines
+    rank identically is checked offline, in tests/test_personalization.py.
+    """
+    rows = []
+    for query in queries:
+        row: dict[str, Any] = {"query": query or "(match_all)"}
+        for engine in PERSONALIZATION_ENGINES:
+            took, wall = [], []
+            for _ in range(runs):
+                start = time.perf_counter()
+                result = search_diensten(
+                    client,
+                    ix=ix,
+                    query=query,
+                    sort_by="relevance",
+                    size=size,
+                    vereniging_profile=vereniging_profile,
+                    personalization=engine,
+                )
+                wall.append((time.perf_counter() - start) * 1000)
+                took.append(result["took"])
+            row[f"{engine}_took_ms"] = statistics.median(took)
+            row[f"{engine}_wall_ms"] = statistics.median(wall)
+        rows.append(row)
+    return rows
@@ -0,0 +1,113 @@
+import random
+import time
+from typing import Any
+
+import numpy as np
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+
+from dcs.bench.catalogue import THEMAS, synthetic_products
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.lexicalsearch.mapping import MAPPING
+from dcs.lexicalsearch.search import build_search_body
+from dcs.utils.config import SORTED_TOTAL_HITS
+
+BENCH_INDEX = "dcs-bench-recency"
+
+
+def _create(client: Elasticsearch, ix: str, *, sorted_layout: bool) -> None:
+    """Create `ix` with the diensten mapping, with or without the index sort."""
+    settings = {
+        key: value
+        for key, value in MAPPING["settings"].items()
+        if sorted_layout or key != "index"
+    }
+    client.indices.create(index=ix, body={**MAPPING, "settings": settings})
+
+
+def _load(client: Elasticsearch, ix: str, docs: list[dict[str, Any]]) -> None:
+    """Index `docs` into `ix` and merge it, as a reindex leaves it."""
+    bulk(client, ({"_index": ix, "_id": doc["id"], **doc} for doc in docs))
+    client.indices.refresh(index=ix)
+    client.indices.forcemerge(index=ix, max_num_segments=1)
+
+
+def recency_body(themas: list[str] | None, size: int) -> dict[str, Any]:
+    """Build the newest-first search the API sends for `sort=date`."""
+    return build_search_body(
+        themas=themas,
+        sort_by="laatste_wijzigingsdatum",
+        sort_order="desc",
+        size=size,
+        facets=False,
+    )
+
+
+def compare_recency(  # noqa: PLR0913
+    client: Elasticsearch,
+    products: int,
+    runs: int,
+    size: int = 10,
+    seed: int = 0,
+    *,
+    keep: bool = False,
+) -> list[dict[str, Any]]:
+    """Time newest-first searches on a date-sorted and an unsorted index.
+
+    Both indices hold the same synthetic products. Half of the searches
+    filter on a thema. Unsorted, the search is timed with exact totals, as
+    before, and with the `SORTED_TOTAL_HITS` limit the API now sends; the
+    limit only lets the sorted index stop early.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    docs = [product_to_es_doc(p) for p in synthetic_products(products, seed)]
+    sorted_ix, unsorted_ix = f"{BENCH_INDEX}-sorted", f"{BENCH_INDEX}-unsorted"
+    bodies = [
+        recency_body(rng.sample(THEMAS, 1) if rng.random() < 0.5 else None, size)  # noqa: PLR2004
+        for _ in range(runs)
+    ]
+    variants = [
+        ("unsorted, exact totals", unsorted_ix, True),
+        (f"unsorted, totals ≤ {SORTED_TOTAL_HITS}", unsorted_ix, SORTED_TOTAL_HITS),
+        (f"sorted, totals ≤ {SORTED_TOTAL_HITS}", sorted_ix, SORTED_TOTAL_HITS),
+    ]
+
+    client.indices.delete(index=[sorted_ix, unsorted_ix], ignore_unavailable=True)
+    try:
+        _create(client, sorted_ix, sorted_layout=True)
+        _create(client, unsorted_ix, sorted_layout=False)
+        _load(client, sorted_ix, docs)
+        _load(client, unsorted_ix, docs)
+
+        rows = []
+        # Sort values, not ids: products of a day may share a name
+        reference: list[list[Any]] | None = None
+        for name, ix, track in variants:
+            for body in bodies[:10]:  # warm up caches and the JIT
+                client.search(index=ix, body={**body, "track_total_hits": track})
+            took, wall, ids = [], [], []
+            for body in bodies:
+                start = time.perf_counter()
+                result = client.search(
+                    index=ix, body={**body, "track_total_hits": track}
+                ).body
+                wall.append((time.perf_counter() - start) * 1000)
+                took.append(result["took"])
+                ids.append([hit["sort"] for hit in result["hits"]["hits"]])
+            reference = reference or ids
+            rows.append(
+                {
+                    "variant": name,
+                    "took_p50_ms": float(np.percentile(took, 50)),
+                    "took_p95_ms": float(np.percentile(took, 95)),
+                    "wall_p50_ms": round(float(np.percentile(wall, 50)), 2),
+                    "wall_p95_ms": round(float(np.percentile(wall, 95)), 2),
+                    "identical": ids == reference,
+                }
+            )
+    finally:
+        if not keep:
+            client.indices.delete(
+                index=[sorted_ix, unsorted_ix], ignore_unavailable=True
+            )
+    return rows
@@ -0,0 +1,67 @@
+import random
+import time
+from typing import Any
+
+import numpy as np
+
+from dcs.bench.catalogue import NAMEN, REGIOS, THEMAS, VORMEN, synthetic_profiles
+from dcs.lexicalsearch.personalization import profile_params, profile_score
+from dcs.lexicalsearch.rerank import Candidates
+
+
+def synthetic_hits(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    """Build `n` first-stage hits with random conditions as doc values."""
+    rng = random.Random(seed)  # noqa: S311
+    return [
+        {
+            "_id": f"synthetic-{i}",
+            "_score": rng.uniform(1, 20),
+            "fields": {
+                "voorwaarden_vereniging": [rng.choice(NAMEN)]
+                if rng.random() < 0.05  # noqa: PLR2004
+                else [],
+                "voorwaarden_regio": rng.sample(REGIOS, rng.randint(0, 2)),
+                "voorwaarden_vorm": rng.sample(VORMEN, rng.randint(0, 1)),
+                "themas.keyword": rng.sample(THEMAS, rng.randint(0, 2)),
+            },
+        }
+        for i in range(n)
+    ]
+
+
+def compare_rerank(candidates: int, profiles: int, seed: int = 0) -> dict[str, Any]:
+    """Check the NumPy tier scores against `profile_score` and time both.
+
+    Every candidate is scored for every profile, once per candidate and
+    profile in Python and once as matrix operations.
+    """
+    hits = synthetic_hits(candidates, seed)
+    vereniging_profiles = synthetic_profiles(profiles, seed)
+    docs = [
+        {
+            **hit["fields"],
+            "themas": hit["fields"]["themas.keyword"],
+        }
+        for hit in hits
+    ]
+
+    start = time.perf_counter()
+    expected = np.array(
+        [
+            [profile_score(doc, profile_params(p)) for p in vereniging_profiles]
+            for doc in docs
+        ]
+    )
+    python_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    actual = Candidates.from_hits(hits).tier_scores(vereniging_profiles)
+    numpy_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "candidates": candidates,
+        "profiles": profiles,
+        "python_ms": round(python_ms, 2),
+        "numpy_ms": round(numpy_ms, 2),
+        "identical": bool(np.array_equal(expected, actual)),
+    }
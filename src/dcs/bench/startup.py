@@ -0,0 +1,106 @@
+import re
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any
+
+_CLI = "from dcs.cli import app; app()"
+# Heavy subsystems a command that does not need them must not pay for
+_HEAVY = ("elasticsearch", "numpy", "bs4", "httpx", "pydantic", "dotenv")
+_IMPORT_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+@dataclass(frozen=True)
+class Probe:
+    """A process start to time, with its import budget and forbidden modules."""
+
+    name: str
+    argv: tuple[str, ...]
+    budget_ms: float
+    forbidden: tuple[str, ...] = ()
+
+
+# Budgets leave headroom for a busy machine; loading Elasticsearch alone
+# costs more than the headroom of the CLI probes
+PROBES = (
+    Probe("dcs --help", ("-c", _CLI, "--help"), 400, _HEAVY),
+    Probe("dcs say", ("-c", _CLI, "say", "hoi"), 250, _HEAVY),
+    Probe("dcs search --help", ("-c", _CLI, "search", "--help"), 400, _HEAVY),
+    Probe("dcs bench --help", ("-c", _CLI, "bench", "--help"), 400, _HEAVY),
+    Probe(
+        "api",
+        ("-c", "import dcs.api"),
+        2000,
+        (
+            "dcs.ingest",
+            "dcs.lexicalsearch.bulk",
+            "dcs.lexicalsearch.index",
+            "dcs.lexicalsearch.profiles",
+            "bs4",
+        ),
+    ),
+)
+
+
+def import_times(stderr: str) -> tuple[float, set[str]]:
+    """Return the total import time (ms) and the modules in importtime output.
+
+    The total is the sum of the cumulative times of the top-level imports.
+    """
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        match = _IMPORT_RE.match(line)
+        if match is None:
+            continue
+        _, cumulative, indent, module = match.groups()
+        modules.add(module)
+        if not indent:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def run_probe(probe: Probe, runs: int) -> dict[str, Any]:
+    """Start the probe `runs` times and report its median import and wall time."""
+    imports = []
+    walls = []
+    modules: set[str] = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", *probe.argv],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        walls.append((time.perf_counter() - start) * 1000)
+        import_ms, modules = import_times(proc.stderr)
+        imports.append(import_ms)
+    loaded = sorted(
+        name
+        for name in probe.forbidden
+        if any(m == name or m.startswith(f"{name}.") for m in modules)
+    )
+    import_ms = statistics.median(imports)
+    return {
+        "command": probe.name,
+        "import_ms": round(import_ms, 1),
+        "wall_ms": round(statistics.median(walls), 1),
+        "budget_ms": probe.budget_ms,
+        "modules": len(modules),
+        "forbidden": ", ".join(loaded),
+        "ok": import_ms <= probe.budget_ms and not loaded,
+    }
+
+
+def check_startup(runs: int = 5, scale: float = 1.0) -> list[dict[str, Any]]:
+    """Time the start of every probe against its budget, times `scale`."""
+    return [
+        run_probe(
+            Probe(p.name, p.argv, p.budget_ms * scale, p.forbidden),
+            runs,
+        )
+        for p in PROBES
+    ]
@@ -0,0 +1,69 @@
+import random
+import time
+from typing import Any
+
+import numpy as np
+
+from dcs.bench.catalogue import synthetic_products
+from dcs.lexicalsearch.suggest import SuggestIndex, normalize
+
+
+def linear_suggest(index: SuggestIndex, prefix: str, size: int) -> list[dict[str, Any]]:
+    """Suggest by scanning every key; the reference for `SuggestIndex`."""
+    key = normalize(prefix)
+    matches = sorted(
+        (-w, k, int(i))
+        for k, i, w in zip(index.keys, index.positions, index.weights, strict=True)
+        if k.startswith(key)
+    )
+    seen: set[int] = set()
+    suggestions = []
+    for w, _, i in matches:
+        if i not in seen:
+            seen.add(i)
+            suggestions.append({**index.entries[i], "weight": round(-w, 4)})
+    return suggestions[:size]
+
+
+def compare_suggest(
+    products: int, lookups: int, size: int = 10, seed: int = 0
+) -> dict[str, Any]:
+    """Time prefix lookups against a linear scan and check they agree.
+
+    Prefixes are the first one to six characters of words of random
+    product names, as typed keystroke by keystroke.
+    """
+    rng = random.Random(seed)  # noqa: S311
+    catalogue = synthetic_products(products, seed)
+
+    start = time.perf_counter()
+    index = SuggestIndex.build(catalogue)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    prefixes = []
+    for _ in range(lookups):
+        word = rng.choice(rng.choice(catalogue).naam.split())
+        prefixes.append(word[: rng.randint(1, 6)])
+
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, size)
+        latencies.append(time.perf_counter() - start)
+    micros = np.array(latencies) * 1e6
+
+    checked = prefixes[: min(lookups, 200)]
+    start = time.perf_counter()
+    expected = [linear_suggest(index, p, size) for p in checked]
+    linear_us = (time.perf_counter() - start) * 1e6 / max(len(checked), 1)
+
+    return {
+        "products": products,
+        "keys": len(index.keys),
+        "build_ms": round(build_ms, 1),
+        "p50_us": round(float(np.percentile(micros, 50)), 1),
+        "p95_us": round(float(np.percentile(micros, 95)), 1),
+        "p99_us": round(float(np.percentile(micros, 99)), 1),
+        "linear_us": round(linear_us, 1),
+        "identical": expected == [index.suggest(p, size) for p in checked],
+    }
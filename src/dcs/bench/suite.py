@@ -0,0 +1,202 @@
+import json
+import os
+import platform
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any
+
+from dcs.bench.catalogue import write_catalogue
+from dcs.bench.latency import search_latency, search_mix
+from dcs.bench.micro import run_micro
+from dcs.ingest.cache import CleanCache
+from dcs.ingest.cleaner import clean_records
+from dcs.lexicalsearch.backend import BACKENDS, SearchBackend, UnknownBackendError
+from dcs.models.store import ProductWriter
+
+BENCH_INDEX = "dcs-bench-suite"
+# Metrics compared between runs, per section, and whether higher is better;
+# p99 rests on too few searches per kind to compare
+METRICS = {
+    "micro": ("function", {"median_us": False}),
+    "macro": ("stage", {"records_per_s": True}),
+    "search": ("kind", {"p50_ms": False, "p95_ms": False}),
+}
+
+
+@dataclass(frozen=True)
+class SuiteOptions:
+    """What the benchmark suite runs on.
+
+    The catalogue is generated from `seed`, so two runs with the same
+    options measure the same records and searches.
+    """
+
+    records: int = 10_000
+    seed: int = 0
+    backend: str = "memory"
+    workers: int | None = None
+    micro_records: int = 1000
+    repeat: int = 5
+    searches: int = 1000
+    keep: bool = False
+
+
+def _rate(stage: str, records: int, fn: Callable[[], object]) -> dict[str, Any]:
+    """Run `fn` once and report its throughput over `records`."""
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    return {
+        "stage": stage,
+        "records": records,
+        "seconds": round(seconds, 3),
+        "records_per_s": round(records / seconds) if seconds else 0,
+    }
+
+
+def _clean_file(
+    raw_file: Path,
+    output_file: Path,
+    workers: int,
+    seed: int,
+    cache: CleanCache | None = None,
+) -> None:
+    """Clean a raw catalogue file into NDJSON, as `clean_all` does."""
+    with raw_file.open(encoding="utf-8") as f:
+        raw = json.load(f)
+    with ProductWriter(output_file) as writer:
+        writer.write_all(clean_records(raw, workers=workers, seed=seed, cache=cache))
+
+
+def _index(
+    options: SuiteOptions, cleaned: Path
+) -> tuple[dict[str, Any], SearchBackend]:
+    """Index `cleaned` into a fresh index of the chosen backend, timed."""
+    if options.backend == "memory":
+        from dcs.lexicalsearch.memory import InMemoryIndex
+
+        memory = InMemoryIndex()
+        row = _rate(
+            "index (memory)", options.records, lambda: memory.index_file(cleaned)
+        )
+        return row, memory
+
+    from dcs.lexicalsearch.backend import ElasticsearchBackend
+    from dcs.lexicalsearch.es_client import get_client
+
+    client = get_client()
+    client.indices.delete(index=BENCH_INDEX, ignore_unavailable=True)
+    es = ElasticsearchBackend(BENCH_INDEX)
+    row = _rate(
+        "index (elasticsearch)", options.records, lambda: es.index_file(cleaned)
+    )
+    client.indices.refresh(index=BENCH_INDEX)
+    return row, es
+
+
+def _drop(options: SuiteOptions) -> None:
+    """Drop the Elasticsearch benchmark index, unless asked to keep it."""
+    if options.backend == "elasticsearch" and not options.keep:
+        from dcs.lexicalsearch.es_client import get_client
+
+        get_client().indices.delete(index=BENCH_INDEX, ignore_unavailable=True)
+
+
+def run_meta(options: SuiteOptions) -> dict[str, Any]:
+    """Describe the code, machine and options a run measured."""
+    try:
+        dcs_version = version("dcs")
+    except PackageNotFoundError:
+        dcs_version = "unknown"
+    return {
+        "dcs": dcs_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "started_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "options": asdict(options),
+    }
+
+
+def run_suite(options: SuiteOptions) -> dict[str, Any]:
+    """Generate a catalogue, then benchmark ingest and search on it.
+
+    Micro-benchmarks time the per-record and per-search functions. Macro
+    benchmarks time generating, cleaning (serial, in a pool, and against a
+    cold and a warm clean cache) and indexing the whole catalogue. Search
+    latency is measured on the indexed catalogue with a seeded mix of
+    queries, filters and profiles.
+    """
+    if options.backend not in BACKENDS:
+        raise UnknownBackendError(options.backend)
+    workers = options.workers or os.cpu_count() or 1
+    n = options.records
+    result: dict[str, Any] = {"meta": run_meta(options)}
+    result["micro"] = run_micro(
+        min(options.micro_records, n), options.seed, options.repeat
+    )
+
+    with TemporaryDirectory() as tmp:
+        raw_file = Path(tmp) / "raw.json"
+        cleaned = Path(tmp) / "cleaned.ndjson"
+        seed = options.seed
+        macro = [
+            _rate("generate", n, lambda: write_catalogue(raw_file, n, seed)),
+            _rate("clean (serial)", n, lambda: _clean_file(raw_file, cleaned, 1, seed)),
+            _rate(
+                f"clean ({workers} workers)",
+                n,
+                lambda: _clean_file(raw_file, cleaned, workers, seed),
+            ),
+        ]
+        with CleanCache(Path(tmp) / "cache.sqlite") as cache:
+            # The same run twice: cleans into the empty cache, then reads it
+            macro.extend(
+                _rate(stage, n, lambda: _clean_file(raw_file, cleaned, 1, seed, cache))
+                for stage in ("clean (cache, cold)", "clean (cache, warm)")
+            )
+
+        try:
+            row, backend = _index(options, cleaned)
+            macro.append(row)
+            result["macro"] = macro
+            result["search"] = search_latency(
+                backend, search_mix(options.searches, seed)
+            )
+        finally:
+            _drop(options)
+    return result
+
+
+def compare_runs(old: dict[str, Any], new: dict[str, Any]) -> list[dict[str, Any]]:
+    """Compare the metrics of two suite runs.
+
+    `change` is the relative change from `old` to `new` in percent; a
+    positive `gain` is an improvement, whichever way the metric runs.
+    """
+    rows = []
+    for section, (key, metrics) in METRICS.items():
+        before = {row[key]: row for row in old.get(section, [])}
+        for row in new.get(section, []):
+            if row[key] not in before:
+                continue
+            for metric, higher_is_better in metrics.items():
+                a, b = before[row[key]][metric], row[metric]
+                change = (b - a) / a * 100 if a else 0.0
+                rows.append(
+                    {
+                        "section": section,
+                        "name": row[key],
+                        "metric": metric,
+                        "old": a,
+                        "new": b,
+                        "change": round(change, 1),
+                        "gain": round(change if higher_is_better else -change, 1),
+                    }
+                )
+    return rows
@@ -1,18 +1,35 @@
 import json
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 import typer
 from rich.console import Console
 from rich.table import Table
 
-from dcs.ingest.cleaner import clean_all
-from dcs.ingest.fetcher import fetch
-from dcs.lexicalsearch.es_client import get_client
-from dcs.lexicalsearch.index import drop_index, index_all
-from dcs.lexicalsearch.search import search_diensten
+from dcs.utils.config import CLEAN_CACHE_FILE, HYBRID_WINDOW, RRF_RANK_CONSTANT
+from dcs.utils.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from dcs.lexicalsearch.search import SearchParams
 
 console = Console()
 app = typer.Typer(help="📥 Dienstencatalogus CLI")
+bench_app = typer.Typer(help="⏱️ Benchmarks")
+app.add_typer(bench_app, name="bench")
+profiles_app = typer.Typer(help="👥 Geregistreerde verenigingsprofielen")
+app.add_typer(profiles_app, name="profiles")
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    metrics: Path | None = typer.Option(  # noqa: B008
+        None, help="Metrics na afloop wegschrijven (Prometheus-tekstformaat)"
+    ),
+) -> None:
+    """Dienstencatalogus CLI."""
+    if metrics:
+        ctx.call_on_close(lambda: REGISTRY.write(metrics))
 
 
 @app.command()
@@ -22,9 +39,40 @@ def say(word: str) -> None:
 
 
 @app.command("fetch")
-def fetcher(max_pages: int = 50, per_page: int = 100, start_at: int = 1) -> None:
+def fetcher(  # noqa: PLR0913
+    max_pages: int = 50,
+    per_page: int = 100,
+    start_at: int = 1,
+    concurrency: int = typer.Option(
+        1, min=1, help="Aantal pagina's dat tegelijk wordt opgehaald"
+    ),
+    retries: int = typer.Option(
+        3,
+        min=0,
+        help="Herhaalpogingen bij 5xx-fouten, 429 (rate limiting), timeouts "
+        "en verbroken verbindingen",
+    ),
+    rate_limit: float | None = typer.Option(
+        None, help="Maximaal aantal requests per seconde"
+    ),
+    incremental: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--incremental",
+        help="Enkel records ophalen die gewijzigd zijn sinds de vorige fetch",
+    ),
+) -> None:
     """Download raw Dienstencatalogus data to disk."""
-    fetch(max_pages, per_page, start_at)
+    from dcs.ingest.fetcher import fetch
+
+    fetch(
+        max_pages,
+        per_page,
+        start_at,
+        concurrency=concurrency,
+        retries=retries,
+        rate_limit=rate_limit,
+        incremental=incremental,
+    )
 
 
 @app.command()
@@ -33,13 +81,29 @@ def clean(
         ...,
         help="Pad naar het uitvoerbestand waarin de opgeschoonde JSON-data wordt weggeschreven.",  # noqa: E501
     ),
+    workers: int = typer.Option(1, min=1, help="Aantal processen voor het opschonen"),
+    seed: int | None = typer.Option(
+        None, help="Seed voor reproduceerbare toewijzing van de vorm"
+    ),
+    no_cache: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--no-cache",
+        help="Alle records opnieuw opschonen, zonder de cache te gebruiken",
+    ),
 ) -> None:
     """Clean downloaded Dienstencatalogus data."""
-    clean_all(output_file=output_file)
+    from dcs.ingest.cleaner import clean_all
+
+    clean_all(
+        output_file=output_file,
+        workers=workers,
+        seed=seed,
+        cache_file=None if no_cache else CLEAN_CACHE_FILE,
+    )
 
 
 @app.command()
-def index(
+def index(  # noqa: PLR0913
     index_name: str = typer.Argument(
         ..., help="Naam van de Elasticsearch-index (verplicht)"
     ),
@@ -47,14 +111,244 @@ def index(
         ...,
         exists=True,
         readable=True,
-        help="Pad naar het JSON-bestand met te indexeren records",
+        help="Pad naar het JSON- of NDJSON-bestand met te indexeren records",
+    ),
+    chunk_size: int = typer.Option(500, min=1, help="Documenten per bulk-request"),
+    max_chunk_bytes: int = typer.Option(
+        10 * 1024 * 1024, min=1, help="Maximale grootte van een bulk-request"
+    ),
+    threads: int = typer.Option(4, min=1, help="Aantal parallelle bulk-workers"),
+    max_retries: int = typer.Option(
+        3, min=0, help="Herhaalpogingen bij 429-afwijzingen"
+    ),
+    report: Path | None = typer.Option(  # noqa: B008
+        None, help="Pad voor het rapport met mislukte documenten"
+    ),
+    incremental: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--incremental",
+        help="Enkel nieuwe, gewijzigde en verdwenen producten versturen",
+    ),
+    manifest: Path | None = typer.Option(  # noqa: B008
+        None, help="Lokaal manifest met content-hashes (in plaats van een scan)"
+    ),
+    backend: str = typer.Option(
+        "elasticsearch", help="Zoekbackend (elasticsearch of memory)"
+    ),
+    embed: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--embed",
+        help="Vectoren berekenen voor hybride zoeken (enkel Elasticsearch)",
+    ),
+    refit: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--refit",
+        help="Het embeddingmodel opnieuw fitten (vereist een volledige herindexering)",
+    ),
+    tiers: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--tiers",
+        help="Personalisatietiers van geregistreerde profielen bijwerken",
     ),
 ) -> None:
     """Indexeert records uit een JSON-bestand in de opgegeven Elasticsearch-index."""
+    from dcs.lexicalsearch.backend import get_backend, memory_index_path
+    from dcs.lexicalsearch.bulk import BulkOptions
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.lexicalsearch.index import index_all
+    from dcs.lexicalsearch.profiles import ProfileStore, sync_tiers
+    from dcs.lexicalsearch.suggest import build_suggestions
+    from dcs.semanticsearch.embed import embedding_stage
+
     typer.echo(f"📥 Indexeren van bestand: {file_path}")
     typer.echo(f"📦 Doelindex: {index_name}")
 
-    index_all(index_name=index_name, file_path=file_path)
+    if backend == "memory":
+        count = get_backend(backend, index_name).index_file(file_path)
+        build_suggestions(file_path, index_name)
+        console.print(
+            f"✅ Indexed {count} producten into {memory_index_path(index_name)}"
+        )
+        return
+
+    options = BulkOptions(
+        chunk_size=chunk_size,
+        max_chunk_bytes=max_chunk_bytes,
+        threads=threads,
+        max_retries=max_retries,
+    )
+    embeddings = (
+        embedding_stage(file_path, refit=refit, prune=not incremental)
+        if embed or refit
+        else None
+    )
+    index_all(
+        index_name=index_name,
+        file_path=file_path,
+        options=options,
+        report_file=report,
+        incremental=incremental,
+        manifest=manifest,
+        embeddings=embeddings,
+    )
+    build_suggestions(file_path, index_name)
+    if tiers:
+        console.print(sync_tiers(get_client(), file_path, ProfileStore()).summary())
+
+
+@app.command("reindex")
+def reindex_alias(  # noqa: PLR0913
+    file_path: Path = typer.Argument(  # noqa: B008
+        ...,
+        exists=True,
+        readable=True,
+        help="Pad naar het JSON- of NDJSON-bestand met te indexeren records",
+    ),
+    alias: str = typer.Option("diensten", help="Alias waarop gezocht wordt"),
+    keep: int = typer.Option(2, min=1, help="Aantal generaties dat bewaard blijft"),
+    replicas: int = typer.Option(1, min=0, help="Replica's na het laden"),
+    threads: int = typer.Option(4, min=1, help="Aantal parallelle bulk-workers"),
+    max_failures: int = typer.Option(
+        0, min=0, help="Maximaal aantal mislukte documenten voor de alias-swap"
+    ),
+    report: Path | None = typer.Option(  # noqa: B008
+        None, help="Pad voor het rapport met mislukte documenten"
+    ),
+    embed: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--embed",
+        help="Vectoren berekenen voor hybride zoeken",
+    ),
+    tiers: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--tiers",
+        help="Personalisatietiers van geregistreerde profielen bijwerken",
+    ),
+) -> None:
+    """Rebuild the index behind an alias without downtime."""
+    from dcs.lexicalsearch.bulk import BulkOptions
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.lexicalsearch.profiles import ProfileStore, sync_tiers
+    from dcs.lexicalsearch.reindex import ReindexError, reindex
+    from dcs.lexicalsearch.suggest import build_suggestions
+    from dcs.semanticsearch.embed import embedding_stage
+
+    try:
+        index_name = reindex(
+            alias,
+            file_path,
+            options=BulkOptions(threads=threads),
+            report_file=report,
+            keep=keep,
+            replicas=replicas,
+            max_failures=max_failures,
+            embeddings=embedding_stage(file_path) if embed else None,
+        )
+    except ReindexError as e:
+        console.print(f"[red]❌ {e}[/red]")
+        raise typer.Exit(1) from e
+    build_suggestions(file_path, alias)
+    typer.echo(f"✅ Alias '{alias}' serves '{index_name}'")
+    if tiers:
+        console.print(sync_tiers(get_client(), file_path, ProfileStore()).summary())
+
+
+@app.command("sync")
+def sync_index(  # noqa: PLR0913
+    index_name: str = typer.Argument("diensten", help="Bij te werken index"),
+    max_pages: int = typer.Option(50, min=1, help="Maximaal aantal pagina's"),
+    per_page: int = typer.Option(100, min=1, help="Records per pagina"),
+    concurrency: int = typer.Option(
+        4, min=1, help="Aantal pagina's dat tegelijk wordt opgehaald"
+    ),
+    rate_limit: float | None = typer.Option(
+        None, help="Maximaal aantal requests per seconde"
+    ),
+    workers: int = typer.Option(1, min=1, help="Aantal processen voor het opschonen"),
+    seed: int | None = typer.Option(
+        None, help="Seed voor reproduceerbare toewijzing van de vorm"
+    ),
+    threads: int = typer.Option(4, min=1, help="Aantal parallelle bulk-workers"),
+    queue_size: int = typer.Option(
+        8, min=1, help="Pagina's die klaarstaan om opgeschoond te worden"
+    ),
+    tee: Path | None = typer.Option(  # noqa: B008
+        None, help="Opgeschoonde producten ook wegschrijven (JSON of NDJSON)"
+    ),
+    raw_tee: Path | None = typer.Option(  # noqa: B008
+        None, help="Ruwe records ook wegschrijven (JSON, zoals `fetch`)"
+    ),
+    report: Path | None = typer.Option(  # noqa: B008
+        None, help="Pad voor het rapport met mislukte documenten"
+    ),
+    no_cache: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--no-cache",
+        help="Alle records opnieuw opschonen, zonder de cache te gebruiken",
+    ),
+) -> None:
+    """Fetch, clean and index in one streaming pass, without files in between."""
+    from dcs.ingest.pipeline import FetchFailedError, SyncOptions, sync
+    from dcs.lexicalsearch.bulk import BulkOptions
+
+    options = SyncOptions(
+        max_pages=max_pages,
+        per_page=per_page,
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        workers=workers,
+        seed=seed,
+        queue_size=queue_size,
+        cache_file=None if no_cache else CLEAN_CACHE_FILE,
+    )
+    try:
+        result = sync(
+            index_name,
+            options,
+            BulkOptions(threads=threads),
+            tee=tee,
+            raw_tee=raw_tee,
+            report_file=report,
+        )
+    except FetchFailedError as e:
+        console.print(f"🔥 {e}: {e.__cause__}")
+        raise typer.Exit(code=1) from e
+    console.print(result.summary())
+
+
+@app.command("convert")
+def convert_file(
+    src: Path = typer.Argument(  # noqa: B008
+        ..., exists=True, readable=True, help="Bronbestand (.json of .ndjson)"
+    ),
+    dst: Path = typer.Argument(..., help="Doelbestand (.json of .ndjson)"),  # noqa: B008
+) -> None:
+    """Convert cleaned products between the JSON array and NDJSON formats."""
+    from dcs.models.store import convert
+
+    count = convert(src, dst)
+    typer.echo(f"✅ Converted {count} products to {dst}")
+
+
+@app.command()
+def inspect(
+    file_path: Path = typer.Argument(  # noqa: B008
+        ..., exists=True, readable=True, help="Pad naar het NDJSON-bestand"
+    ),
+    product_id: str | None = typer.Option(None, "--id", help="Toon één product"),
+) -> None:
+    """Inspect a cleaned NDJSON product file without loading it entirely."""
+    from dcs.models.store import ProductStore
+
+    with ProductStore(file_path) as store:
+        if product_id is None:
+            typer.echo(f"📦 {len(store)} products in {file_path}")
+            return
+        product = store.get(product_id)
+        if product is None:
+            typer.echo(f"⚠️ Product '{product_id}' not found")
+            raise typer.Exit(1)
+        console.print_json(product.model_dump_json())
 
 
 @app.command()
@@ -64,10 +358,60 @@ def drop(
     ),
 ) -> None:
     """Drop the Elasticsearch index."""
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.lexicalsearch.index import drop_index
+
     client = get_client()
     drop_index(client, ix=index)
 
 
+def search_hybrid(ix: str, backend: str, params: "SearchParams") -> dict[str, Any]:
+    """Run a hybrid search with the saved embedding model."""
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.semanticsearch.embed import NotFittedError, load_embedder
+    from dcs.semanticsearch.hybrid import HybridNotSupportedError, hybrid_search
+
+    if backend != "elasticsearch":
+        raise HybridNotSupportedError(backend)
+    embedder = load_embedder()
+    if embedder is None:
+        raise NotFittedError
+    return hybrid_search(
+        get_client(), embedder, ix, HYBRID_WINDOW, RRF_RANK_CONSTANT, **params
+    )
+
+
+def show_results(result: dict[str, Any], *, cursor_paged: bool) -> None:
+    """Print the hits of a search, then its next cursor or its facets."""
+    hits = result["hits"]["hits"]
+    table = Table(title="\n🔍 Zoekresultaten", show_lines=True)
+
+    table.add_column("Naam", style="bold")
+    table.add_column("ID")
+    table.add_column("Score", justify="right", style="dim")
+
+    for hit in hits:
+        source = hit["_source"]
+        score = hit.get("_score")
+        score_display = f"{score:.2f}" if score is not None else "n/a"
+        table.add_row(source["naam"], source["id"][:10], score_display)
+
+    console.print(table)
+    if "phase" in result:
+        typer.echo(f"🧭 Beantwoord in de {result['phase']}-fase")
+
+    if cursor_paged:
+        next_cursor = result["next_cursor"]
+        typer.echo(f"\n➡️ Volgende cursor: {next_cursor or '(laatste pagina)'}")
+        return
+
+    typer.echo("\n📊 Facetten:")
+    for facet_name in ["themas", "gemeentes", "types"]:
+        typer.echo(f"\n{facet_name.capitalize()}:")
+        for bucket in result["aggregations"][facet_name]["buckets"]:
+            typer.echo(f"  {bucket['key']} ({bucket['doc_count']})")
+
+
 @app.command()
 def search(  # noqa: PLR0913
     ix: str = typer.Option(
@@ -84,45 +428,417 @@ def search(  # noqa: PLR0913
     from_: int = typer.Option(0, help="Offset"),
     size: int = typer.Option(10, help="Aantal resultaten"),
     profile: Path | None = typer.Option(None, help="JSON-pad vereniging profiel"),  # noqa: B008
+    profile_id: str | None = typer.Option(
+        None, help="ID van een geregistreerd profiel (zie `dcs profiles`)"
+    ),
+    personalization: str = typer.Option(
+        "script", help="Personalisatie-engine (script, native of rerank)"
+    ),
+    deep: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--deep",
+        help="Pagineren met een cursor (point-in-time) in plaats van een offset",
+    ),
+    cursor: str | None = typer.Option(
+        None, help="Cursor van de vorige pagina (impliceert --deep)"
+    ),
+    backend: str = typer.Option(
+        "elasticsearch", help="Zoekbackend (elasticsearch of memory)"
+    ),
+    hybrid: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--hybrid",
+        help="Lexicaal en semantisch zoeken, samengevoegd met reciprocal rank fusion",
+    ),
+    matching: str = typer.Option(
+        "fuzzy", help="Matching van de zoekterm (fuzzy, exact of adaptive)"
+    ),
 ) -> None:
     """Search the Diensten index."""
-    client = get_client()
+    from dcs.lexicalsearch.backend import get_backend
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.lexicalsearch.pagination import CursorNotSupportedError, search_page
+    from dcs.lexicalsearch.rerank import single_stage
+    from dcs.semanticsearch.embed import NotFittedError
+    from dcs.semanticsearch.hybrid import wants_hybrid
 
     vereniging_profile = None
     if profile:
         with Path.open(profile, encoding="utf-8") as f:
             vereniging_profile = json.load(f)
 
-    result = search_diensten(
-        client,
-        ix=ix,
-        query=query,
-        themas=thema,
-        gemeente=gemeente,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        from_=from_,
-        size=size,
-        vereniging_profile=vereniging_profile,
-    )
+    params: SearchParams = {
+        "query": query,
+        "themas": thema,
+        "gemeente": gemeente,
+        "sort_by": sort_by,
+        "sort_order": sort_order,
+        "from_": from_,
+        "size": size,
+        "vereniging_profile": vereniging_profile,
+        "personalization": personalization,
+        "profile_id": profile_id,
+        "matching": matching,
+    }
+    try:
+        if deep or cursor:
+            if backend != "elasticsearch":
+                raise CursorNotSupportedError(backend)
+            result = search_page(
+                get_client(), ix=ix, cursor=cursor, **single_stage(params)
+            )
+        elif hybrid and wants_hybrid(params, "hybrid"):
+            result = search_hybrid(ix, backend, params)
+        else:
+            result = get_backend(backend, ix).search(**params)
+    except (ValueError, NotFittedError) as e:
+        console.print(f"🔥 {e}")
+        raise typer.Exit(code=1) from e
 
-    hits = result["hits"]["hits"]
-    table = Table(title="\n🔍 Zoekresultaten", show_lines=True)
+    show_results(result, cursor_paged=bool(deep or cursor))
 
-    table.add_column("Naam", style="bold")
-    table.add_column("ID")
-    table.add_column("Score", justify="right", style="dim")
 
-    for hit in hits:
-        source = hit["_source"]
-        score = hit.get("_score")
-        score_display = f"{score:.2f}" if score is not None else "n/a"
-        table.add_row(source["naam"], source["id"][:10], score_display)
+@app.command("suggest")
+def suggest_cmd(
+    prefix: str = typer.Argument(..., help="Begin van een zoekterm"),
+    ix: str = typer.Option("diensten", help="Index waarvoor gesuggereerd wordt"),
+    size: int = typer.Option(10, min=1, help="Aantal suggesties"),
+    backend: str = typer.Option(
+        "memory", help="Suggestiebron (memory of elasticsearch)"
+    ),
+) -> None:
+    """Suggest product names and themes for a partially typed query."""
+    from dcs.lexicalsearch.suggest import SuggestIndex, suggest_path
+
+    if backend == "elasticsearch":
+        from dcs.lexicalsearch.es_client import get_client
+        from dcs.lexicalsearch.suggest import suggest_es
+
+        suggestions = suggest_es(get_client(), ix, prefix, size)
+    else:
+        path = suggest_path(ix)
+        if not path.exists():
+            console.print(f"🔥 No suggestions for '{ix}'; index the products first")
+            raise typer.Exit(code=1)
+        suggestions = SuggestIndex.load(path).suggest(prefix, size)
 
+    table = Table(title=f"\n💡 Suggesties voor '{prefix}'")
+    table.add_column("Suggestie", style="bold")
+    table.add_column("Type")
+    table.add_column("Gewicht", justify="right", style="dim")
+    for suggestion in suggestions:
+        table.add_row(
+            suggestion["text"], suggestion["type"], f"{suggestion['weight']:.3f}"
+        )
     console.print(table)
 
-    typer.echo("\n📊 Facetten:")
-    for facet_name in ["themas", "gemeentes", "types"]:
-        typer.echo(f"\n{facet_name.capitalize()}:")
-        for bucket in result["aggregations"][facet_name]["buckets"]:
-            typer.echo(f"  {bucket['key']} ({bucket['doc_count']})")
+
+@app.command()
+def export(  # noqa: PLR0913
+    output: Path = typer.Argument(..., help="Doelbestand (NDJSON)"),  # noqa: B008
+    ix: str = typer.Option("diensten", help="Te exporteren index"),
+    query: str | None = typer.Option(None, help="Zoekterm"),
+    thema: list[str] | None = typer.Option(None, help="Filter op thema"),  # noqa: B008
+    gemeente: str | None = typer.Option(None, help="Filter op gemeente"),
+    batch_size: int = typer.Option(1000, min=1, help="Hits per request"),
+) -> None:
+    """Stream every hit of a search to an NDJSON file."""
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.lexicalsearch.pagination import iter_hits
+
+    client = get_client()
+    count = 0
+    with output.open("w", encoding="utf-8") as f:
+        for hit in iter_hits(
+            client,
+            ix=ix,
+            batch_size=batch_size,
+            query=query,
+            themas=thema,
+            gemeente=gemeente,
+            sort_by="",  # index order by id only, the cheapest stable sort
+        ):
+            f.write(json.dumps(hit["_source"], ensure_ascii=False) + "\n")
+            count += 1
+    console.print(f"✅ Exported {count} documents to {output}")
+
+
+@profiles_app.command("add")
+def profiles_add(
+    profile_id: str = typer.Argument(..., help="ID van het profiel"),
+    profile: Path = typer.Argument(  # noqa: B008
+        ..., exists=True, readable=True, help="JSON-pad vereniging profiel"
+    ),
+) -> None:
+    """Register a vereniging profile, or replace it."""
+    from dcs.lexicalsearch.profiles import ProfileStore
+    from dcs.models.search import VerenigingProfile
+
+    store = ProfileStore()
+    with Path.open(profile, encoding="utf-8") as f:
+        store.add(profile_id, VerenigingProfile(**json.load(f)))
+    store.save()
+    typer.echo(f"✅ Profiel '{profile_id}' geregistreerd; voer `dcs profiles sync` uit")
+
+
+@profiles_app.command("remove")
+def profiles_remove(
+    profile_id: str = typer.Argument(..., help="ID van het profiel"),
+) -> None:
+    """Unregister a vereniging profile."""
+    from dcs.lexicalsearch.profiles import ProfileStore, UnknownProfileError
+
+    store = ProfileStore()
+    try:
+        store.remove(profile_id)
+    except UnknownProfileError as e:
+        console.print(f"🔥 {e}")
+        raise typer.Exit(code=1) from e
+    store.save()
+    typer.echo(f"🗑️ Profiel '{profile_id}' verwijderd; voer `dcs profiles sync` uit")
+
+
+@profiles_app.command("list")
+def profiles_list() -> None:
+    """List the registered vereniging profiles."""
+    from dcs.lexicalsearch.profiles import ProfileStore
+
+    store = ProfileStore()
+    table = Table(title=f"\n👥 {len(store)} profielen")
+    table.add_column("ID", style="bold")
+    table.add_column("Werkingsgebieden")
+    table.add_column("Hoofdactiviteiten")
+    for profile_id in sorted(store.profiles):
+        profile = store.get(profile_id).to_search_profile()
+        table.add_row(
+            profile_id,
+            ", ".join(profile["werkingsgebieden"]),
+            ", ".join(profile["hoofdactiviteiten"]),
+        )
+    console.print(table)
+
+
+@profiles_app.command("sync")
+def profiles_sync(
+    file_path: Path = typer.Argument(  # noqa: B008
+        ...,
+        exists=True,
+        readable=True,
+        help="Pad naar het JSON- of NDJSON-bestand met de geïndexeerde records",
+    ),
+) -> None:
+    """Materialize the personalization tiers of every registered profile."""
+    from dcs.lexicalsearch.es_client import get_client
+    from dcs.lexicalsearch.profiles import ProfileStore, sync_tiers
+
+    console.print(sync_tiers(get_client(), file_path, ProfileStore()).summary())
+
+
+def _print_rows(title: str, rows: list[dict[str, Any]]) -> None:
+    """Print benchmark rows as a table with a column per key."""
+    if not rows:
+        return
+    table = Table(title=title)
+    for column in rows[0]:
+        table.add_column(column)
+    for row in rows:
+        table.add_row(*(str(value) for value in row.values()))
+    console.print(table)
+
+
+@bench_app.command("clean")
+def bench_clean(
+    records: int = typer.Option(5000, help="Aantal synthetische records"),
+    workers: int | None = typer.Option(None, help="Aantal processen"),
+) -> None:
+    """Compare cleaning throughput on a synthetic corpus."""
+    from dcs.bench.clean import compare_clean_throughput
+
+    results = compare_clean_throughput(records, workers)
+
+    _print_rows(
+        f"\n⏱️ Clean throughput ({records} records)",
+        [
+            {"Variant": variant, "Records/s": f"{rate:,.0f}"}
+            for variant, rate in results.items()
+        ],
+    )
+
+
+@bench_app.command("personalization")
+def bench_personalization(
+    profile: Path = typer.Argument(  # noqa: B008
+        ..., exists=True, readable=True, help="JSON-pad vereniging profiel"
+    ),
+    ix: str = typer.Option("diensten", help="Te doorzoeken index"),
+    query: list[str] | None = typer.Option(None, help="Zoekterm(en)"),  # noqa: B008
+    size: int = typer.Option(50, help="Aantal resultaten per zoekopdracht"),
+    runs: int = typer.Option(10, help="Herhalingen per engine"),
+) -> None:
+    """Compare the latency of the personalization engines."""
+    from dcs.bench.personalization import compare_personalization
+    from dcs.lexicalsearch.es_client import get_client
+
+    with Path.open(profile, encoding="utf-8") as f:
+        vereniging_profile = json.load(f)
+
+    queries: list[str | None] = [None, *(query or [])]
+    rows = compare_personalization(
+        get_client(), ix, vereniging_profile, queries, size, runs
+    )
+
+    _print_rows("\n⏱️ Personalization engines (median ms)", rows)
+
+
+@bench_app.command("rerank")
+def bench_rerank(
+    candidates: int = typer.Option(200, help="Aantal kandidaten (top K)"),
+    profiles: int = typer.Option(100, help="Aantal verenigingsprofielen"),
+    seed: int = typer.Option(0, help="Seed voor de synthetische data"),
+) -> None:
+    """Check and time the vectorized re-ranker against the Python scorer."""
+    from dcs.bench.rerank import compare_rerank
+
+    result = compare_rerank(candidates, profiles, seed)
+
+    _print_rows("\n⏱️ Re-ranker (ms)", [result])
+    if not result["identical"]:
+        raise typer.Exit(1)
+
+
+@bench_app.command("suggest")
+def bench_suggest(
+    products: int = typer.Option(5000, help="Aantal synthetische producten"),
+    lookups: int = typer.Option(2000, help="Aantal opzoekingen"),
+    size: int = typer.Option(10, help="Aantal suggesties per opzoeking"),
+    seed: int = typer.Option(0, help="Seed voor de synthetische data"),
+) -> None:
+    """Time type-ahead lookups in the prefix index against a linear scan."""
+    from dcs.bench.suggest import compare_suggest
+
+    result = compare_suggest(products, lookups, size, seed)
+
+    _print_rows("\n⏱️ Suggesties (µs per opzoeking)", [result])
+    if not result["identical"]:
+        raise typer.Exit(1)
+
+
+@bench_app.command("recency")
+def bench_recency(
+    products: int = typer.Option(100_000, help="Aantal synthetische producten"),
+    runs: int = typer.Option(200, help="Aantal zoekopdrachten per variant"),
+    size: int = typer.Option(10, help="Aantal resultaten per zoekopdracht"),
+    seed: int = typer.Option(0, help="Seed voor de synthetische data"),
+    keep: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--keep",
+        help="De benchmarkindices na afloop niet verwijderen",
+    ),
+) -> None:
+    """Time newest-first searches on a date-sorted and an unsorted index."""
+    from dcs.bench.recency import compare_recency
+    from dcs.lexicalsearch.es_client import get_client
+
+    rows = compare_recency(get_client(), products, runs, size, seed, keep=keep)
+
+    _print_rows(f"\n⏱️ Sorteren op datum ({products} producten)", rows)
+    if not all(row["identical"] for row in rows):
+        raise typer.Exit(1)
+
+
+@bench_app.command("startup")
+def bench_startup(
+    runs: int = typer.Option(5, min=1, help="Aantal starts per commando"),
+    scale: float = typer.Option(
+        1.0, min=0.1, help="Factor op de budgetten, voor tragere machines"
+    ),
+) -> None:
+    """Check the import time of CLI commands and the API against their budgets."""
+    from dcs.bench.startup import check_startup
+
+    rows = check_startup(runs, scale)
+
+    _print_rows("\n⏱️ Opstarttijd (mediaan ms)", rows)
+    if not all(row["ok"] for row in rows):
+        raise typer.Exit(1)
+
+
+@bench_app.command("generate")
+def bench_generate(
+    output_file: Path = typer.Argument(  # noqa: B008
+        ..., help="Pad voor de synthetische catalogus (JSON)"
+    ),
+    records: int = typer.Option(10_000, min=1, help="Aantal synthetische records"),
+    seed: int = typer.Option(0, help="Seed voor de synthetische data"),
+) -> None:
+    """Write a synthetic raw catalogue, shaped like the output of `fetch`."""
+    from dcs.bench.catalogue import write_catalogue
+
+    write_catalogue(output_file, records, seed)
+    console.print(f"✅ Saved {records} synthetic records to {output_file}")
+
+
+@bench_app.command("suite")
+def bench_suite(  # noqa: PLR0913
+    records: int = typer.Option(10_000, min=1, help="Aantal synthetische records"),
+    seed: int = typer.Option(0, help="Seed voor de synthetische data"),
+    backend: str = typer.Option(
+        "memory", help="Zoekbackend: 'elasticsearch' of 'memory'"
+    ),
+    workers: int | None = typer.Option(None, help="Aantal processen"),
+    searches: int = typer.Option(1000, min=1, help="Aantal zoekopdrachten"),
+    repeat: int = typer.Option(5, min=1, help="Herhalingen per micro-benchmark"),
+    output: Path | None = typer.Option(  # noqa: B008
+        None, help="Resultaten als JSON wegschrijven, om runs te vergelijken"
+    ),
+    keep: bool = typer.Option(  # noqa: FBT001
+        False,  # noqa: FBT003
+        "--keep",
+        help="De benchmarkindex na afloop niet verwijderen",
+    ),
+) -> None:
+    """Benchmark ingest and search on a synthetic catalogue."""
+    from dcs.bench.suite import SuiteOptions, run_suite
+
+    options = SuiteOptions(
+        records=records,
+        seed=seed,
+        backend=backend,
+        workers=workers,
+        repeat=repeat,
+        searches=searches,
+        keep=keep,
+    )
+    result = run_suite(options)
+
+    _print_rows("\n⏱️ Micro-benchmarks (µs per aanroep)", result["micro"])
+    _print_rows(f"\n⏱️ Ingest ({records} records)", result["macro"])
+    _print_rows(f"\n⏱️ Zoeklatentie ({backend}, ms)", result["search"])
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        console.print(f"✅ Saved results to {output}")
+
+
+@bench_app.command("compare")
+def bench_compare(
+    old: Path = typer.Argument(  # noqa: B008
+        ..., exists=True, readable=True, help="JSON van de referentierun"
+    ),
+    new: Path = typer.Argument(  # noqa: B008
+        ..., exists=True, readable=True, help="JSON van de nieuwe run"
+    ),
+    threshold: float = typer.Option(
+        10.0, help="Achteruitgang (%) vanaf waar het commando faalt"
+    ),
+) -> None:
+    """Compare two suite runs and fail on a regression beyond the threshold."""
+    from dcs.bench.suite import compare_runs
+
+    rows = compare_runs(
+        json.loads(old.read_text(encoding="utf-8")),
+        json.loads(new.read_text(encoding="utf-8")),
+    )
+    _print_rows("\n⏱️ Vergelijking (gain > 0 is sneller)", rows)
+    if any(row["gain"] < -threshold for row in rows):
+        raise typer.Exit(1)
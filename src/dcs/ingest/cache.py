@@ -0,0 +1,104 @@
+import json
+import sqlite3
+from collections.abc import Iterable, Sequence
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from dcs.utils.metrics import counter
+
+CLEAN_CACHE_LOOKUPS = counter(
+    "dcs_clean_cache_lookups_total", "Clean cache lookups by result", ("result",)
+)
+
+
+class CleanCache:
+    """Cleaned records of earlier runs, in SQLite, keyed on a content hash.
+
+    The keys read or written in a run are remembered, so `evict` can drop
+    whatever the run did not see; lookups never write. Writes are committed
+    per batch, so an interrupted run keeps what it cleaned.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Open or create the cache at `path`."""
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records "
+            "(key BLOB PRIMARY KEY, product TEXT NOT NULL)"
+        )
+        self._seen: set[bytes] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached records."""
+        (count,) = self._db.execute("SELECT COUNT(*) FROM records").fetchone()
+        return int(count)
+
+    def get_many(self, keys: Sequence[bytes]) -> dict[bytes, dict[str, Any]]:
+        """Return the cached records among `keys` and mark them as seen."""
+        if not keys:
+            return {}
+        self._seen.update(keys)
+        marks = ",".join("?" * len(keys))
+        rows = self._db.execute(
+            f"SELECT key, product FROM records WHERE key IN ({marks})", keys
+        ).fetchall()
+        found = {bytes(key): json.loads(product) for key, product in rows}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        CLEAN_CACHE_LOOKUPS.inc(len(found), result="hit")
+        CLEAN_CACHE_LOOKUPS.inc(len(keys) - len(found), result="miss")
+        return found
+
+    def put_many(self, records: Iterable[tuple[bytes, dict[str, Any]]]) -> None:
+        """Store cleaned records under their keys."""
+        rows = [
+            (key, json.dumps(record, ensure_ascii=False)) for key, record in records
+        ]
+        self._seen.update(key for key, _ in rows)
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records (key, product) VALUES (?, ?)", rows
+            )
+
+    def evict(self) -> int:
+        """Drop the records this run did not see and return how many."""
+        with self._db:
+            self._db.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS seen (key BLOB PRIMARY KEY)"
+            )
+            self._db.execute("DELETE FROM seen")
+            self._db.executemany(
+                "INSERT INTO seen (key) VALUES (?)", [(key,) for key in self._seen]
+            )
+            deleted = self._db.execute(
+                "DELETE FROM records WHERE key NOT IN (SELECT key FROM seen)"
+            ).rowcount
+        return int(deleted)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self) -> Self:
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the database."""
+        self.close()
+
+    def summary(self) -> str:
+        """Return a one-line, human readable summary of this run."""
+        return f"🗃️ {self.hits} records uit de cache, {self.misses} opgeschoond"
@@ -1,20 +1,54 @@
+import hashlib
 import json
 import random
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from itertools import islice
 from pathlib import Path
 from typing import Any
 
 from rich.console import Console
 from rich.progress import track
 
+from dcs.ingest.cache import CleanCache
 from dcs.models.product import Product, VoorwaardeType
-from dcs.utils.config import CLEANED_DIR, RAW_DIR
+from dcs.models.store import ProductWriter
+from dcs.utils.config import CLEAN_CACHE_FILE, CLEANED_DIR, RAW_DIR, RAW_FILE
+from dcs.utils.metrics import HistogramState, Labels, counter, gauge, histogram
 from dcs.utils.string_utils import strip_html
 
 console = Console()
 
+CHUNK_SIZE = 500
+# Part of every clean cache key: bump it when `_clean_content` changes its output
+CLEANER_VERSION = 2
 
-def clean_item(raw: dict[str, Any], index: int) -> Product:
-    """Clean a single raw Dienstencatalogus record into a normalized Product."""
+STRIP_HTML_SECONDS = histogram(
+    "dcs_clean_strip_html_seconds",
+    "Time to strip the HTML of one omschrijving",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+)
+CLEANED_RECORDS = counter("dcs_clean_records_total", "Records cleaned")
+CLEAN_RATE = gauge(
+    "dcs_clean_records_per_second", "Cleaning throughput of the last clean run"
+)
+
+# Cleaned records of a pool chunk with the timings observed in the worker
+ChunkResult = tuple[list[dict[str, Any]], dict[Labels, HistogramState]]
+
+
+def _clean_content(
+    raw: dict[str, Any], timings: list[float] | None = None
+) -> dict[str, Any]:
+    """Clean the fields of a raw record that depend on nothing but the record.
+
+    This is the work the clean cache saves; `_add_voorwaarden` completes the
+    product. The seconds spent stripping HTML are appended to `timings`.
+    """
     product = raw.get("product", {})
     ipdc = product.get("ipdcProduct", {})
 
@@ -22,7 +56,10 @@ def clean_item(raw: dict[str, Any], index: int) -> Product:
     naam = product.get("naam")
     type_ = product.get("type")
     omschrijving = product.get("omschrijving", "")
+    start = time.perf_counter()
     omschrijving_clean = strip_html(omschrijving)
+    if timings is not None:
+        timings.append(time.perf_counter() - start)
 
     # Thema
     themas_raw = product.get("themas", {}).get("elementen", [])
@@ -36,17 +73,33 @@ def clean_item(raw: dict[str, Any], index: int) -> Product:
     metadata = product.get("metadata", {})
     laatste_wijzigingsdatum = metadata.get("laatsteWijzigingsdatum", "")[:10]
 
-    # Voorwaarden
+    return Product(
+        id=id_,
+        naam=naam,
+        type=type_,
+        omschrijving=omschrijving,
+        omschrijving_clean=omschrijving_clean,
+        themas=themas,
+        toepassingsgebied=toepassingsgebied,
+        laatste_wijzigingsdatum=laatste_wijzigingsdatum,
+    ).model_dump(exclude={"voorwaarden", "match"})
+
+
+def _add_voorwaarden(
+    content: dict[str, Any], index: int, rng: random.Random | None = None
+) -> dict[str, Any]:
+    """Add the voorwaarden and match, which depend on the index and `rng`."""
     voorwaarden: list[VoorwaardeType] = []
 
-    if toepassingsgebied:
-        voorwaarden.append({"regio": [toepassingsgebied]})
+    if content["toepassingsgebied"]:
+        voorwaarden.append({"regio": [content["toepassingsgebied"]]})
 
-    if themas:
-        voorwaarden.append({"thema": themas})
+    if content["themas"]:
+        voorwaarden.append({"thema": list(content["themas"])})
 
     vorm_options = [["VZW"], ["Vereniging"], ["Vereniging", "VZW"]]
-    voorwaarden.append({"vorm": random.choice(vorm_options)})  # noqa: S311
+    choice = rng.choice if rng else random.choice
+    voorwaarden.append({"vorm": choice(vorm_options)})
 
     # Extra filters for test cases
     if (index - 10) % 500 == 0:
@@ -55,42 +108,229 @@ def clean_item(raw: dict[str, Any], index: int) -> Product:
     if (index - 15) % 200 == 0:
         voorwaarden.append({"vereniging": ["Joris Zwanzeleer"]})
 
-    return Product(
-        id=id_,
-        naam=naam,
-        type=type_,
-        omschrijving=omschrijving,
-        omschrijving_clean=omschrijving_clean,
-        themas=themas,
-        toepassingsgebied=toepassingsgebied,
-        laatste_wijzigingsdatum=laatste_wijzigingsdatum,
-        voorwaarden=voorwaarden,
-        match=compute_match(voorwaarden),
-    )
+    return {**content, "voorwaarden": voorwaarden, "match": compute_match(voorwaarden)}
 
 
-def clean_all(output_file: Path) -> None:
-    """Clean all raw Dienstencatalogus records into a single JSON file."""
-    CLEANED_DIR.mkdir(parents=True, exist_ok=True)
-    raw_files = sorted(RAW_DIR.glob("aangeboden-producten__*.json"))
-    if not raw_files:
-        console.print("[red]❌ No raw files found[/red]")
+def clean_item(
+    raw: dict[str, Any],
+    index: int,
+    rng: random.Random | None = None,
+    timings: list[float] | None = None,
+) -> Product:
+    """Clean a single raw Dienstencatalogus record into a normalized Product.
+
+    `rng` drives the random `vorm` assignment; pass a seeded generator for
+    reproducible output. The seconds spent stripping HTML are appended to
+    `timings` when given.
+    """
+    return Product(**_add_voorwaarden(_clean_content(raw, timings), index, rng))
+
+
+def _rng(seed: int | None, index: int) -> random.Random | None:
+    """Return the generator of the record at `index`, derived from the seed.
+
+    Every record gets its own, so the output does not depend on how records
+    are chunked or which of them came from the cache.
+    """
+    return random.Random(f"{seed}:{index}") if seed is not None else None  # noqa: S311
+
+
+def cache_key(raw: dict[str, Any]) -> bytes:
+    """Return the key of the cleaned content of `raw` in the clean cache.
+
+    The key covers the record and, through `CLEANER_VERSION`, the cleaner.
+    It does not depend on where the record is in the catalogue: the index-
+    and seed-dependent voorwaarden are added after the lookup.
+    """
+    payload = json.dumps(raw, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.blake2b(payload.encode(), digest_size=16)
+    digest.update(f"{CLEANER_VERSION}".encode())
+    return digest.digest()
+
+
+def _clean_chunk(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Clean the content of a chunk of records."""
+    timings: list[float] = []
+    cleaned = [_clean_content(record, timings) for record in records]
+    STRIP_HTML_SECONDS.observe_many(timings)
+    return cleaned
+
+
+def _clean_chunk_in_worker(records: list[dict[str, Any]]) -> ChunkResult:
+    """Clean a chunk in a pool process and ship its timings back."""
+    return _clean_chunk(records), STRIP_HTML_SECONDS.drain()
+
+
+def _collect(future: Future[ChunkResult]) -> list[dict[str, Any]]:
+    """Return the records of a worker chunk and merge its timings."""
+    records, states = future.result()
+    STRIP_HTML_SECONDS.merge(states)
+    return records
+
+
+def _chunked(
+    records: Iterable[dict[str, Any]], size: int
+) -> Iterator[list[tuple[int, dict[str, Any]]]]:
+    """Split records into lists of `size`, each record paired with its index."""
+    iterator = enumerate(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@dataclass
+class _Chunk:
+    """A chunk of input: its records, those to clean and those in the cache."""
+
+    items: list[tuple[int, dict[str, Any]]]
+    misses: list[dict[str, Any]]
+    keys: list[bytes] = field(default_factory=list)
+    found: dict[bytes, dict[str, Any]] = field(default_factory=dict)
+
+
+def _look_up(
+    chunks: Iterable[list[tuple[int, dict[str, Any]]]], cache: CleanCache | None
+) -> Iterator[_Chunk]:
+    """Leave only the records that are not cached to be cleaned."""
+    for chunk in chunks:
+        if cache is None:
+            yield _Chunk(chunk, [record for _, record in chunk])
+            continue
+        keys = [cache_key(record) for _, record in chunk]
+        found = cache.get_many(keys)
+        misses = [
+            record
+            for key, (_, record) in zip(keys, chunk, strict=True)
+            if key not in found
+        ]
+        yield _Chunk(chunk, misses, keys, found)
+
+
+def _merge(
+    chunk: _Chunk,
+    cleaned: list[dict[str, Any]],
+    seed: int | None,
+    cache: CleanCache | None,
+) -> list[dict[str, Any]]:
+    """Put the fresh content between the cached content and cache it.
+
+    Every record is then completed with its voorwaarden.
+    """
+    contents = cleaned
+    if cache is not None:
+        fresh = iter(cleaned)
+        contents = []
+        new = []
+        for key in chunk.keys:
+            content = chunk.found.get(key)
+            if content is None:
+                content = next(fresh)
+                new.append((key, content))
+            contents.append(content)
+        cache.put_many(new)
+    return [
+        _add_voorwaarden(content, index, _rng(seed, index))
+        for (index, _), content in zip(chunk.items, contents, strict=True)
+    ]
+
+
+def clean_records(
+    records: Iterable[dict[str, Any]],
+    *,
+    workers: int = 1,
+    seed: int | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    cache: CleanCache | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Clean raw records, yielding cleaned dicts in input order.
+
+    With more than one worker, chunks of `chunk_size` records are cleaned in a
+    process pool. At most two chunks per worker are in flight at any time.
+    With a `cache`, only records whose content is not in it are cleaned; the
+    voorwaarden, which depend on the position of a record and the seed, are
+    always added afresh.
+    """
+    chunks = _look_up(_chunked(records, chunk_size), cache)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from _merge(chunk, _clean_chunk(chunk.misses), seed, cache)
         return
 
-    all_items = []
-    i = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque[tuple[_Chunk, Future[ChunkResult] | None]] = deque()
+        for chunk in chunks:
+            future = (
+                pool.submit(_clean_chunk_in_worker, chunk.misses)
+                if chunk.misses
+                else None
+            )
+            pending.append((chunk, future))
+            if len(pending) >= 2 * workers:
+                done, future = pending.popleft()
+                cleaned = _collect(future) if future else []
+                yield from _merge(done, cleaned, seed, cache)
+        while pending:
+            done, future = pending.popleft()
+            cleaned = _collect(future) if future else []
+            yield from _merge(done, cleaned, seed, cache)
+
+
+def _iter_raw_records(raw_files: list[Path]) -> Iterator[dict[str, Any]]:
+    """Yield raw records from each file in turn."""
     for path in track(raw_files, description="Cleaning..."):
         with path.open(encoding="utf-8") as f:
-            raw_records = json.load(f)
-            for record in raw_records:
-                item = clean_item(record, i)
-                all_items.append(item.model_dump())
-                i += 1
+            yield from json.load(f)
+
+
+def raw_files() -> list[Path]:
+    """Return the raw snapshot written by `fetch`.
+
+    Without one, the paged `aangeboden-producten__*.json` files of older
+    fetches are cleaned instead. Incremental delta files are never included:
+    they repeat products of the snapshot.
+    """
+    if RAW_FILE.exists():
+        return [RAW_FILE]
+    return sorted(RAW_DIR.glob(f"{RAW_FILE.stem}__*.json"))
+
+
+def clean_all(
+    output_file: Path,
+    workers: int = 1,
+    seed: int | None = None,
+    cache_file: Path | None = CLEAN_CACHE_FILE,
+) -> None:
+    """Clean all raw Dienstencatalogus records into a single file.
+
+    Records are written as they are produced. A `.ndjson`/`.jsonl` output gets
+    one product per line plus an offset index; any other suffix gets a JSON
+    array. Records cleaned before are read from the cache at `cache_file`;
+    afterwards it only keeps the records of this run. Pass None to clean
+    everything.
+    """
+    CLEANED_DIR.mkdir(parents=True, exist_ok=True)
+    files = raw_files()
+    if not files:
+        console.print("[red]❌ No raw files found[/red]")
+        return
 
-    with output_file.open("w", encoding="utf-8") as f:
-        json.dump(all_items, f, indent=2, ensure_ascii=False)
+    start = time.perf_counter()
+    with (
+        CleanCache(cache_file) if cache_file else nullcontext() as cache,
+        ProductWriter(output_file) as writer,
+    ):
+        writer.write_all(
+            clean_records(
+                _iter_raw_records(files), workers=workers, seed=seed, cache=cache
+            )
+        )
+        if cache:
+            cache.evict()
+            console.print(cache.summary())
+    seconds = time.perf_counter() - start
+    CLEANED_RECORDS.inc(writer.count)
+    CLEAN_RATE.set(writer.count / seconds if seconds else 0.0)
 
-    console.print(f"✅ Saved {len(all_items)} cleaned records to {output_file}")
+    console.print(f"✅ Saved {writer.count} cleaned records to {output_file}")
 
 
 def compute_match(voorwaarden: list[VoorwaardeType]) -> str:
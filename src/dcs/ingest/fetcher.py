@@ -1,50 +1,144 @@
 import asyncio
 import json
+import random
+import time
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 from typing import Any
 
 import httpx
 from rich.console import Console
 from rich.progress import Progress
 
-from dcs.utils.config import BASE_URL, RAW_DIR, RAW_FILE
+from dcs.utils.config import BASE_URL, RAW_DIR, RAW_FILE, WATERMARK_FILE
+from dcs.utils.metrics import histogram
 
 console = Console()
 
+FETCH_PAGE_SECONDS = histogram(
+    "dcs_fetch_page_seconds",
+    "Latency of one page request to the CMS, per HTTP status or timeout",
+    ("status",),
+)
 
-async def fetch_page(
-    client: httpx.AsyncClient, page: int, per_page: int
+HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "Referer": "https://www.verenigingsloket.be/",
+    "User-Agent": "Mozilla/5.0 (compatible; DataCollector/1.0)",
+}
+
+
+class RateLimiter:
+    """Space out requests so that at most `rate` of them start per second."""
+
+    def __init__(self, rate: float | None) -> None:
+        """Initialize the limiter; a falsy rate disables limiting."""
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Block until the next request slot is available."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Return the seconds a `Retry-After` header asks to wait, if it has any."""
+    value = response.headers.get("Retry-After", "")
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when: datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max((when - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+async def fetch_page(  # noqa: PLR0913
+    client: httpx.AsyncClient,
+    page: int,
+    per_page: int,
+    *,
+    retries: int = 0,
+    backoff: float = 0.5,
+    base_url: str = BASE_URL,
 ) -> list[dict[str, Any]]:
-    """Fetch a single paginated page of records from Verenigingsloket CMS."""
+    """Fetch a single paginated page of records from Verenigingsloket CMS.
+
+    Transport errors (timeouts, refused or reset connections, broken
+    responses), server errors (5xx) and rate limiting (429) are retried up to
+    `retries` times with exponential backoff before the last error is raised.
+    A 429 waits at least as long as its `Retry-After` header asks.
+    """
     params = {
         "index": str(page),
         "limiet": str(per_page),
         "sorteeroptie": "last-changed",
         "_format": "json",
     }
-    headers = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Referer": "https://www.verenigingsloket.be/",
-        "User-Agent": "Mozilla/5.0 (compatible; DataCollector/1.0)",
-    }
 
-    response = await client.get(BASE_URL, params=params, headers=headers)
-    console.print(f"🔍 Page {page} → Status {response.status_code}")
-    data = response.json()
-    return data.get("inhoud", {}).get("elementen", [])  # type: ignore  # noqa: PGH003
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        wait = 0.0
+        try:
+            response = await client.get(base_url, params=params, headers=HEADERS)
+        except httpx.TransportError as e:
+            status = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+            FETCH_PAGE_SECONDS.observe(time.perf_counter() - start, status=status)
+            if attempt >= retries:
+                raise
+            console.print(f"⏳ Page {page} → {type(e).__name__}")
+        else:
+            FETCH_PAGE_SECONDS.observe(
+                time.perf_counter() - start, status=response.status_code
+            )
+            console.print(f"🔍 Page {page} → Status {response.status_code}")
+            rate_limited = response.status_code == httpx.codes.TOO_MANY_REQUESTS
+            if not (response.is_server_error or rate_limited) or attempt >= retries:
+                response.raise_for_status()
+                data = response.json()
+                return data.get("inhoud", {}).get("elementen", [])  # type: ignore  # noqa: PGH003
+            if rate_limited:
+                wait = retry_after(response) or 0.0
+
+        # Exponential backoff with jitter so parallel retries don't line up
+        await asyncio.sleep(
+            max(wait, backoff * 2**attempt * random.uniform(1, 1.5))  # noqa: S311
+        )
+        attempt += 1
 
 
 async def fetch_all(
-    max_pages: int, per_page: int, start_at: int
+    max_pages: int,
+    per_page: int,
+    start_at: int,
+    *,
+    retries: int = 0,
+    rate_limit: float | None = None,
 ) -> list[dict[str, Any]]:
-    """Fetch multiple pages of records from Verenigingsloket CMS."""
+    """Fetch multiple pages of records from Verenigingsloket CMS, one by one."""
     all_items = []
+    limiter = RateLimiter(rate_limit)
     async with httpx.AsyncClient(timeout=30.0) as client:
         with Progress() as progress:
             task = progress.add_task("Fetching pages...", total=max_pages)
             for i in range(max_pages):
                 page = start_at + i
-                items = await fetch_page(client, page, per_page)
+                await limiter.wait()
+                items = await fetch_page(client, page, per_page, retries=retries)
                 if not items:
                     console.print(f"✅ No more items at page {page}")
                     break
@@ -53,10 +147,225 @@ async def fetch_all(
     return all_items
 
 
-def fetch(max_pages: int, per_page: int, start_at: int) -> None:
-    """Fetch Dienstencatalogus data and save to /data/raw as JSON."""
+async def fetch_all_concurrent(  # noqa: PLR0913
+    max_pages: int,
+    per_page: int,
+    start_at: int,
+    *,
+    concurrency: int = 8,
+    retries: int = 3,
+    rate_limit: float | None = None,
+    base_url: str = BASE_URL,
+) -> list[dict[str, Any]]:
+    """Fetch pages with up to `concurrency` requests in flight.
+
+    All requests share one pooled keep-alive client. The first empty page
+    marks the end of the catalogue: requests for later pages are cancelled and
+    their results discarded. Items are returned in page order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate_limit)
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    pages = range(start_at, start_at + max_pages)
+    end_page = pages.stop
+    tasks: dict[int, asyncio.Task[list[dict[str, Any]]]] = {}
+
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        with Progress() as progress:
+            progress_task = progress.add_task("Fetching pages...", total=max_pages)
+
+            async def fetch_one(page: int) -> list[dict[str, Any]]:
+                nonlocal end_page
+                async with semaphore:
+                    if page >= end_page:
+                        return []
+                    await limiter.wait()
+                    items = await fetch_page(
+                        client, page, per_page, retries=retries, base_url=base_url
+                    )
+                progress.update(progress_task, advance=1)
+                if not items and page < end_page:
+                    console.print(f"✅ No more items at page {page}")
+                    end_page = page
+                    for later, task in tasks.items():
+                        if later > page:
+                            task.cancel()
+                return items
+
+            tasks.update({page: asyncio.create_task(fetch_one(page)) for page in pages})
+            try:
+                done, _ = await asyncio.wait(
+                    tasks.values(), return_when=asyncio.FIRST_EXCEPTION
+                )
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+
+    return _collect_pages(tasks, done, end_page)
+
+
+def _collect_pages(
+    tasks: dict[int, asyncio.Task[list[dict[str, Any]]]],
+    done: set[asyncio.Task[list[dict[str, Any]]]],
+    end_page: int,
+) -> list[dict[str, Any]]:
+    """Concatenate the items of all pages before `end_page` in page order."""
+    for task in done:
+        if not task.cancelled() and (exc := task.exception()) is not None:
+            raise exc
+
+    all_items = []
+    for page, task in sorted(tasks.items()):
+        if page >= end_page:
+            break
+        all_items.extend(task.result())
+    return all_items
+
+
+def _parse_date(value: str) -> datetime:
+    """Parse an ISO date, treating naive values as UTC so they stay comparable."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def changed_at(record: dict[str, Any]) -> datetime | None:
+    """Return the `laatsteWijzigingsdatum` of a raw record, if present."""
+    value = record.get("product", {}).get("metadata", {}).get("laatsteWijzigingsdatum")
+    return _parse_date(value) if value else None
+
+
+def load_watermark() -> datetime | None:
+    """Load the newest change date seen by a previous fetch, if any."""
+    if not WATERMARK_FILE.exists():
+        return None
+    with WATERMARK_FILE.open(encoding="utf-8") as f:
+        return _parse_date(json.load(f)["laatsteWijzigingsdatum"])
+
+
+def save_watermark(items: list[dict[str, Any]], previous: datetime | None) -> None:
+    """Persist the newest change date among `items` (or keep `previous`)."""
+    dates = [d for d in map(changed_at, items) if d is not None]
+    if previous is not None:
+        dates.append(previous)
+    if not dates:
+        return
+    with WATERMARK_FILE.open("w", encoding="utf-8") as f:
+        json.dump({"laatsteWijzigingsdatum": max(dates).isoformat()}, f)
+
+
+async def fetch_changed_since(  # noqa: PLR0913
+    watermark: datetime,
+    max_pages: int,
+    per_page: int,
+    start_at: int,
+    *,
+    concurrency: int = 1,
+    retries: int = 0,
+    rate_limit: float | None = None,
+) -> tuple[list[dict[str, Any]], bool]:
+    """Fetch records changed after `watermark`.
+
+    Pages are requested in `last-changed` order (newest first), so paging stops
+    at the first record that is not newer than the watermark. Pages are
+    fetched in windows of `concurrency`; pages of a window past the watermark
+    are discarded. Also returns whether the watermark or an empty page was
+    reached: if `max_pages` ran out first, older changes may still be
+    unfetched.
+    """
+    limiter = RateLimiter(rate_limit)
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    pages = range(start_at, start_at + max_pages)
+    changed: list[dict[str, Any]] = []
+
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+
+        async def fetch_one(page: int) -> list[dict[str, Any]]:
+            await limiter.wait()
+            return await fetch_page(client, page, per_page, retries=retries)
+
+        for first in range(0, len(pages), concurrency):
+            window = pages[first : first + concurrency]
+            results = await asyncio.gather(*map(fetch_one, window))
+            for page, items in zip(window, results, strict=True):
+                for item in items:
+                    date = changed_at(item)
+                    if date is not None and date <= watermark:
+                        console.print(f"✅ Reached watermark at page {page}")
+                        return changed, True
+                    changed.append(item)
+                if not items:
+                    return changed, True
+    return changed, False
+
+
+def fetch(  # noqa: PLR0913
+    max_pages: int,
+    per_page: int,
+    start_at: int,
+    *,
+    concurrency: int = 1,
+    retries: int = 0,
+    rate_limit: float | None = None,
+    incremental: bool = False,
+) -> None:
+    """Fetch Dienstencatalogus data and save to /data/raw as JSON.
+
+    In incremental mode only records changed since the stored watermark are
+    fetched and written to a timestamped delta file next to `RAW_FILE`. Without
+    a watermark an incremental fetch falls back to a full snapshot. The
+    watermark only moves once every change since it was fetched, and no delta
+    file is written when nothing changed.
+    """
     RAW_DIR.mkdir(parents=True, exist_ok=True)
-    all_items = asyncio.run(fetch_all(max_pages, per_page, start_at))
+    watermark = load_watermark()
+    if incremental and watermark is not None:
+        changed, reached = asyncio.run(
+            fetch_changed_since(
+                watermark,
+                max_pages,
+                per_page,
+                start_at,
+                concurrency=concurrency,
+                retries=retries,
+                rate_limit=rate_limit,
+            )
+        )
+        if changed:
+            stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+            delta_file = RAW_FILE.with_name(f"{RAW_FILE.stem}.delta-{stamp}.json")
+            with delta_file.open("w", encoding="utf-8") as f:
+                json.dump(changed, f, indent=2, ensure_ascii=False)
+            console.print(f"✅ Saved {len(changed)} changed items to {delta_file}")
+        else:
+            console.print("✅ No changes since the watermark")
+        if reached:
+            save_watermark(changed, watermark)
+        else:
+            console.print(
+                f"⚠️ Watermark not reached within {max_pages} pages; "
+                "it stays at its previous value"
+            )
+        return
+
+    if concurrency > 1:
+        coro = fetch_all_concurrent(
+            max_pages,
+            per_page,
+            start_at,
+            concurrency=concurrency,
+            retries=retries,
+            rate_limit=rate_limit,
+        )
+    else:
+        coro = fetch_all(
+            max_pages, per_page, start_at, retries=retries, rate_limit=rate_limit
+        )
+    all_items = asyncio.run(coro)
     with RAW_FILE.open("w", encoding="utf-8") as f:
         json.dump(all_items, f, indent=2, ensure_ascii=False)
+    save_watermark(all_items, None)
     console.print(f"✅ Saved {len(all_items)} items to {RAW_FILE}")
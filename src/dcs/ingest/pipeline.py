@@ -0,0 +1,374 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Self
+
+import httpx
+from rich.console import Console
+
+from dcs.ingest.cache import CleanCache
+from dcs.ingest.cleaner import clean_records
+from dcs.ingest.fetcher import RateLimiter, changed_at, fetch_page, save_watermark
+from dcs.lexicalsearch.bulk import BulkOptions, BulkReport
+from dcs.lexicalsearch.es_client import get_client
+from dcs.lexicalsearch.incremental import IndexDiff, diff_actions, indexed_hashes
+from dcs.lexicalsearch.index import create_index, index_actions
+from dcs.lexicalsearch.suggest import build_suggestions
+from dcs.models.product import Product
+from dcs.models.store import ProductWriter, temp_path
+from dcs.utils.config import BASE_URL, CLEAN_CACHE_FILE, RAW_DIR
+from dcs.utils.metrics import histogram
+
+if TYPE_CHECKING:
+    from datetime import datetime
+
+console = Console()
+
+SYNC_WAIT_SECONDS = histogram(
+    "dcs_sync_wait_seconds",
+    "Time a sync stage waited on the page queue: fetch when it was full, "
+    "clean when it was empty",
+    ("stage",),
+)
+
+# Seconds between checks whether the other side of the queue gave up
+_POLL = 0.1
+
+
+class FetchFailedError(RuntimeError):
+    """Raised in the clean stage when fetching pages failed."""
+
+    def __init__(self) -> None:
+        """Initialize the error; the fetch error is its cause."""
+        super().__init__("Fetching pages failed; nothing was deleted")
+
+
+class _Stopped(Exception):  # noqa: N818
+    """The clean stage stopped consuming pages."""
+
+
+@dataclass
+class SyncOptions:
+    """Tuning knobs of the fetch and clean stages of `sync`."""
+
+    max_pages: int = 50
+    per_page: int = 100
+    start_at: int = 1
+    concurrency: int = 4
+    retries: int = 3
+    rate_limit: float | None = None
+    workers: int = 1
+    seed: int | None = None
+    queue_size: int = 8
+    base_url: str = BASE_URL
+    cache_file: Path | None = CLEAN_CACHE_FILE
+
+
+@dataclass
+class _End:
+    """Last item on the page queue: whether the catalogue was fetched entirely."""
+
+    complete: bool
+
+
+@dataclass
+class _Failed:
+    """Last item on the page queue when fetching raised."""
+
+    error: BaseException
+
+
+@dataclass
+class SyncReport:
+    """Outcome of a sync run."""
+
+    pages: int = 0
+    records: int = 0
+    complete: bool = False
+    diff: IndexDiff = field(default_factory=IndexDiff)
+    bulk: BulkReport = field(default_factory=BulkReport)
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        """Return a one-line, human readable summary."""
+        scope = "volledig" if self.complete else "gedeeltelijk"
+        return (
+            f"🔄 {self.pages} pagina's, {self.records} records ({scope}) "
+            f"in {self.seconds:.1f}s; {self.diff.summary()}"
+        )
+
+
+class _RawTee:
+    """Write raw records as they stream by, as a JSON array like `RAW_FILE`.
+
+    Like `ProductWriter`, records go to a temporary file that only replaces
+    `path` when the sync does not fail.
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        """Open `path` for writing; without a path nothing is written."""
+        self.path = path
+        self._f = temp_path(path).open("w", encoding="utf-8") if path else None
+        self._count = 0
+        if self._f:
+            self._f.write("[")
+
+    def write(self, records: Iterable[dict[str, Any]]) -> None:
+        """Append `records`."""
+        if self._f is None:
+            return
+        for record in records:
+            self._f.write(",\n" if self._count else "\n")
+            json.dump(record, self._f, ensure_ascii=False)
+            self._count += 1
+
+    def __enter__(self) -> Self:
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the array and the file, or drop it when an error is raised."""
+        if self._f is None or self.path is None:
+            return
+        if exc_type is not None:
+            self._f.close()
+            temp_path(self.path).unlink(missing_ok=True)
+            return
+        self._f.write("\n]" if self._count else "]")
+        self._f.close()
+        temp_path(self.path).replace(self.path)
+
+
+def _put(pages: queue.Queue[Any], item: object, stop: threading.Event) -> None:
+    """Put `item` on the queue, blocking while it is full, until `stop`."""
+    start = time.perf_counter()
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=_POLL)
+        except queue.Full:
+            continue
+        SYNC_WAIT_SECONDS.observe(time.perf_counter() - start, stage="fetch")
+        return
+    raise _Stopped
+
+
+async def _fetch_pages(
+    pages: queue.Queue[Any], options: SyncOptions, stop: threading.Event
+) -> bool:
+    """Fetch pages in order onto `pages`, with `concurrency` requests in flight.
+
+    Returns whether an empty page marked the end of the catalogue. A full
+    queue pauses fetching: at most `concurrency` pages are held here and
+    `queue_size` pages wait in the queue.
+    """
+    limiter = RateLimiter(options.rate_limit)
+    limits = httpx.Limits(
+        max_connections=options.concurrency,
+        max_keepalive_connections=options.concurrency,
+    )
+    end = options.start_at + options.max_pages
+    window: deque[asyncio.Task[list[dict[str, Any]]]] = deque()
+
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+
+        async def fetch_one(page: int) -> list[dict[str, Any]]:
+            await limiter.wait()
+            return await fetch_page(
+                client,
+                page,
+                options.per_page,
+                retries=options.retries,
+                base_url=options.base_url,
+            )
+
+        next_page = options.start_at
+        try:
+            while True:
+                while len(window) < options.concurrency and next_page < end:
+                    window.append(asyncio.create_task(fetch_one(next_page)))
+                    next_page += 1
+                if not window:
+                    return False
+                items = await window.popleft()
+                if not items:
+                    return True
+                await asyncio.to_thread(_put, pages, items, stop)
+        finally:
+            for task in window:
+                task.cancel()
+
+
+def _fetch_stage(
+    pages: queue.Queue[Any], options: SyncOptions, stop: threading.Event
+) -> None:
+    """Run the fetch stage on its own event loop and end the queue.
+
+    The queue ends with `_Failed` when fetching raised, so the clean stage
+    never waits forever; nothing is put once the clean stage stopped.
+    """
+    end: _End | _Failed
+    try:
+        end = _End(asyncio.run(_fetch_pages(pages, options, stop)))
+    except _Stopped:
+        return
+    except Exception as e:  # noqa: BLE001
+        end = _Failed(e)
+    with suppress(_Stopped):
+        _put(pages, end, stop)
+
+
+class _PageStream:
+    """The clean-stage end of the page queue: raw records, in page order."""
+
+    def __init__(self, pages: queue.Queue[Any], tee: _RawTee) -> None:
+        """Read from `pages`, copying every record to `tee`."""
+        self.pages = pages
+        self.tee = tee
+        self.count = 0
+        self.records = 0
+        self.complete = False
+        self.newest: datetime | None = None
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Yield raw records until the fetch stage ends the queue."""
+        while True:
+            start = time.perf_counter()
+            item = self.pages.get()
+            SYNC_WAIT_SECONDS.observe(time.perf_counter() - start, stage="clean")
+            if isinstance(item, _Failed):
+                raise FetchFailedError from item.error
+            if isinstance(item, _End):
+                self.complete = item.complete
+                return
+            self.count += 1
+            self.records += len(item)
+            self.tee.write(item)
+            for record in item:
+                changed = changed_at(record)
+                if changed and (self.newest is None or changed > self.newest):
+                    self.newest = changed
+            yield from item
+
+
+def _products(
+    stream: _PageStream,
+    options: SyncOptions,
+    writer: ProductWriter,
+    cache: CleanCache | None,
+) -> Iterator[Product]:
+    """Clean the streamed records, copying them to `writer`."""
+    cleaned_records = clean_records(
+        stream, workers=options.workers, seed=options.seed, cache=cache
+    )
+    for cleaned in cleaned_records:
+        writer.write(cleaned)
+        yield Product(**cleaned)
+
+
+def _keep_unfetched(
+    actions: Iterable[dict[str, Any]], stream: _PageStream, diff: IndexDiff
+) -> Iterator[dict[str, Any]]:
+    """Drop the deletes of a partial fetch: unfetched products are not gone."""
+    for action in actions:
+        if action.get("_op_type") == "delete" and not stream.complete:
+            diff.deleted -= 1
+            continue
+        yield action
+
+
+def sync(  # noqa: PLR0913
+    index_name: str,
+    options: SyncOptions | None = None,
+    bulk_options: BulkOptions | None = None,
+    *,
+    tee: Path | None = None,
+    raw_tee: Path | None = None,
+    report_file: Path | None = None,
+) -> SyncReport:
+    """Fetch, clean and index the catalogue as one streaming pipeline.
+
+    Pages are fetched on an asyncio loop in a thread, cleaned as they arrive
+    and bulk indexed by the thread pool of `parallel_index`; the stages run
+    concurrently, so a sync takes as long as its slowest stage. The page
+    queue and the bulk pool are bounded, so memory does not grow with the
+    catalogue. Only added and changed products are sent. Vanished ones are
+    deleted once an empty page shows the whole catalogue was fetched.
+    Cleaned products are streamed to a file, from which the suggestions are
+    built once the whole catalogue was fetched.
+
+    `tee` keeps the cleaned products and `raw_tee` the raw records, in the
+    formats of `clean` and `fetch`, for auditing or a later `index`. Neither
+    replaces an existing file when the sync fails; a partial fetch leaves
+    `tee` untouched too.
+    """
+    options = options or SyncOptions()
+    report = SyncReport()
+    start = time.perf_counter()
+    client = get_client()
+    create_index(client, index_name=index_name)
+    existing = indexed_hashes(client, index_name)
+
+    pages: queue.Queue[Any] = queue.Queue(maxsize=options.queue_size)
+    stop = threading.Event()
+    fetcher = threading.Thread(
+        target=_fetch_stage, args=(pages, options, stop), name="dcs-sync-fetch"
+    )
+    with TemporaryDirectory() as tmp, _RawTee(raw_tee) as raw:
+        # Suggestions are built from this file afterwards, not kept in memory
+        cleaned_file = tee or Path(tmp) / "cleaned.ndjson"
+        stream = _PageStream(pages, raw)
+        fetcher.start()
+        try:
+            with (
+                ProductWriter(cleaned_file) as writer,
+                CleanCache(options.cache_file)
+                if options.cache_file
+                else nullcontext() as cache,
+            ):
+                products = _products(stream, options, writer, cache)
+                actions = diff_actions(products, existing, index_name, report.diff)
+                report.bulk = index_actions(
+                    client,
+                    index_name,
+                    _keep_unfetched(actions, stream, report.diff),
+                    bulk_options,
+                    report_file,
+                )
+                # After a partial fetch the records of unfetched pages are
+                # still current: keep them cached, and keep the previous tee,
+                # since an incremental index of a partial one deletes them
+                if cache and stream.complete:
+                    cache.evict()
+                if not stream.complete:
+                    writer.discard()
+        finally:
+            stop.set()
+            fetcher.join()
+        if stream.complete:
+            build_suggestions(cleaned_file, index_name)
+
+    report.pages = stream.count
+    report.records = stream.records
+    report.complete = stream.complete
+    report.seconds = time.perf_counter() - start
+    if stream.complete:
+        if stream.newest is not None:
+            RAW_DIR.mkdir(parents=True, exist_ok=True)
+            save_watermark([], stream.newest)
+    else:
+        console.print("⚠️ Catalogus niet volledig opgehaald: niets verwijderd")
+    return report
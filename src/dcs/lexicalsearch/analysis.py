@@ -0,0 +1,166 @@
+import re
+import unicodedata
+from functools import cache
+
+# Snowball Dutch stopword list, the same list as Elasticsearch's `_dutch_`.
+DUTCH_STOPWORDS = frozenset(
+    """
+    de en van ik te dat die in een hij het niet zijn is was op aan met als voor
+    had er maar om hem dan zou of wat mijn men dit zo door over ze zich bij ook
+    tot je mij uit der daar haar naar heb hoe heeft hebben deze u want nog zal
+    me zij nu ge geen omdat iets worden toch al waren veel meer doen toen moet
+    ben zonder kan hun dus alles onder ja eens hier wie werd altijd doch wordt
+    wezen kunnen ons zelf tegen na reeds wil kon niets uw iemand geweest andere
+    """.split()  # noqa: SIM905
+)
+
+# Synonym groups, shared with the `dutch_synonyms` filter of the index mapping
+SYNONYMS = ["toelating, vergunning", "subsidie, toelage"]
+
+_TOKEN_RE = re.compile(r"\w+")
+_VOWELS = frozenset("aeiouyè")
+_ACCENTS = str.maketrans("äëïöüáéíóú", "aeiouaeiou")
+
+
+def _is_vowel(word: str, i: int) -> bool:
+    return word[i] in _VOWELS
+
+
+def _region(word: str, start: int) -> int:
+    """Return the start of the region after the first non-vowel after a vowel."""
+    for i in range(start + 1, len(word)):
+        if not _is_vowel(word, i) and _is_vowel(word, i - 1):
+            return i + 1
+    return len(word)
+
+
+def _undouble(word: str) -> str:
+    return word[:-1] if word.endswith(("kk", "dd", "tt")) else word
+
+
+def _valid_en(word: str) -> bool:
+    """Whether an `en` suffix may be removed from `word` (the part before it)."""
+    return bool(word) and not _is_vowel(word, -1) and not word.endswith("gem")
+
+
+def _mark_consonants(word: str) -> str:
+    """Uppercase `y` and `i` where the algorithm treats them as consonants."""
+    chars = list(word)
+    if chars and chars[0] == "y":
+        chars[0] = "Y"
+    for i in range(1, len(chars)):
+        if chars[i] == "y" and chars[i - 1] in _VOWELS:
+            chars[i] = "Y"
+        elif (
+            chars[i] == "i"
+            and i + 1 < len(chars)
+            and chars[i - 1] in _VOWELS
+            and chars[i + 1] in _VOWELS
+        ):
+            chars[i] = "I"
+    return "".join(chars)
+
+
+@cache
+def stem(word: str) -> str:  # noqa: C901, PLR0912, PLR0915
+    """Stem a lowercase Dutch word with the Snowball Dutch algorithm."""
+    word = _mark_consonants(word.translate(_ACCENTS))
+    # R2 starts searching where R1 was found, before R1 is moved to 3 letters
+    r1_found = _region(word, 0)
+    r1 = max(r1_found, 3)
+    r2 = _region(word, r1_found)
+
+    # Step 1
+    if word.endswith("heden"):
+        if len(word) - 5 >= r1:
+            word = word[:-5] + "heid"
+    elif word.endswith(("ene", "en")):
+        size = 3 if word.endswith("ene") else 2
+        if len(word) - size >= r1 and _valid_en(word[:-size]):
+            word = _undouble(word[:-size])
+    elif word.endswith(("se", "s")):
+        size = 2 if word.endswith("se") else 1
+        rest = word[:-size]
+        # A valid s-ending is a non-vowel other than j
+        if len(word) - size >= r1 and rest and rest[-1] not in _VOWELS | {"j"}:
+            word = rest
+
+    # Step 2
+    e_found = False
+    if word.endswith("e") and len(word) - 1 >= r1:
+        rest = word[:-1]
+        if rest and not _is_vowel(rest, -1):
+            word = _undouble(rest)
+            e_found = True
+
+    # Step 3a
+    if word.endswith("heid") and len(word) - 4 >= r2 and not word.endswith("cheid"):
+        word = word[:-4]
+        if word.endswith("en") and len(word) - 2 >= r1 and _valid_en(word[:-2]):
+            word = _undouble(word[:-2])
+
+    # Step 3b
+    if word.endswith(("end", "ing")):
+        if len(word) - 3 >= r2:
+            word = word[:-3]
+            if word.endswith("ig") and len(word) - 2 >= r2 and word[-3:-2] != "e":
+                word = word[:-2]
+            else:
+                word = _undouble(word)
+    elif word.endswith("ig"):
+        if len(word) - 2 >= r2 and word[-3:-2] != "e":
+            word = word[:-2]
+    elif word.endswith("lijk"):
+        if len(word) - 4 >= r2:
+            word = word[:-4]
+            if word.endswith("e") and len(word) - 1 >= r1:
+                rest = word[:-1]
+                if rest and not _is_vowel(rest, -1):
+                    word = _undouble(rest)
+    elif word.endswith("baar"):
+        if len(word) - 4 >= r2:
+            word = word[:-4]
+    elif word.endswith("bar") and len(word) - 3 >= r2 and e_found:
+        word = word[:-3]
+
+    # Step 4: undouble a vowel in a final consonant-vowel-vowel-consonant
+    if len(word) >= 4:  # noqa: PLR2004
+        c, v1, v2, d = word[-4], word[-3], word[-2], word[-1]
+        if (
+            c not in _VOWELS
+            and v1 == v2
+            and v1 in "aeou"
+            and d not in _VOWELS
+            and d != "I"
+        ):
+            word = word[:-2] + d
+
+    return word.replace("I", "i").replace("Y", "y")
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase word tokens."""
+    return _TOKEN_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+
+def analyze(text: str) -> list[str]:
+    """Tokenize, drop Dutch stopwords and stem, like the `dutch_analyzer`."""
+    return [stem(t) for t in tokenize(text) if t not in DUTCH_STOPWORDS]
+
+
+@cache
+def _synonym_stems() -> dict[str, list[str]]:
+    """Map every stemmed synonym onto the stems of its whole group."""
+    groups = [[stem(w.strip()) for w in line.split(",")] for line in SYNONYMS]
+    return {s: group for group in groups for s in group}
+
+
+def expand_synonyms(stems: list[str]) -> list[str]:
+    """Add the synonyms of every stem, keeping order and dropping duplicates."""
+    expanded = [s for stem_ in stems for s in _synonym_stems().get(stem_, [stem_])]
+    return list(dict.fromkeys(expanded))
+
+
+def canonical_stem(stem_: str) -> str:
+    """Map a stem onto the first stem of its synonym group."""
+    return _synonym_stems().get(stem_, [stem_])[0]
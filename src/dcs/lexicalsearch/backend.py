@@ -0,0 +1,82 @@
+from pathlib import Path
+from typing import Any, Protocol, Unpack
+
+from dcs.lexicalsearch.es_client import get_client
+from dcs.lexicalsearch.memory import InMemoryIndex
+from dcs.lexicalsearch.rerank import (
+    RerankWeights,
+    rerank_search,
+    single_stage,
+    wants_rerank,
+)
+from dcs.lexicalsearch.search import SearchParams, search_diensten
+from dcs.utils.config import (
+    CLEANED_DIR,
+    RERANK_K,
+    RERANK_LEXICAL_WEIGHT,
+    RERANK_TIER_WEIGHT,
+)
+
+BACKENDS = ("elasticsearch", "memory")
+
+
+class UnknownBackendError(ValueError):
+    """Raised for a search backend that does not exist."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize the error for `name`."""
+        super().__init__(f"Unknown search backend: {name} (use {', '.join(BACKENDS)})")
+
+
+class SearchBackend(Protocol):
+    """Indexes cleaned products and answers diensten searches.
+
+    `search` takes the keyword arguments of `build_search_body` and returns
+    an Elasticsearch-shaped response, whichever engine is behind it.
+    """
+
+    def search(self, **params: Unpack[SearchParams]) -> dict[str, Any]:
+        """Search the diensten."""
+        ...
+
+    def index_file(self, file_path: Path) -> int:
+        """Index a cleaned product file and return the number of products."""
+        ...
+
+
+class ElasticsearchBackend:
+    """Search backend on an Elasticsearch index or alias."""
+
+    def __init__(self, ix: str = "diensten") -> None:
+        """Initialize the backend for index `ix`."""
+        self.ix = ix
+
+    def search(self, **params: Unpack[SearchParams]) -> dict[str, Any]:
+        """Search the index, in two stages when asked to re-rank."""
+        if wants_rerank(params):
+            weights = RerankWeights(
+                tier=RERANK_TIER_WEIGHT, lexical=RERANK_LEXICAL_WEIGHT
+            )
+            return rerank_search(get_client(), self.ix, RERANK_K, weights, **params)
+        return search_diensten(get_client(), self.ix, **single_stage(params))
+
+    def index_file(self, file_path: Path) -> int:
+        """Index the products with `index_all`."""
+        # The indexing stack is not needed to serve searches
+        from dcs.lexicalsearch.index import index_all
+
+        return index_all(self.ix, file_path).indexed
+
+
+def memory_index_path(ix: str) -> Path:
+    """Return where the in-memory backend persists index `ix`."""
+    return CLEANED_DIR / f"{ix}.index.json"
+
+
+def get_backend(name: str, ix: str = "diensten") -> SearchBackend:
+    """Return the search backend called `name` for index `ix`."""
+    if name == "elasticsearch":
+        return ElasticsearchBackend(ix)
+    if name == "memory":
+        return InMemoryIndex.open(memory_index_path(ix))
+    raise UnknownBackendError(name)
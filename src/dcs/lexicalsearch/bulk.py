@@ -0,0 +1,193 @@
+import json
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import streaming_bulk
+from rich.console import Console
+from rich.progress import (
+    Progress,
+    ProgressColumn,
+    SpinnerColumn,
+    Task,
+    TextColumn,
+    TimeElapsedColumn,
+)
+from rich.text import Text
+
+from dcs.utils.metrics import counter, histogram
+
+console = Console()
+
+BULK_CHUNK_SECONDS = histogram(
+    "dcs_bulk_chunk_seconds",
+    "Latency of sending one bulk chunk, including retries of rejections",
+)
+BULK_FAILURES = counter(
+    "dcs_bulk_failures_total",
+    "Documents that failed to index, per status (429: still rejected after retries)",
+    ("status",),
+)
+
+
+@dataclass
+class BulkOptions:
+    """Tuning knobs for the parallel bulk indexer."""
+
+    chunk_size: int = 500
+    max_chunk_bytes: int = 10 * 1024 * 1024
+    threads: int = 4
+    max_retries: int = 3
+    initial_backoff: float = 1.0
+
+
+@dataclass
+class BulkReport:
+    """Outcome of a bulk indexing run."""
+
+    indexed: int = 0
+    failed: list[dict[str, Any]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        """Average throughput over the whole run."""
+        return self.indexed / self.seconds if self.seconds else 0.0
+
+    def write(self, path: Path) -> None:
+        """Save the report, including every failed document id, as JSON."""
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "indexed": self.indexed,
+                    "failed_count": len(self.failed),
+                    "seconds": round(self.seconds, 3),
+                    "failed": self.failed,
+                },
+                f,
+                indent=2,
+                ensure_ascii=False,
+            )
+
+
+class DocsPerSecondColumn(ProgressColumn):
+    """Render the current indexing speed in documents per second."""
+
+    def render(self, task: Task) -> Text:
+        """Render the column for a task."""
+        return Text(f"{task.speed or 0:,.0f} docs/s", style="progress.data.speed")
+
+
+def _chunks(
+    actions: Iterable[dict[str, Any]], chunk_size: int, max_chunk_bytes: int
+) -> Iterator[list[dict[str, Any]]]:
+    """Group actions into chunks bounded by count and serialized size."""
+    chunk: list[dict[str, Any]] = []
+    size = 0
+    for action in actions:
+        action_size = len(json.dumps(action, default=str).encode())
+        if chunk and (len(chunk) >= chunk_size or size + action_size > max_chunk_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(action)
+        size += action_size
+    if chunk:
+        yield chunk
+
+
+def _send_chunk(
+    client: Elasticsearch,
+    chunk: list[dict[str, Any]],
+    options: BulkOptions,
+) -> tuple[int, list[dict[str, Any]]]:
+    """Send one chunk, retrying 429 rejections with exponential backoff."""
+    with BULK_CHUNK_SECONDS.time():
+        return _stream_chunk(client, chunk, options)
+
+
+def _stream_chunk(
+    client: Elasticsearch,
+    chunk: list[dict[str, Any]],
+    options: BulkOptions,
+) -> tuple[int, list[dict[str, Any]]]:
+    """Stream one chunk through `streaming_bulk` and collect failures."""
+    indexed = 0
+    failed = []
+    for ok, item in streaming_bulk(
+        client,
+        chunk,
+        chunk_size=len(chunk),
+        # Chunks are already bounded by _chunks; never split them again
+        max_chunk_bytes=2 * options.max_chunk_bytes,
+        raise_on_error=False,
+        raise_on_exception=False,
+        max_retries=options.max_retries,
+        initial_backoff=options.initial_backoff,
+    ):
+        if ok:
+            indexed += 1
+            continue
+        op_type, info = next(iter(item.items()))
+        error = info.get("error")
+        BULK_FAILURES.inc(status=info.get("status") or "error")
+        failed.append(
+            {
+                "id": info.get("_id"),
+                "op_type": op_type,
+                "status": info.get("status"),
+                "error": error if isinstance(error, dict) else str(error),
+            }
+        )
+    return indexed, failed
+
+
+def parallel_index(
+    client: Elasticsearch,
+    actions: Iterable[dict[str, Any]],
+    options: BulkOptions | None = None,
+) -> BulkReport:
+    """Stream bulk actions to Elasticsearch from a pool of worker threads.
+
+    Actions are consumed lazily and at most two chunks per thread are in
+    flight, so memory stays flat regardless of the number of documents.
+    Per-document failures are collected in the returned report instead of
+    aborting the run.
+    """
+    options = options or BulkOptions()
+    report = BulkReport()
+    start = time.perf_counter()
+    pending: deque[Future[tuple[int, list[dict[str, Any]]]]] = deque()
+
+    with (
+        ThreadPoolExecutor(max_workers=options.threads) as pool,
+        Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            TextColumn("{task.completed:,} docs"),
+            DocsPerSecondColumn(),
+            TimeElapsedColumn(),
+            console=console,
+        ) as progress,
+    ):
+        task = progress.add_task("Indexing...", total=None)
+
+        def collect(future: Future[tuple[int, list[dict[str, Any]]]]) -> None:
+            indexed, failed = future.result()
+            report.indexed += indexed
+            report.failed.extend(failed)
+            progress.update(task, advance=indexed + len(failed))
+
+        for chunk in _chunks(actions, options.chunk_size, options.max_chunk_bytes):
+            pending.append(pool.submit(_send_chunk, client, chunk, options))
+            while len(pending) >= 2 * options.threads:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+
+    report.seconds = time.perf_counter() - start
+    return report
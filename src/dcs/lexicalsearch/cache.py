@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import asdict, dataclass
+from typing import Any, Protocol
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+
+class CacheBackend(Protocol):
+    """Key-value store behind `SearchCache`.
+
+    The interface is async so a shared store (e.g. Redis) can be plugged in
+    later without touching callers.
+    """
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached value for `key`, or None."""
+        ...
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store `value` under `key`."""
+        ...
+
+    async def clear(self) -> None:
+        """Drop every entry."""
+        ...
+
+
+class MemoryBackend:
+    """In-process cache bounded by entry count (LRU) and age (TTL)."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return a fresh entry and mark it as most recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store an entry, evicting the least recently used ones when full."""
+        self._entries[key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of stored entries, including expired ones."""
+        return len(self._entries)
+
+
+@dataclass
+class CacheStats:
+    """Counters exposed by `SearchCache`."""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    invalidations: int = 0
+
+
+def _normalize(value: Any) -> Any:  # noqa: ANN401
+    """Canonicalize values whose order or casing does not change results."""
+    if isinstance(value, Mapping):
+        return {k: _normalize(v) for k, v in value.items() if v not in (None, [], {})}
+    if isinstance(value, list | tuple | set):
+        return sorted((_normalize(v) for v in value), key=json.dumps)
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def cache_key(params: Mapping[str, Any], generation: str | None = None) -> str:
+    """Return a canonical hash of search parameters and index generation.
+
+    Lists are treated as sets and whitespace in strings is collapsed, so
+    equivalent requests share an entry. The free-text query is also lowercased
+    because every searched field is analyzed with a lowercase filter.
+    """
+    normalized = _normalize(params)
+    if isinstance(normalized.get("query"), str):
+        normalized["query"] = normalized["query"].lower()
+    payload = json.dumps(
+        {"params": normalized, "generation": generation},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+async def async_current_generation(
+    client: AsyncElasticsearch, alias: str
+) -> str | None:
+    """Return the concrete index behind `alias`, or None if it is no alias."""
+    try:
+        response = await client.indices.get_alias(name=alias)
+    except NotFoundError:
+        return None
+    return next(iter(response.body), None)
+
+
+class SearchCache:
+    """Result cache in front of the search backend.
+
+    Entries are keyed on the normalized request and the current index
+    generation, so a reindex (alias swap) invalidates them automatically.
+    Concurrent identical misses share a single backend call.
+    """
+
+    def __init__(
+        self, backend: CacheBackend | None = None, generation_ttl: float = 5.0
+    ) -> None:
+        """Initialize the cache; the generation is re-checked every few seconds."""
+        self.backend = backend or MemoryBackend()
+        self.generation_ttl = generation_ttl
+        self.stats = CacheStats()
+        self._inflight: dict[str, asyncio.Future[dict[str, Any]]] = {}
+        self._generations: dict[str, tuple[float, str | None]] = {}
+
+    async def generation(self, client: AsyncElasticsearch, ix: str) -> str | None:
+        """Return the generation behind `ix`, clearing the cache when it moved."""
+        now = time.monotonic()
+        checked_at, known = self._generations.get(ix, (0.0, None))
+        if ix in self._generations and now - checked_at < self.generation_ttl:
+            return known
+        current = await async_current_generation(client, ix)
+        if ix in self._generations and current != known:
+            self.stats.invalidations += 1
+            await self.backend.clear()
+        self._generations[ix] = (now, current)
+        return current
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> dict[str, Any]:
+        """Return the cached value for `key`, fetching it once on a miss.
+
+        Cached values are shared between callers and must not be mutated.
+        """
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.stats.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.stats.misses += 1
+        future: asyncio.Future[dict[str, Any]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            await self.backend.set(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        """Return the cached value for `key` without fetching on a miss."""
+        cached = await self.backend.get(key)
+        if cached is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return cached
+
+    async def set(self, key: str, value: dict[str, Any]) -> None:
+        """Store a value fetched outside `get_or_fetch`."""
+        await self.backend.set(key, value)
+
+    def stats_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dict."""
+        return asdict(self.stats)
@@ -1,15 +1,43 @@
 import os
+from functools import cache
 
-import dotenv
-from elasticsearch import Elasticsearch
+from elastic_transport import HttpxAsyncHttpNode
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 
-# Load environment
-dotenv.load_dotenv(override=True)
+# Shared transport settings: gzip request bodies, bounded waits and a few
+# retries on timeouts so a slow node does not stall a caller indefinitely.
+CLIENT_OPTIONS = {
+    "http_compress": True,
+    "request_timeout": 10.0,
+    "max_retries": 2,
+    "retry_on_timeout": True,
+    "connections_per_node": 25,
+}
 
-# Database connection URL
-ELASTIC_URL = os.getenv("ELASTIC_URL")
 
+@cache
+def elastic_url() -> str | None:
+    """Return the database connection URL, loading `.env` on the first call."""
+    import dotenv
 
+    dotenv.load_dotenv(override=True)
+    return os.getenv("ELASTIC_URL")
+
+
+@cache
 def get_client() -> Elasticsearch:
-    """Get Elastic Search client."""
-    return Elasticsearch(ELASTIC_URL)
+    """Get the process-wide Elastic Search client (created on first use)."""
+    return Elasticsearch(elastic_url(), **CLIENT_OPTIONS)  # type: ignore[arg-type]
+
+
+def get_async_client() -> AsyncElasticsearch:
+    """Create a pooled async Elastic Search client on the httpx transport.
+
+    The caller owns the client and must close it; the API creates one per
+    worker in its lifespan.
+    """
+    return AsyncElasticsearch(
+        elastic_url(),
+        node_class=HttpxAsyncHttpNode,
+        **CLIENT_OPTIONS,  # type: ignore[arg-type]
+    )
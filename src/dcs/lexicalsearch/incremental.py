@@ -0,0 +1,87 @@
+import json
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.models.product import Product
+
+
+@dataclass
+class IndexDiff:
+    """Summary of the changes an incremental run sends to the index."""
+
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    hashes: dict[str, str] = field(default_factory=dict)
+    """Content hash of every product in the new catalogue, keyed on id."""
+
+    def summary(self) -> str:
+        """Return a one-line, human readable summary."""
+        return (
+            f"🆕 {self.added} nieuw, ✏️ {self.changed} gewijzigd, "
+            f"🗑️ {self.deleted} verwijderd, ⏸️ {self.unchanged} ongewijzigd"
+        )
+
+
+def indexed_hashes(client: Elasticsearch, index_name: str) -> dict[str, str]:
+    """Scan the index for the content hash of every document, keyed on `_id`."""
+    hits = scan(
+        client,
+        index=index_name,
+        query={"_source": False, "docvalue_fields": ["content_hash"]},
+        size=1000,
+    )
+    return {
+        hit["_id"]: hit.get("fields", {}).get("content_hash", [""])[0] for hit in hits
+    }
+
+
+def load_manifest(path: Path) -> dict[str, str]:
+    """Load a local manifest of content hashes, keyed on product id."""
+    with path.open(encoding="utf-8") as f:
+        manifest: dict[str, str] = json.load(f)
+    return manifest
+
+
+def save_manifest(path: Path, hashes: dict[str, str]) -> None:
+    """Save a manifest of content hashes, keyed on product id."""
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(hashes, f, sort_keys=True)
+
+
+def diff_actions(
+    products: Iterable[Product],
+    existing: dict[str, str],
+    index_name: str,
+    diff: IndexDiff,
+) -> Iterator[dict[str, Any]]:
+    """Yield bulk actions for added, changed and vanished products only.
+
+    Index actions are streamed while `products` is consumed; delete actions
+    for ids that no longer occur follow at the end. `diff` is filled in as a
+    side effect.
+    """
+    for product in products:
+        doc = product_to_es_doc(product)
+        new_hash = str(doc["content_hash"])
+        diff.hashes[product.id] = new_hash
+        old_hash = existing.get(product.id)
+        if old_hash == new_hash:
+            diff.unchanged += 1
+            continue
+        if old_hash is None:
+            diff.added += 1
+        else:
+            diff.changed += 1
+        yield {**doc, "_index": index_name, "_id": product.id}
+
+    for product_id in existing.keys() - diff.hashes.keys():
+        diff.deleted += 1
+        yield {"_op_type": "delete", "_index": index_name, "_id": product_id}
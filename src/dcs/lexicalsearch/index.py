@@ -1,72 +1,28 @@
-import json
+from collections.abc import Iterable
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from elastic_transport import ApiError
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
 from rich.console import Console
 
+from dcs.lexicalsearch.bulk import BulkOptions, BulkReport, parallel_index
 from dcs.lexicalsearch.es_client import get_client
+from dcs.lexicalsearch.incremental import (
+    IndexDiff,
+    diff_actions,
+    indexed_hashes,
+    load_manifest,
+    save_manifest,
+)
 from dcs.lexicalsearch.map import product_to_es_doc
-from dcs.models.product import Product
+from dcs.lexicalsearch.mapping import MAPPING
+from dcs.models.store import iter_products
 
-console = Console()
+if TYPE_CHECKING:
+    from dcs.semanticsearch.embed import EmbeddingStage
 
-MAPPING = {
-    "settings": {
-        "analysis": {
-            "analyzer": {
-                "dutch_analyzer": {
-                    "tokenizer": "standard",
-                    "filter": [
-                        "lowercase",
-                        "dutch_stop",
-                        "dutch_stemmer",
-                        "dutch_synonyms",
-                    ],
-                }
-            },
-            "filter": {
-                "dutch_stop": {"type": "stop", "stopwords": "_dutch_"},
-                "dutch_stemmer": {"type": "stemmer", "language": "dutch"},
-                "dutch_synonyms": {
-                    "type": "synonym_graph",
-                    "synonyms": ["toelating, vergunning", "subsidie, toelage"],
-                },
-            },
-        }
-    },
-    "mappings": {
-        "properties": {
-            "naam": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-                "analyzer": "dutch_analyzer",
-            },
-            "omschrijving": {"type": "text"},
-            "themas": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-            },
-            "type": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-            },
-            "gemeente": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-            },
-            "voorwaarden_vorm": {"type": "keyword"},
-            "voorwaarden_regio": {"type": "keyword"},
-            "voorwaarden_vereniging": {"type": "keyword"},
-            "keywords": {"type": "text"},
-            "laatste_wijzigingsdatum": {
-                "type": "date",
-                "format": "strict_date_optional_time||yyyy-MM-dd",
-            },
-        }
-    },
-}
+console = Console()
 
 
 def drop_index(client: Elasticsearch, ix: str) -> None:
@@ -82,14 +38,22 @@ def drop_index(client: Elasticsearch, ix: str) -> None:
         raise
 
 
-def create_index(client: Elasticsearch, index_name: str) -> None:
-    """Create the Elasticsearch index with the defined mapping."""
+def create_index(
+    client: Elasticsearch,
+    index_name: str,
+    settings: dict[str, Any] | None = None,
+) -> None:
+    """Create the Elasticsearch index with the defined mapping.
+
+    `settings` are merged over the settings in `MAPPING`.
+    """
     try:
-        if index_name in client.indices.get_alias():
+        if client.indices.exists(index=index_name):
             console.print(f"Index '{index_name}' already exists.")
             return
 
-        client.indices.create(index=index_name, body=MAPPING)
+        body = {**MAPPING, "settings": {**MAPPING["settings"], **(settings or {})}}
+        client.indices.create(index=index_name, body=body)
         console.print(f"✅ Created index '{index_name}'.")
 
     except Exception as e:
@@ -99,16 +63,90 @@ def create_index(client: Elasticsearch, index_name: str) -> None:
         raise
 
 
-def index_all(index_name: str, file_path: Path) -> None:
-    """Index all cleaned Dienstencatalogus records into Elasticsearch."""
+def index_all(  # noqa: PLR0913
+    index_name: str,
+    file_path: Path,
+    options: BulkOptions | None = None,
+    report_file: Path | None = None,
+    *,
+    incremental: bool = False,
+    manifest: Path | None = None,
+    embeddings: "EmbeddingStage | None" = None,
+) -> BulkReport:
+    """Index all cleaned Dienstencatalogus records into Elasticsearch.
+
+    Products are streamed from `file_path` into parallel bulk workers. Failed
+    document ids are written to `report_file` when one is given. With
+    `embeddings` every document also gets a vector for hybrid search.
+
+    In incremental mode each product's content hash is compared with the hash
+    stored in the index (or in the local `manifest`, when it exists) and only
+    added, changed and vanished products are sent.
+    """
     client = get_client()
     create_index(client, index_name=index_name)
+    if not incremental:
+        return index_file(
+            client, index_name, file_path, options, report_file, embeddings
+        )
+
+    existing = (
+        load_manifest(manifest)
+        if manifest and manifest.exists()
+        else indexed_hashes(client, index_name)
+    )
+    diff = IndexDiff()
+    actions = diff_actions(iter_products(file_path), existing, index_name, diff)
+    if embeddings:
+        actions = embeddings(actions)
+    report = index_actions(client, index_name, actions, options, report_file)
+    console.print(diff.summary())
+
+    if manifest:
+        hashes = diff.hashes
+        for failure in report.failed:
+            if failure["op_type"] == "delete":
+                hashes[failure["id"]] = existing[failure["id"]]
+            else:
+                hashes.pop(failure["id"], None)
+        save_manifest(manifest, hashes)
+    return report
+
 
-    with file_path.open(encoding="utf-8") as f:
-        raw_items = json.load(f)
+def index_file(  # noqa: PLR0913
+    client: Elasticsearch,
+    index_name: str,
+    file_path: Path,
+    options: BulkOptions | None = None,
+    report_file: Path | None = None,
+    embeddings: "EmbeddingStage | None" = None,
+) -> BulkReport:
+    """Bulk index the products in `file_path` into an existing index."""
+    actions: Iterable[dict[str, Any]] = (
+        {**product_to_es_doc(p), "_index": index_name, "_id": p.id}
+        for p in iter_products(file_path)
+    )
+    if embeddings:
+        actions = embeddings(actions)
+    return index_actions(client, index_name, actions, options, report_file)
 
-    products = [Product(**item) for item in raw_items]
-    actions = [{**product_to_es_doc(p), "_index": index_name} for p in products]
 
-    bulk(client, actions)
-    console.print(f"✅ Indexed {len(actions)} producten into index '{index_name}'")
+def index_actions(
+    client: Elasticsearch,
+    index_name: str,
+    actions: Iterable[dict[str, Any]],
+    options: BulkOptions | None,
+    report_file: Path | None,
+) -> BulkReport:
+    """Send `actions` with the parallel indexer and report the outcome."""
+    report = parallel_index(client, actions, options)
+    console.print(
+        f"✅ Indexed {report.indexed} producten into index '{index_name}' "
+        f"({report.docs_per_second:,.0f} docs/s)"
+    )
+    if report.failed:
+        console.print(f"[red]❌ {len(report.failed)} documenten mislukt[/red]")
+    if report_file:
+        report.write(report_file)
+        console.print(f"📝 Report written to {report_file}")
+    return report
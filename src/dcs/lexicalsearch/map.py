@@ -1,6 +1,19 @@
+import hashlib
+import json
+
 from dcs.models.product import Product
 
 
+def content_hash(doc: dict[str, object]) -> str:
+    """Return a stable hash of an Elasticsearch document's content."""
+    payload = json.dumps(
+        {k: v for k, v in doc.items() if k != "content_hash"},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
 def product_to_es_doc(product: Product) -> dict[str, object]:
     """Convert a Product to a flat Elasticsearch document."""
 
@@ -13,7 +26,7 @@ def product_to_es_doc(product: Product) -> dict[str, object]:
             for v in vs  # type: ignore  # noqa: PGH003
         ]
 
-    return {
+    doc: dict[str, object] = {
         "id": product.id,
         "naam": product.naam,
         "omschrijving": product.omschrijving_clean,
@@ -25,4 +38,7 @@ def product_to_es_doc(product: Product) -> dict[str, object]:
         "voorwaarden_vereniging": flatten("vereniging"),
         "voorwaarden_thema": flatten("thema"),
         "match": product.match,
+        "laatste_wijzigingsdatum": product.laatste_wijzigingsdatum or None,
     }
+    doc["content_hash"] = content_hash(doc)
+    return doc
@@ -0,0 +1,102 @@
+from typing import Any
+
+from dcs.lexicalsearch.analysis import SYNONYMS
+from dcs.semanticsearch.embed import DIMS
+
+# Segments are stored newest first, then by name. A search sorted the same
+# way can stop in every segment once it holds enough hits, provided it does
+# not count every match (see `SORTED_TOTAL_HITS`). Set at index creation
+# only: existing indices need a `dcs reindex` to get it.
+INDEX_SORT = (("laatste_wijzigingsdatum", "desc"), ("naam.keyword", "asc"))
+
+MAPPING: dict[str, Any] = {
+    "settings": {
+        "index": {
+            "sort.field": [field for field, _ in INDEX_SORT],
+            "sort.order": [order for _, order in INDEX_SORT],
+        },
+        "analysis": {
+            "analyzer": {
+                "dutch_analyzer": {
+                    "tokenizer": "standard",
+                    "filter": [
+                        "lowercase",
+                        "dutch_stop",
+                        "dutch_stemmer",
+                        "dutch_synonyms",
+                    ],
+                }
+            },
+            "filter": {
+                "dutch_stop": {"type": "stop", "stopwords": "_dutch_"},
+                "dutch_stemmer": {"type": "stemmer", "language": "dutch"},
+                "dutch_synonyms": {
+                    "type": "synonym_graph",
+                    "synonyms": SYNONYMS,
+                },
+            },
+        },
+    },
+    "mappings": {
+        # Vectors are only searched, never shown: keep them out of `_source`
+        "_source": {"excludes": ["embedding"]},
+        "properties": {
+            "id": {"type": "keyword"},
+            "naam": {
+                "type": "text",
+                "fields": {
+                    "keyword": {"type": "keyword", "ignore_above": 256},
+                    # Word prefixes for `/suggest` on several API nodes
+                    "suggest": {"type": "search_as_you_type"},
+                },
+                "analyzer": "dutch_analyzer",
+            },
+            "omschrijving": {"type": "text"},
+            "themas": {
+                "type": "text",
+                "fields": {
+                    "keyword": {
+                        "type": "keyword",
+                        "ignore_above": 256,
+                        "eager_global_ordinals": True,
+                    }
+                },
+            },
+            "type": {
+                "type": "text",
+                "fields": {
+                    "keyword": {
+                        "type": "keyword",
+                        "ignore_above": 256,
+                        "eager_global_ordinals": True,
+                    }
+                },
+            },
+            "gemeente": {
+                "type": "text",
+                "fields": {
+                    "keyword": {
+                        "type": "keyword",
+                        "ignore_above": 256,
+                        "eager_global_ordinals": True,
+                    }
+                },
+            },
+            "voorwaarden_vorm": {"type": "keyword"},
+            "voorwaarden_regio": {"type": "keyword"},
+            "voorwaarden_vereniging": {"type": "keyword"},
+            "keywords": {"type": "text"},
+            "content_hash": {"type": "keyword", "index": False},
+            "laatste_wijzigingsdatum": {
+                "type": "date",
+                "format": "strict_date_optional_time||yyyy-MM-dd",
+            },
+            "embedding": {
+                "type": "dense_vector",
+                "dims": DIMS,
+                "index": True,
+                "similarity": "dot_product",
+            },
+        },
+    },
+}
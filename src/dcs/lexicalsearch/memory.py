@@ -0,0 +1,456 @@
+import heapq
+import json
+import math
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from dcs.lexicalsearch.analysis import analyze, expand_synonyms, tokenize
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.lexicalsearch.personalization import (
+    AD_NOMINATUM_MATCH,
+    AD_NOMINATUM_OTHER,
+    ENGINE_NAMES,
+    profile_params,
+    tier_score,
+)
+from dcs.lexicalsearch.search import (
+    MATCHING_MODES,
+    QUERY_FIELDS,
+    SORT_TIEBREAKS,
+    SearchParams,
+    UnknownMatchingError,
+)
+from dcs.models.product import Product
+from dcs.models.store import iter_products
+
+# Searched fields and their boosts, as in the `multi_match` of `build_search_body`
+FIELD_BOOSTS = QUERY_FIELDS
+# Facet name -> document field, as in `search.FACETS`
+FACET_FIELDS = {"themas": "themas", "gemeentes": "gemeente", "types": "type"}
+# Condition -> document field, as read by the personalization matrix
+CONDITION_FIELDS = {
+    "verenigingen": "voorwaarden_vereniging",
+    "regio": "voorwaarden_regio",
+    "vorm": "voorwaarden_vorm",
+    "themas": "themas",
+}
+FACET_SIZE = 10
+BM25_K1 = 1.2
+BM25_B = 0.75
+FORMAT_VERSION = 1
+
+
+class UnknownPersonalizationError(ValueError):
+    """Raised for a personalization engine that does not exist."""
+
+    def __init__(self, engine: str) -> None:
+        """Initialize the error for `engine`."""
+        super().__init__(f"Unknown personalization engine: {engine}")
+
+
+class ProfileLookupNotSupportedError(ValueError):
+    """Raised when a registered profile id is used on the in-memory index."""
+
+    def __init__(self) -> None:
+        """Initialize the error."""
+        super().__init__(
+            "Registered profiles need Elasticsearch; pass the profile itself"
+        )
+
+
+class IndexFormatError(ValueError):
+    """Raised when a persisted index has an unsupported format."""
+
+    def __init__(self, path: Path) -> None:
+        """Initialize the error for `path`."""
+        super().__init__(f"Unsupported in-memory index format: {path}")
+
+
+def _field_text(value: object) -> str:
+    """Join list fields into one text, like Elasticsearch analyzes arrays."""
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value) if value else ""
+
+
+def _values(value: object) -> list[str]:
+    """Return the keyword values of a field."""
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [str(value)] if value else []
+
+
+def _check_params(personalization: str, matching: str, profile_id: str | None) -> None:
+    """Reject search parameters the in-memory index cannot honour."""
+    if personalization not in ENGINE_NAMES:
+        raise UnknownPersonalizationError(personalization)
+    if matching not in MATCHING_MODES:
+        raise UnknownMatchingError(matching)
+    if profile_id:
+        raise ProfileLookupNotSupportedError
+
+
+class InMemoryIndex:
+    """In-process BM25 index over the diensten, answering like Elasticsearch.
+
+    Documents are the same flat documents that are sent to Elasticsearch, and
+    `search` accepts the keyword arguments of `search_diensten` and returns a
+    response of the same shape, so callers can switch backends freely.
+    """
+
+    def __init__(
+        self, docs: Iterable[dict[str, Any]] = (), path: Path | None = None
+    ) -> None:
+        """Build an index over `docs`; `index_file` saves it to `path`."""
+        self.path = path
+        self._reset()
+        self._add(docs)
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self.docs)
+
+    def _reset(self) -> None:
+        """Drop every document."""
+        self.docs: list[dict[str, Any]] = []
+        # field -> term -> {doc number: term frequency}
+        self._postings: dict[str, dict[str, dict[int, int]]] = {
+            field: {} for field in FIELD_BOOSTS
+        }
+        self._lengths: dict[str, list[int]] = {field: [] for field in FIELD_BOOSTS}
+
+    def _add(self, docs: Iterable[dict[str, Any]]) -> None:
+        """Analyze and add documents, then refresh the derived structures."""
+        for doc in docs:
+            number = len(self.docs)
+            self.docs.append(doc)
+            for field in FIELD_BOOSTS:
+                terms = analyze(_field_text(doc.get(field)))
+                self._lengths[field].append(len(terms))
+                postings = self._postings[field]
+                for term, tf in Counter(terms).items():
+                    postings.setdefault(term, {})[number] = tf
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Precompute BM25 weights, keyword bitsets and personalization sets.
+
+        Keyword values map onto a bitset (an int with one bit per document),
+        so filters are bitwise ands and a facet count is a popcount.
+        """
+        n = len(self.docs)
+        self._all = (1 << n) - 1
+        self._weights: dict[str, dict[str, dict[int, float]]] = {}
+        for field, boost in FIELD_BOOSTS.items():
+            lengths = self._lengths[field]
+            norm = BM25_K1 / ((sum(lengths) / n) if n and any(lengths) else 1.0)
+            weights = {}
+            for term, postings in self._postings[field].items():
+                doc_freq = len(postings)
+                idf = math.log(1 + (n - doc_freq + 0.5) / (doc_freq + 0.5))
+                weights[term] = {
+                    number: boost
+                    * idf
+                    * tf
+                    * (BM25_K1 + 1)
+                    / (tf + BM25_K1 * (1 - BM25_B) + BM25_B * norm * lengths[number])
+                    for number, tf in postings.items()
+                }
+            self._weights[field] = weights
+
+        self._keyword_masks: dict[str, dict[str, int]] = {}
+        for field in FACET_FIELDS.values():
+            numbers: defaultdict[str, list[int]] = defaultdict(list)
+            for number, doc in enumerate(self.docs):
+                for value in set(_values(doc.get(field))):
+                    numbers[value].append(number)
+            self._keyword_masks[field] = {
+                value: self._mask(found) for value, found in numbers.items()
+            }
+        self._conditions = [
+            {
+                name: frozenset(_values(doc.get(field)))
+                for name, field in CONDITION_FIELDS.items()
+            }
+            for doc in self.docs
+        ]
+        self._orders: dict[tuple[str, str], list[int]] = {}
+        self._gemeente_masks: dict[tuple[str, ...], int] = {}
+
+    @classmethod
+    def from_products(
+        cls, products: Iterable[Product], path: Path | None = None
+    ) -> "InMemoryIndex":
+        """Build an index from products, mapped like for Elasticsearch."""
+        return cls((product_to_es_doc(p) for p in products), path)
+
+    def index_file(self, file_path: Path) -> int:
+        """Replace the contents with the products in a cleaned product file.
+
+        The index is saved to `path`, when set, so the next start can `load`
+        it instead of analyzing every product again.
+        """
+        self._reset()
+        self._add(product_to_es_doc(p) for p in iter_products(file_path))
+        if self.path:
+            self.save(self.path)
+        return len(self)
+
+    def save(self, path: Path) -> None:
+        """Persist the documents together with their analyzed postings."""
+        payload = {
+            "version": FORMAT_VERSION,
+            "docs": self.docs,
+            "lengths": self._lengths,
+            "postings": {
+                field: {term: list(p.items()) for term, p in postings.items()}
+                for field, postings in self._postings.items()
+            },
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> "InMemoryIndex":
+        """Load an index saved with `save` without re-analyzing documents."""
+        with path.open(encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != FORMAT_VERSION:
+            raise IndexFormatError(path)
+        index = cls(path=path)
+        index.docs = payload["docs"]
+        index._lengths = payload["lengths"]
+        index._postings = {
+            field: {term: dict(map(tuple, p)) for term, p in postings.items()}
+            for field, postings in payload["postings"].items()
+        }
+        index._refresh()
+        return index
+
+    @classmethod
+    def open(cls, path: Path) -> "InMemoryIndex":
+        """Load the index at `path`, or start an empty one that saves there."""
+        return cls.load(path) if path.exists() else cls(path=path)
+
+    def _score(self, query: str) -> dict[int, float]:
+        """Score documents like a `best_fields` multi_match: best field wins."""
+        terms = expand_synonyms(analyze(query))
+        best: dict[int, float] = {}
+        for field in FIELD_BOOSTS:
+            weights = self._weights[field]
+            matching = [weights[t] for t in terms if t in weights]
+            if len(matching) == 1:
+                field_scores = matching[0]
+            else:
+                field_scores = defaultdict(float)
+                for term_weights in matching:
+                    for number, weight in term_weights.items():
+                        field_scores[number] += weight
+            for number, score in field_scores.items():
+                if score > best.get(number, 0.0):
+                    best[number] = score
+        return best
+
+    def _mask(self, numbers: Iterable[int]) -> int:
+        """Return the bitset of the given document numbers."""
+        bits = bytearray((len(self.docs) + 7) // 8)
+        for number in numbers:
+            bits[number >> 3] |= 1 << (number & 7)
+        return int.from_bytes(bits, "little")
+
+    def _keyword_mask(self, field: str, values: Iterable[str]) -> int:
+        """Return the documents having any of `values` in keyword `field`."""
+        masks = self._keyword_masks[field]
+        mask = 0
+        for value in values:
+            mask |= masks.get(value, 0)
+        return mask
+
+    def _gemeente_mask(self, gemeente: str) -> int:
+        """Return the documents matching gemeente as a phrase, like `match_phrase`."""
+        phrase = tuple(tokenize(gemeente))
+        if phrase not in self._gemeente_masks:
+            width = len(phrase)
+            matching = []
+            for number, doc in enumerate(self.docs):
+                tokens = tuple(tokenize(_field_text(doc.get("gemeente"))))
+                if any(
+                    tokens[i : i + width] == phrase
+                    for i in range(len(tokens) - width + 1)
+                ):
+                    matching.append(number)
+            self._gemeente_masks[phrase] = self._mask(matching)
+        return self._gemeente_masks[phrase]
+
+    def _order(self, field: str, sort_order: str) -> list[int]:
+        """Return all document numbers sorted on keyword `field`.
+
+        Array fields sort on their lowest value, documents without a value
+        come last in either order. Ties sort on the tiebreak field of
+        `SORT_TIEBREAKS`, if any, and otherwise keep index order.
+        """
+        if (field, sort_order) not in self._orders:
+            keys = [min(_values(doc.get(field)), default=None) for doc in self.docs]
+            tiebreak = SORT_TIEBREAKS.get(field)
+            numbers = (
+                self._order(tiebreak.removesuffix(".keyword"), "asc")
+                if tiebreak
+                else range(len(self.docs))
+            )
+            # A reversed sort is still stable, so ties keep the tiebreak order
+            present = sorted(
+                (n for n in numbers if keys[n] is not None),
+                key=lambda n: keys[n] or "",
+                reverse=sort_order == "desc",
+            )
+            missing = [n for n in numbers if keys[n] is None]
+            self._orders[field, sort_order] = present + missing
+        return self._orders[field, sort_order]
+
+    def _profile_scores(
+        self, numbers: Iterable[int], vereniging_profile: dict[str, Any]
+    ) -> dict[int, float]:
+        """Score documents on the personalization matrix of `profile_score`."""
+        params = {k: set(v) for k, v in profile_params(vereniging_profile).items()}
+        scores = {}
+        for number in numbers:
+            doc = self._conditions[number]
+            if doc["verenigingen"]:
+                scores[number] = (
+                    AD_NOMINATUM_OTHER
+                    if params["allowed_verenigingen"].isdisjoint(doc["verenigingen"])
+                    else AD_NOMINATUM_MATCH
+                )
+                continue
+            scores[number] = tier_score(
+                has_regio=not params["gemeentes"].isdisjoint(doc["regio"]),
+                has_vorm=not params["vorm"].isdisjoint(doc["vorm"]),
+                has_thema=not params["themas"].isdisjoint(doc["themas"]),
+            )
+        return scores
+
+    def _facets(self, matched: int) -> dict[str, Any]:
+        """Count the facet values of the matched documents, top 10 per facet."""
+        aggregations = {}
+        for name, field in FACET_FIELDS.items():
+            counts = (
+                (value, (mask & matched).bit_count())
+                for value, mask in self._keyword_masks[field].items()
+            )
+            top = heapq.nsmallest(
+                FACET_SIZE,
+                ((value, count) for value, count in counts if count),
+                key=lambda vc: (-vc[1], vc[0]),
+            )
+            aggregations[name] = {
+                "buckets": [{"key": v, "doc_count": c} for v, c in top]
+            }
+        return aggregations
+
+    def _bits(self, mask: int) -> Iterator[int]:
+        """Yield the document numbers in a bitset, in index order."""
+        number = 0
+        for byte in mask.to_bytes((len(self.docs) + 7) // 8, "little"):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield number + bit
+            number += 8
+
+    def search(  # noqa: PLR0913
+        self,
+        query: str | None = None,
+        themas: list[str] | None = None,
+        gemeente: str | None = None,
+        sort_by: str = "naam",
+        sort_order: str = "asc",
+        from_: int = 0,
+        size: int = 10,
+        vereniging_profile: dict[str, Any] | None = None,
+        personalization: str = "script",
+        facets: bool = True,  # noqa: FBT001, FBT002
+        profile_id: str | None = None,
+        matching: str = "fuzzy",
+    ) -> dict[str, Any]:
+        """Search with the same parameters and response shape as Elasticsearch.
+
+        All personalization engines rank identically here, so they share one
+        implementation of the scoring matrix. As in Elasticsearch, hits sorted
+        on a field carry no score. Fuzzy matching is not supported: query
+        terms must match a stem exactly, whatever `matching` asks.
+        """
+        start = time.perf_counter()
+        _check_params(personalization, matching, profile_id)
+
+        scores = self._score(query) if query else None
+        matched = self._all if scores is None else self._mask(scores)
+        if themas:
+            matched &= self._keyword_mask("themas", themas)
+        if gemeente:
+            matched &= self._gemeente_mask(gemeente)
+        filtered = bool(themas or gemeente)
+
+        if sort_by == "relevance":
+            if vereniging_profile:
+                scores = self._profile_scores(self._bits(matched), vereniging_profile)
+            elif scores is None:
+                scores = dict.fromkeys(self._bits(matched), 1.0)
+            elif filtered:
+                scores = {n: s for n, s in scores.items() if matched >> n & 1}
+            page = heapq.nsmallest(from_ + size, scores, key=lambda n: (-scores[n], n))[
+                from_:
+            ]
+            hit_scores: dict[int, float] | None = scores
+        else:
+            order = (
+                self._order(sort_by.removesuffix(".keyword"), sort_order)
+                if sort_by
+                else range(len(self.docs))
+            )
+            page = list(
+                islice((n for n in order if matched >> n & 1), from_, from_ + size)
+            )
+            hit_scores = None
+
+        response: dict[str, Any] = {
+            "hits": {
+                "total": {"value": matched.bit_count(), "relation": "eq"},
+                "max_score": max(hit_scores.values(), default=None)
+                if hit_scores
+                else None,
+                "hits": [
+                    {
+                        "_id": self.docs[n]["id"],
+                        "_score": hit_scores[n] if hit_scores else None,
+                        "_source": self.docs[n],
+                    }
+                    for n in page
+                ],
+            }
+        }
+        if facets:
+            response["aggregations"] = self._facets(matched)
+        if matching == "adaptive" and query:
+            response["phase"] = "exact"
+        response["took"] = round((time.perf_counter() - start) * 1000)
+        return response
+
+    def msearch(self, searches: Sequence[SearchParams]) -> list[dict[str, Any]]:
+        """Run several searches; a failing one yields an `error` item."""
+        responses: list[dict[str, Any]] = []
+        for params in searches:
+            try:
+                responses.append(self.search(**params))
+            except ValueError as e:
+                responses.append(
+                    {
+                        "error": {"type": type(e).__name__, "reason": str(e)},
+                        "status": 400,
+                    }
+                )
+        return responses
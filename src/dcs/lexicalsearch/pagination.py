@@ -0,0 +1,151 @@
+import base64
+import binascii
+import json
+from collections.abc import Iterator
+from typing import Any, Unpack
+
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+from dcs.lexicalsearch.search import SearchParams, build_search_body
+
+# Unique per document, so equal sort values never make pages skip or repeat
+TIEBREAKER = {"id": {"order": "asc"}}
+KEEP_ALIVE = "1m"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+    def __init__(self) -> None:
+        """Initialize the error."""
+        super().__init__("Invalid or corrupted cursor")
+
+
+class CursorNotSupportedError(ValueError):
+    """Raised when cursor pagination is used on a backend without it."""
+
+    def __init__(self, backend: str) -> None:
+        """Initialize the error for `backend`."""
+        super().__init__(f"Cursor pagination is not supported by backend: {backend}")
+
+
+def encode_cursor(pit_id: str, search_after: list[Any]) -> str:
+    """Pack a point in time and the sort values of the last hit into a token."""
+    payload = json.dumps({"pit": pit_id, "after": search_after}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[str, list[Any]]:
+    """Unpack a token created by `encode_cursor`."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return str(payload["pit"]), list(payload["after"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError from e
+
+
+def build_cursor_body(
+    pit_id: str,
+    search_after: list[Any] | None = None,
+    keep_alive: str = KEEP_ALIVE,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Build a point-in-time search body that continues after `search_after`.
+
+    Offsets are ignored: the position is carried by the sort values of the
+    last hit, with `id` as tiebreaker. No facets are computed.
+    """
+    params = {**params, "from_": 0, "facets": False}
+    body = build_search_body(**params)
+    del body["from"]
+    body["sort"] = [*body.get("sort", []), TIEBREAKER]
+    body["pit"] = {"id": pit_id, "keep_alive": keep_alive}
+    if search_after:
+        body["search_after"] = search_after
+    return body
+
+
+def _page(result: dict[str, Any], pit_id: str, size: int) -> dict[str, Any]:
+    """Attach the cursor of the next page, or None on the last page."""
+    hits = result["hits"]["hits"]
+    pit_id = result.get("pit_id", pit_id)
+    full = len(hits) == size and size > 0
+    result["next_cursor"] = encode_cursor(pit_id, hits[-1]["sort"]) if full else None
+    return result
+
+
+def search_page(
+    client: Elasticsearch,
+    ix: str = "diensten",
+    cursor: str | None = None,
+    keep_alive: str = KEEP_ALIVE,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Return one page of a cursor-paginated search.
+
+    Without `cursor` a point in time is opened on `ix` and the first page is
+    returned. Every page carries a `next_cursor`, which is None once the
+    result set is exhausted; the point in time is then closed.
+    """
+    if cursor:
+        pit_id, search_after = decode_cursor(cursor)
+    else:
+        pit_id = client.open_point_in_time(index=ix, keep_alive=keep_alive)["id"]
+        search_after = []
+    body = build_cursor_body(pit_id, search_after, keep_alive, **params)
+    result = _page(dict(client.search(body=body).body), pit_id, body["size"])
+    if result["next_cursor"] is None:
+        client.close_point_in_time(id=result.get("pit_id", pit_id))
+    return result
+
+
+async def async_search_page(
+    client: AsyncElasticsearch,
+    ix: str = "diensten",
+    cursor: str | None = None,
+    keep_alive: str = KEEP_ALIVE,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Return one page of a cursor-paginated search without blocking."""
+    if cursor:
+        pit_id, search_after = decode_cursor(cursor)
+    else:
+        response = await client.open_point_in_time(index=ix, keep_alive=keep_alive)
+        pit_id = response["id"]
+        search_after = []
+    body = build_cursor_body(pit_id, search_after, keep_alive, **params)
+    response = await client.search(body=body)
+    result = _page(dict(response.body), pit_id, body["size"])
+    if result["next_cursor"] is None:
+        await client.close_point_in_time(id=result.get("pit_id", pit_id))
+    return result
+
+
+def iter_hits(
+    client: Elasticsearch,
+    ix: str = "diensten",
+    batch_size: int = 1000,
+    keep_alive: str = KEEP_ALIVE,
+    **params: Unpack[SearchParams],
+) -> Iterator[dict[str, Any]]:
+    """Yield every hit of a search, one batch in memory at a time.
+
+    All hits are read from a single point in time, so a concurrent reindex
+    or alias swap does not make the export skip or repeat documents.
+    """
+    params = {**params, "size": batch_size}
+    pit_id = client.open_point_in_time(index=ix, keep_alive=keep_alive)["id"]
+    search_after: list[Any] = []
+    try:
+        while True:
+            body = build_cursor_body(pit_id, search_after, keep_alive, **params)
+            result = client.search(body=body)
+            pit_id = result.get("pit_id", pit_id)
+            hits = result["hits"]["hits"]
+            yield from hits
+            if len(hits) < batch_size:
+                return
+            search_after = hits[-1]["sort"]
+    finally:
+        client.close_point_in_time(id=pit_id)
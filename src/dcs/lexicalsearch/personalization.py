@@ -0,0 +1,289 @@
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from elasticsearch import AsyncElasticsearch
+
+# Inline Painless scoring matrix: ad-nominatum 100/0, then 90/80/70/60/20/10
+# tiers on regio, vorm and thema matches.
+PAINLESS_SOURCE = """
+// 1. Init
+boolean hasRegio = false;
+boolean hasVorm = false;
+boolean hasThema = false;
+boolean adNominatumMatched = false;
+boolean adNominatumOther = false;
+
+// 2. Vereniging name check
+boolean verenigingFieldExists = doc.containsKey('voorwaarden_vereniging');
+if (verenigingFieldExists && doc['voorwaarden_vereniging'].size() > 0) {
+  def vs = doc['voorwaarden_vereniging'];
+  boolean anyMatch = false;
+  for (int i = 0; i < vs.length; i++) {
+    if (params.allowed_verenigingen.contains(vs[i])) {
+      anyMatch = true;
+      break;
+    }
+  }
+  if (anyMatch) {
+    adNominatumMatched = true;
+  } else {
+    adNominatumOther = true;
+  }
+}
+
+// 3. Ad nominatum logic
+if (adNominatumOther) {
+  return 0.0;
+}
+if (adNominatumMatched) {
+  return 100.0;
+}
+
+// 4. Regio match (voorwaarden_regio vs werkingsgebieden)
+if (doc.containsKey('voorwaarden_regio') && doc['voorwaarden_regio'].size() > 0) {
+  def regio = doc['voorwaarden_regio'];
+  for (int i = 0; i < regio.length; i++) {
+    if (params.gemeentes.contains(regio[i])) {
+      hasRegio = true;
+      break;
+    }
+  }
+}
+
+// 5. Vorm match (voorwaarden_vorm vs type_vereniging)
+if (doc.containsKey('voorwaarden_vorm') && doc['voorwaarden_vorm'].size() > 0) {
+  def vormen = doc['voorwaarden_vorm'];
+  for (int i = 0; i < vormen.length; i++) {
+    if (params.vorm.contains(vormen[i])) {
+      hasVorm = true;
+      break;
+    }
+  }
+}
+
+// 6. Thema match (themas.keyword vs hoofdactiviteiten)
+if (doc.containsKey('themas.keyword') && doc['themas.keyword'].size() > 0) {
+  def themas = doc['themas.keyword'];
+  for (int i = 0; i < themas.length; i++) {
+    if (params.themas.contains(themas[i])) {
+      hasThema = true;
+      break;
+    }
+  }
+}
+
+// 7. Scoring matrix
+if (hasRegio && hasVorm && hasThema) {
+  return 90.0;
+} else if (hasRegio && hasVorm) {
+  return 80.0;
+} else if ((hasRegio && hasThema) || (hasVorm && hasThema)) {
+  return 70.0;
+} else if (hasRegio || hasVorm) {
+  return 60.0;
+} else if (hasThema) {
+  return 20.0;
+} else {
+  return 10.0;
+}
+"""
+
+# Scores of the matrix, as used by the native engine.
+AD_NOMINATUM_MATCH = 100.0
+AD_NOMINATUM_OTHER = 0.0
+TIERS = {
+    "regio_vorm_thema": 90.0,
+    "regio_vorm": 80.0,
+    "thema_plus_one": 70.0,
+    "regio_or_vorm": 60.0,
+    "thema": 20.0,
+    "none": 10.0,
+}
+# Tiers materialized per registered profile; `none` is the default
+STORED_TIERS = (
+    AD_NOMINATUM_MATCH,
+    AD_NOMINATUM_OTHER,
+    *(score for tier, score in TIERS.items() if tier != "none"),
+)
+
+
+def profile_params(vereniging_profile: dict[str, Any]) -> dict[str, list[str]]:
+    """Map a vereniging profile onto the parameters used for scoring."""
+    return {
+        "gemeentes": vereniging_profile.get("werkingsgebieden", []),
+        "vorm": vereniging_profile.get("type_vereniging", []),
+        "themas": vereniging_profile.get("hoofdactiviteiten", []),
+        "allowed_verenigingen": list(vereniging_profile.get("namen", {}).values()),
+    }
+
+
+def tier_score(*, has_regio: bool, has_vorm: bool, has_thema: bool) -> float:
+    """Return the tier score for the given regio, vorm and thema matches."""
+    if has_regio and has_vorm and has_thema:
+        return TIERS["regio_vorm_thema"]
+    if has_regio and has_vorm:
+        return TIERS["regio_vorm"]
+    if has_thema and (has_regio or has_vorm):
+        return TIERS["thema_plus_one"]
+    if has_regio or has_vorm:
+        return TIERS["regio_or_vorm"]
+    if has_thema:
+        return TIERS["thema"]
+    return TIERS["none"]
+
+
+def profile_score(doc: dict[str, Any], params: dict[str, list[str]]) -> float:
+    """Score a flat Elasticsearch document in Python, like the Painless script."""
+    verenigingen = doc.get("voorwaarden_vereniging") or []
+    if verenigingen:
+        allowed = set(params["allowed_verenigingen"])
+        return (
+            AD_NOMINATUM_MATCH
+            if allowed.intersection(verenigingen)
+            else AD_NOMINATUM_OTHER
+        )
+    return tier_score(
+        has_regio=bool(
+            set(params["gemeentes"]).intersection(doc.get("voorwaarden_regio") or [])
+        ),
+        has_vorm=bool(
+            set(params["vorm"]).intersection(doc.get("voorwaarden_vorm") or [])
+        ),
+        has_thema=bool(set(params["themas"]).intersection(doc.get("themas") or [])),
+    )
+
+
+def script_query(
+    base_query: dict[str, Any], vereniging_profile: dict[str, Any]
+) -> dict[str, Any]:
+    """Wrap `base_query` in a `script_score` running the Painless matrix."""
+    return {
+        "script_score": {
+            "query": base_query,
+            "script": {
+                "source": PAINLESS_SOURCE,
+                "params": profile_params(vereniging_profile),
+            },
+        }
+    }
+
+
+def native_query(
+    base_query: dict[str, Any], vereniging_profile: dict[str, Any]
+) -> dict[str, Any]:
+    """Express the Painless scoring matrix with filter functions.
+
+    `function_score` with `score_mode: first` applies the weight of the first
+    matching filter, so the functions mirror the script's if/else chain. The
+    filters are plain `terms`/`exists` clauses that Elasticsearch can cache,
+    and no script runs per document.
+    """
+    params = profile_params(vereniging_profile)
+    regio = {"terms": {"voorwaarden_regio": params["gemeentes"]}}
+    vorm = {"terms": {"voorwaarden_vorm": params["vorm"]}}
+    thema = {"terms": {"themas.keyword": params["themas"]}}
+
+    functions = [
+        {
+            "filter": {
+                "terms": {"voorwaarden_vereniging": params["allowed_verenigingen"]}
+            },
+            "weight": AD_NOMINATUM_MATCH,
+        },
+        {
+            "filter": {"exists": {"field": "voorwaarden_vereniging"}},
+            "weight": AD_NOMINATUM_OTHER,
+        },
+        {
+            "filter": {"bool": {"filter": [regio, vorm, thema]}},
+            "weight": TIERS["regio_vorm_thema"],
+        },
+        {
+            "filter": {"bool": {"filter": [regio, vorm]}},
+            "weight": TIERS["regio_vorm"],
+        },
+        {
+            "filter": {
+                "bool": {
+                    "filter": [thema],
+                    "should": [regio, vorm],
+                    "minimum_should_match": 1,
+                }
+            },
+            "weight": TIERS["thema_plus_one"],
+        },
+        {
+            "filter": {"bool": {"should": [regio, vorm], "minimum_should_match": 1}},
+            "weight": TIERS["regio_or_vorm"],
+        },
+        {"filter": thema, "weight": TIERS["thema"]},
+        {"weight": TIERS["none"]},
+    ]
+    return {
+        "function_score": {
+            "query": base_query,
+            "functions": functions,
+            "score_mode": "first",
+            "boost_mode": "replace",
+        }
+    }
+
+
+def tier_doc_id(profile_id: str, tier: float) -> str:
+    """Return the id of the lookup document holding one tier of a profile."""
+    return f"{profile_id}:{tier:g}"
+
+
+async def async_profile_synced(
+    client: "AsyncElasticsearch", profile_id: str, tiers_index: str
+) -> bool:
+    """Return whether the tiers of `profile_id` were materialized.
+
+    A tier sync writes a lookup document for each stored tier of a profile,
+    even an empty one, so checking the first is enough.
+    """
+    response = await client.exists(
+        index=tiers_index, id=tier_doc_id(profile_id, STORED_TIERS[0])
+    )
+    return bool(response)
+
+
+def lookup_query(
+    base_query: dict[str, Any], profile_id: str, tiers_index: str
+) -> dict[str, Any]:
+    """Score with the tiers precomputed for a registered profile.
+
+    Every stored tier is a `terms` lookup of the product ids in one document
+    of `tiers_index`, so no profile condition is evaluated at query time.
+    Products in no stored tier, including products indexed after the last
+    tier sync, get the `none` tier.
+    """
+    functions: list[dict[str, Any]] = [
+        {
+            "filter": {
+                "terms": {
+                    "id": {
+                        "index": tiers_index,
+                        "id": tier_doc_id(profile_id, tier),
+                        "path": "ids",
+                    }
+                }
+            },
+            "weight": tier,
+        }
+        for tier in STORED_TIERS
+    ]
+    functions.append({"weight": TIERS["none"]})
+    return {
+        "function_score": {
+            "query": base_query,
+            "functions": functions,
+            "score_mode": "first",
+            "boost_mode": "replace",
+        }
+    }
+
+
+PERSONALIZATION_ENGINES = {"script": script_query, "native": native_query}
+# Engines accepted by searches; `rerank` scores outside Elasticsearch (rerank.py)
+ENGINE_NAMES = (*PERSONALIZATION_ENGINES, "rerank")
@@ -0,0 +1,315 @@
+import hashlib
+import json
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+from rich.console import Console
+
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.lexicalsearch.personalization import (
+    STORED_TIERS,
+    TIERS,
+    profile_params,
+    tier_doc_id,
+)
+from dcs.lexicalsearch.rerank import CONDITIONS, Candidates
+from dcs.models.search import VerenigingProfile
+from dcs.models.store import iter_products
+from dcs.utils.config import PROFILES_FILE, TIER_MATRIX_FILE, TIERS_INDEX
+
+console = Console()
+
+# Lookup documents are only read by `terms` lookups, never searched
+TIERS_MAPPING = {
+    "mappings": {
+        "properties": {
+            "profile": {"type": "keyword"},
+            "tier": {"type": "float"},
+            "ids": {"type": "keyword", "index": False, "doc_values": False},
+        }
+    }
+}
+
+
+class UnknownProfileError(ValueError):
+    """Raised for a profile id that is not registered."""
+
+    def __init__(self, profile_id: str) -> None:
+        """Initialize the error for `profile_id`."""
+        super().__init__(f"Unknown profile: {profile_id}")
+
+
+class ProfileStore:
+    """Registered vereniging profiles, keyed on profile id, in a JSON file.
+
+    Searches only see a profile once `sync_tiers` (`dcs profiles sync`) has
+    materialized its tiers; adding, editing or removing one does not.
+    """
+
+    def __init__(self, path: Path = PROFILES_FILE) -> None:
+        """Load the store at `path`; a missing file is an empty store."""
+        self.path = path
+        self.profiles: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                self.profiles = json.load(f)
+
+    def __len__(self) -> int:
+        """Return the number of registered profiles."""
+        return len(self.profiles)
+
+    def add(self, profile_id: str, profile: VerenigingProfile) -> None:
+        """Register or replace a profile."""
+        self.profiles[profile_id] = profile.model_dump()
+
+    def remove(self, profile_id: str) -> None:
+        """Unregister a profile."""
+        if self.profiles.pop(profile_id, None) is None:
+            raise UnknownProfileError(profile_id)
+
+    def get(self, profile_id: str) -> VerenigingProfile:
+        """Return a registered profile."""
+        if profile_id not in self.profiles:
+            raise UnknownProfileError(profile_id)
+        return VerenigingProfile(**self.profiles[profile_id])
+
+    def search_profiles(self) -> dict[str, dict[str, Any]]:
+        """Return every profile as `search_diensten` takes it, keyed on id."""
+        return {pid: self.get(pid).to_search_profile() for pid in self.profiles}
+
+    def save(self) -> None:
+        """Write the store."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w", encoding="utf-8") as f:
+            json.dump(self.profiles, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+def profile_hash(vereniging_profile: dict[str, Any]) -> str:
+    """Return a hash of the scoring parameters of a profile."""
+    params = {k: sorted(v) for k, v in profile_params(vereniging_profile).items()}
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def compute_tiers(
+    docs: Sequence[dict[str, Any]], vereniging_profiles: Sequence[dict[str, Any]]
+) -> np.ndarray:
+    """Score every document for every profile, as a (docs x profiles) array."""
+    if not docs or not vereniging_profiles:
+        return np.zeros((len(docs), len(vereniging_profiles)), dtype=np.uint8)
+    hits = [
+        {
+            "_id": doc["id"],
+            "fields": {
+                field: doc.get(field.removesuffix(".keyword")) or []
+                for field in CONDITIONS.values()
+            },
+        }
+        for doc in docs
+    ]
+    scores = Candidates.from_hits(hits).tier_scores(vereniging_profiles)
+    return scores.astype(np.uint8)
+
+
+@dataclass
+class TierMatrix:
+    """Tier of every product for every registered profile.
+
+    Rows are products and columns profiles, one byte per cell. The content
+    hash of each product and profile is kept alongside, so the next sync
+    only recomputes what changed.
+    """
+
+    product_ids: list[str] = field(default_factory=list)
+    product_hashes: list[str] = field(default_factory=list)
+    profile_ids: list[str] = field(default_factory=list)
+    profile_hashes: list[str] = field(default_factory=list)
+    tiers: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.uint8))
+
+    def save(self, path: Path) -> None:
+        """Persist the matrix."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez(
+                f,
+                product_ids=np.array(self.product_ids, dtype=str),
+                product_hashes=np.array(self.product_hashes, dtype=str),
+                profile_ids=np.array(self.profile_ids, dtype=str),
+                profile_hashes=np.array(self.profile_hashes, dtype=str),
+                tiers=self.tiers,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "TierMatrix":
+        """Load a matrix saved with `save`, or an empty one."""
+        if not path.exists():
+            return cls()
+        with np.load(path) as data:
+            return cls(
+                product_ids=data["product_ids"].tolist(),
+                product_hashes=data["product_hashes"].tolist(),
+                profile_ids=data["profile_ids"].tolist(),
+                profile_hashes=data["profile_hashes"].tolist(),
+                tiers=data["tiers"],
+            )
+
+    def aligned(self, product_ids: list[str], profile_ids: list[str]) -> np.ndarray:
+        """Return the stored tiers in the given row and column order.
+
+        Products or profiles that are not stored get the `none` tier.
+        """
+        out = np.full(
+            (len(product_ids), len(profile_ids)), TIERS["none"], dtype=np.uint8
+        )
+        rows = {pid: i for i, pid in enumerate(self.product_ids)}
+        cols = {pid: j for j, pid in enumerate(self.profile_ids)}
+        new_rows = [i for i, pid in enumerate(product_ids) if pid in rows]
+        new_cols = [j for j, pid in enumerate(profile_ids) if pid in cols]
+        if new_rows and new_cols:
+            out[np.ix_(new_rows, new_cols)] = self.tiers[
+                np.ix_(
+                    [rows[product_ids[i]] for i in new_rows],
+                    [cols[profile_ids[j]] for j in new_cols],
+                )
+            ]
+        return out
+
+
+@dataclass
+class TierSync:
+    """Summary of what a tier sync recomputed and wrote."""
+
+    products: int = 0
+    recomputed_products: int = 0
+    recomputed_profiles: int = 0
+    written_profiles: int = 0
+    deleted_profiles: int = 0
+
+    def summary(self) -> str:
+        """Return a one-line, human readable summary."""
+        return (
+            f"🧮 {self.recomputed_products}/{self.products} producten en "
+            f"{self.recomputed_profiles} profielen herberekend, "
+            f"✏️ {self.written_profiles} profielen weggeschreven, "
+            f"🗑️ {self.deleted_profiles} verwijderd"
+        )
+
+
+def update_tiers(
+    old: TierMatrix,
+    docs: Sequence[dict[str, Any]],
+    vereniging_profiles: dict[str, dict[str, Any]],
+    report: TierSync,
+) -> tuple[TierMatrix, list[str]]:
+    """Bring `old` up to date and return it with the profiles whose tiers changed.
+
+    Changed profiles are scored against every product and changed products
+    against every profile; all other cells are copied from `old`.
+    """
+    product_ids = [str(doc["id"]) for doc in docs]
+    product_hashes = [str(doc["content_hash"]) for doc in docs]
+    profile_ids = sorted(vereniging_profiles)
+    profile_hashes = [profile_hash(vereniging_profiles[p]) for p in profile_ids]
+
+    old_products = dict(zip(old.product_ids, old.product_hashes, strict=True))
+    old_profiles = dict(zip(old.profile_ids, old.profile_hashes, strict=True))
+    stale_rows = [
+        i
+        for i, (pid, h) in enumerate(zip(product_ids, product_hashes, strict=True))
+        if old_products.get(pid) != h
+    ]
+    stale_cols = [
+        j
+        for j, (pid, h) in enumerate(zip(profile_ids, profile_hashes, strict=True))
+        if old_profiles.get(pid) != h
+    ]
+
+    previous = old.aligned(product_ids, profile_ids)
+    tiers = previous.copy()
+    profiles = [vereniging_profiles[p] for p in profile_ids]
+    if stale_rows:
+        tiers[stale_rows, :] = compute_tiers([docs[i] for i in stale_rows], profiles)
+    if stale_cols:
+        tiers[:, stale_cols] = compute_tiers(docs, [profiles[j] for j in stale_cols])
+
+    # A removed product drops out of the stored tier it was in
+    current = set(product_ids)
+    removed = [i for i, pid in enumerate(old.product_ids) if pid not in current]
+    vanished = old.aligned([old.product_ids[i] for i in removed], profile_ids)
+    dirty = (tiers != previous).any(axis=0) | (vanished != TIERS["none"]).any(axis=0)
+    dirty[stale_cols] = True
+
+    report.products = len(product_ids)
+    report.recomputed_products = len(stale_rows)
+    report.recomputed_profiles = len(stale_cols)
+    matrix = TierMatrix(product_ids, product_hashes, profile_ids, profile_hashes, tiers)
+    return matrix, [profile_ids[j] for j in np.flatnonzero(dirty)]
+
+
+def tier_actions(
+    matrix: TierMatrix, profile_ids: Sequence[str], tiers_index: str
+) -> list[dict[str, Any]]:
+    """Build one lookup document per stored tier of each profile."""
+    columns = {pid: j for j, pid in enumerate(matrix.profile_ids)}
+    ids = np.array(matrix.product_ids, dtype=object)
+    return [
+        {
+            "_index": tiers_index,
+            "_id": tier_doc_id(pid, tier),
+            "profile": pid,
+            "tier": tier,
+            "ids": ids[matrix.tiers[:, columns[pid]] == tier].tolist(),
+        }
+        for pid in profile_ids
+        for tier in STORED_TIERS
+    ]
+
+
+def sync_tiers(
+    client: Elasticsearch,
+    file_path: Path,
+    store: ProfileStore,
+    tiers_index: str = TIERS_INDEX,
+    matrix_file: Path = TIER_MATRIX_FILE,
+) -> TierSync:
+    """Materialize the tiers of every registered profile into `tiers_index`.
+
+    Only changed products and profiles are rescored, and only profiles whose
+    tiers changed are rewritten; unregistered profiles are deleted. The index
+    is refreshed so searches see the new tiers immediately.
+    """
+    report = TierSync()
+    old = TierMatrix.load(matrix_file)
+    docs = [product_to_es_doc(p) for p in iter_products(file_path)]
+    matrix, dirty = update_tiers(old, docs, store.search_profiles(), report)
+
+    if not client.indices.exists(index=tiers_index):
+        client.indices.create(index=tiers_index, body=TIERS_MAPPING)
+    gone = set(old.profile_ids) - set(matrix.profile_ids)
+    actions = tier_actions(matrix, dirty, tiers_index) + [
+        {"_op_type": "delete", "_index": tiers_index, "_id": tier_doc_id(pid, tier)}
+        for pid in sorted(gone)
+        for tier in STORED_TIERS
+    ]
+    _, errors = bulk(client, actions, raise_on_error=False)
+    # Deleting the tiers of a profile that never reached the index is fine
+    failed = [
+        e
+        for e in (errors if isinstance(errors, list) else [])
+        if next(iter(e.values())).get("status") != 404  # noqa: PLR2004
+    ]
+    if failed:
+        console.print(f"[red]❌ {len(failed)} tier-documenten mislukt[/red]")
+    else:
+        # Only remember what reached the index, so a failed sync is retried
+        matrix.save(matrix_file)
+    client.indices.refresh(index=tiers_index)
+
+    report.written_profiles = len(dirty)
+    report.deleted_profiles = len(gone)
+    return report
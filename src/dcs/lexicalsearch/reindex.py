@@ -0,0 +1,156 @@
+import re
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from elastic_transport import ApiError, TransportError
+from elasticsearch import Elasticsearch
+from rich.console import Console
+
+from dcs.lexicalsearch.bulk import BulkOptions
+from dcs.lexicalsearch.es_client import get_client
+from dcs.lexicalsearch.index import create_index, index_file
+
+if TYPE_CHECKING:
+    from dcs.semanticsearch.embed import EmbeddingStage
+
+console = Console()
+
+# Settings while bulk loading a fresh generation: no periodic refreshes and no
+# replicas to keep in sync. Both are restored before the alias is swapped.
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+
+class ReindexError(RuntimeError):
+    """Raised when a blue/green reindex cannot safely complete."""
+
+
+class ConcreteIndexError(ReindexError):
+    """Raised when the alias name is taken by a concrete index."""
+
+    def __init__(self, alias: str) -> None:
+        """Initialize the error for `alias`."""
+        super().__init__(f"'{alias}' is a concrete index; drop it first")
+
+
+class TooManyFailuresError(ReindexError):
+    """Raised when too many documents failed to load into a new generation."""
+
+    def __init__(self, alias: str, failed: int) -> None:
+        """Initialize the error for `alias` with the number of failures."""
+        super().__init__(f"{failed} documents failed; kept '{alias}' unchanged")
+
+
+def generation_name(alias: str) -> str:
+    """Return a new, time-ordered index name for a generation of `alias`."""
+    return f"{alias}-{datetime.now(UTC):%Y%m%d%H%M%S}"
+
+
+def current_generation(client: Elasticsearch, alias: str) -> str | None:
+    """Return the concrete index behind `alias`, if the alias exists."""
+    if not client.indices.exists_alias(name=alias):
+        return None
+    return next(iter(client.indices.get_alias(name=alias).body), None)
+
+
+def list_generations(client: Elasticsearch, alias: str) -> list[str]:
+    """Return all generation indices of `alias`, oldest first.
+
+    Only names made by `generation_name` count: other indices that happen to
+    start with the alias are never garbage collected.
+    """
+    pattern = re.compile(rf"{re.escape(alias)}-\d{{14}}")
+    names = client.indices.get(index=f"{alias}-*", allow_no_indices=True).body
+    return sorted(name for name in names if pattern.fullmatch(name))
+
+
+def swap_alias(client: Elasticsearch, alias: str, index_name: str) -> None:
+    """Atomically point `alias` at `index_name` only."""
+    previous = (
+        list(client.indices.get_alias(name=alias).body)
+        if client.indices.exists_alias(name=alias)
+        else []
+    )
+    client.indices.update_aliases(
+        actions=[
+            *({"remove": {"index": old, "alias": alias}} for old in previous),
+            {"add": {"index": index_name, "alias": alias}},
+        ]
+    )
+    console.print(f"🔀 Alias '{alias}' now points to '{index_name}'")
+
+
+def collect_garbage(client: Elasticsearch, alias: str, keep: int) -> list[str]:
+    """Delete all but the `keep` newest generations, never the live one."""
+    live = current_generation(client, alias)
+    generations = list_generations(client, alias)
+    stale = [g for g in generations[: max(len(generations) - keep, 0)] if g != live]
+    for index_name in stale:
+        client.indices.delete(index=index_name)
+        console.print(f"🗑️ Dropped old generation '{index_name}'")
+    return stale
+
+
+def drop_generation(client: Elasticsearch, index_name: str) -> None:
+    """Delete a generation that never went live, warning if that fails."""
+    try:
+        client.indices.delete(index=index_name, ignore_unavailable=True)
+    except (ApiError, TransportError) as e:
+        console.print(f"⚠️ Could not drop unfinished generation '{index_name}': {e}")
+    else:
+        console.print(f"🗑️ Dropped unfinished generation '{index_name}'")
+
+
+def reindex(  # noqa: PLR0913
+    alias: str,
+    file_path: Path,
+    options: BulkOptions | None = None,
+    report_file: Path | None = None,
+    keep: int = 2,
+    replicas: int = 1,
+    max_failures: int = 0,
+    embeddings: "EmbeddingStage | None" = None,
+) -> str:
+    """Rebuild `alias` from `file_path` without downtime.
+
+    A new generation is bulk loaded with refreshes and replicas disabled, then
+    restored, refreshed and force-merged before `alias` is swapped to it in one
+    atomic step. Searches keep hitting the previous generation until then;
+    if anything fails before the swap, the new generation is dropped again.
+    Returns the name of the new generation.
+    """
+    client = get_client()
+    if client.indices.exists(index=alias) and not client.indices.exists_alias(
+        name=alias
+    ):
+        raise ConcreteIndexError(alias)
+
+    index_name = generation_name(alias)
+    swapped = False
+    try:
+        create_index(client, index_name=index_name, settings=BULK_LOAD_SETTINGS)
+        report = index_file(
+            client, index_name, file_path, options, report_file, embeddings
+        )
+        if len(report.failed) > max_failures:
+            raise TooManyFailuresError(alias, len(report.failed))
+
+        client.indices.put_settings(
+            index=index_name,
+            settings={"refresh_interval": None, "number_of_replicas": replicas},
+        )
+        client.indices.refresh(index=index_name)
+        client.options(request_timeout=600).indices.forcemerge(
+            index=index_name, max_num_segments=1
+        )
+        console.print(f"🧹 Restored settings and force-merged '{index_name}'")
+
+        swap_alias(client, alias, index_name)
+        swapped = True
+    finally:
+        # Garbage collection only runs after a swap, so clean up here
+        if not swapped:
+            drop_generation(client, index_name)
+
+    collect_garbage(client, alias, keep)
+    return index_name
@@ -0,0 +1,318 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Unpack
+
+import numpy as np
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+from dcs.lexicalsearch.personalization import (
+    AD_NOMINATUM_MATCH,
+    AD_NOMINATUM_OTHER,
+    TIERS,
+    profile_params,
+)
+from dcs.lexicalsearch.search import (
+    SEARCH_SECONDS,
+    SearchParams,
+    build_base_query,
+    build_facet_aggs,
+    observe_took,
+)
+
+# Profile parameter -> doc-value field it is matched against
+CONDITIONS = {
+    "allowed_verenigingen": "voorwaarden_vereniging",
+    "gemeentes": "voorwaarden_regio",
+    "vorm": "voorwaarden_vorm",
+    "themas": "themas.keyword",
+}
+
+
+@dataclass(frozen=True)
+class RerankWeights:
+    """Weights of the second-stage score.
+
+    The tier score of the personalization matrix (0-100) is added to the
+    lexical score, normalized to 0-1 over the candidates. With the defaults
+    the tiers decide the order and the lexical score only breaks ties.
+    """
+
+    tier: float = 1.0
+    lexical: float = 1.0
+
+
+@dataclass
+class Candidates:
+    """First-stage hits, with their conditions encoded as bitsets.
+
+    `bits[param]` is a boolean matrix with one row per candidate and one
+    column per value of `vocab[param]`, the values seen in this batch.
+    """
+
+    ids: list[str]
+    lexical: np.ndarray
+    vocab: dict[str, dict[str, int]]
+    bits: dict[str, np.ndarray]
+
+    @classmethod
+    def from_hits(cls, hits: Sequence[dict[str, Any]]) -> "Candidates":
+        """Encode the doc-value fields of Elasticsearch hits."""
+        vocab: dict[str, dict[str, int]] = {}
+        bits: dict[str, np.ndarray] = {}
+        for param, field in CONDITIONS.items():
+            values = [hit.get("fields", {}).get(field, []) for hit in hits]
+            columns = {
+                v: i for i, v in enumerate(sorted({v for vs in values for v in vs}))
+            }
+            matrix = np.zeros((len(hits), len(columns)), dtype=bool)
+            for row, vs in enumerate(values):
+                matrix[row, [columns[v] for v in vs]] = True
+            vocab[param] = columns
+            bits[param] = matrix
+        return cls(
+            ids=[hit["_id"] for hit in hits],
+            lexical=np.array([hit.get("_score") or 0.0 for hit in hits]),
+            vocab=vocab,
+            bits=bits,
+        )
+
+    def __len__(self) -> int:
+        """Return the number of candidates."""
+        return len(self.ids)
+
+    def _profile_bits(
+        self, param: str, profiles: Sequence[dict[str, list[str]]]
+    ) -> np.ndarray:
+        """Encode one profile parameter of every profile against the vocab."""
+        columns = self.vocab[param]
+        matrix = np.zeros((len(columns), len(profiles)), dtype=np.float32)
+        for col, params in enumerate(profiles):
+            rows = [columns[v] for v in params[param] if v in columns]
+            matrix[rows, col] = 1.0
+        return matrix
+
+    def tier_scores(self, vereniging_profiles: Sequence[dict[str, Any]]) -> np.ndarray:
+        """Score every candidate for every profile on the personalization matrix.
+
+        Returns a (candidates x profiles) array. Each condition is a product
+        of the candidate and profile bitsets, so many profiles cost one matrix
+        multiplication per condition.
+        """
+        profiles = [profile_params(p) for p in vereniging_profiles]
+        hits = {
+            param: (
+                self.bits[param].astype(np.float32)
+                @ self._profile_bits(param, profiles)
+            )
+            > 0
+            for param in CONDITIONS
+        }
+        regio, vorm, thema = hits["gemeentes"], hits["vorm"], hits["themas"]
+        tiers = np.select(
+            [
+                regio & vorm & thema,
+                regio & vorm,
+                thema & (regio | vorm),
+                regio | vorm,
+                thema,
+            ],
+            [
+                TIERS["regio_vorm_thema"],
+                TIERS["regio_vorm"],
+                TIERS["thema_plus_one"],
+                TIERS["regio_or_vorm"],
+                TIERS["thema"],
+            ],
+            default=TIERS["none"],
+        )
+        ad_nominatum = self.bits["allowed_verenigingen"].any(axis=1)[:, None]
+        return np.where(
+            ad_nominatum,
+            np.where(
+                hits["allowed_verenigingen"], AD_NOMINATUM_MATCH, AD_NOMINATUM_OTHER
+            ),
+            tiers,
+        )
+
+    def scores(
+        self,
+        vereniging_profiles: Sequence[dict[str, Any]],
+        weights: RerankWeights | None = None,
+    ) -> np.ndarray:
+        """Combine tier and normalized lexical scores, (candidates x profiles)."""
+        weights = weights or RerankWeights()
+        top = self.lexical.max(initial=0.0)
+        lexical = self.lexical / top if top > 0 else self.lexical
+        return (
+            weights.tier * self.tier_scores(vereniging_profiles)
+            + weights.lexical * lexical[:, None]
+        )
+
+    def rank(
+        self, vereniging_profile: dict[str, Any], weights: RerankWeights | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return candidate positions best first, with their scores.
+
+        Ties keep the first-stage order.
+        """
+        scores = self.scores([vereniging_profile], weights)[:, 0]
+        order = np.argsort(-scores, kind="stable")
+        return order, scores[order]
+
+
+def build_candidate_body(  # noqa: PLR0913
+    k: int,
+    query: str | None = None,
+    themas: list[str] | None = None,
+    gemeente: str | None = None,
+    *,
+    facets: bool = True,
+    matching: str = "fuzzy",
+) -> dict[str, Any]:
+    """Build the first-stage request: top `k` lexical hits, doc values only."""
+    body: dict[str, Any] = {
+        "size": k,
+        "query": build_base_query(query, themas, gemeente, matching),
+        "_source": False,
+        "docvalue_fields": list(CONDITIONS.values()),
+    }
+    if facets:
+        body["aggs"] = build_facet_aggs()
+    return body
+
+
+def wants_rerank(params: SearchParams) -> bool:
+    """Whether a search should run in two stages.
+
+    Re-ranking only applies to relevance-sorted searches with an inline
+    profile; a registered profile already has its tiers materialized.
+    """
+    return (
+        params.get("personalization") == "rerank"
+        and bool(params.get("vereniging_profile"))
+        and not params.get("profile_id")
+        and params.get("sort_by") == "relevance"
+    )
+
+
+def single_stage(params: SearchParams) -> SearchParams:
+    """Swap the rerank engine for the single-stage engine with equal tiers."""
+    if params.get("personalization") == "rerank":
+        return {**params, "personalization": "native"}
+    return params
+
+
+def _sources(docs: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """Map the found documents of an mget response onto their id."""
+    return {d["_id"]: d["_source"] for d in docs if d.get("found")}
+
+
+def _response(
+    first: dict[str, Any],
+    candidates: Candidates,
+    page: list[tuple[int, float]],
+    sources: dict[str, dict[str, Any]],
+) -> dict[str, Any]:
+    """Assemble a search response from the first stage and the ranked page."""
+    response = {
+        "took": first.get("took"),
+        "hits": {
+            "total": first["hits"]["total"],
+            "max_score": page[0][1] if page else None,
+            "hits": [
+                {
+                    "_id": candidates.ids[i],
+                    "_score": score,
+                    "_source": sources.get(candidates.ids[i], {}),
+                }
+                for i, score in page
+            ],
+        },
+    }
+    if "aggregations" in first:
+        response["aggregations"] = first["aggregations"]
+    return response
+
+
+def _page(
+    candidates: Candidates,
+    params: SearchParams,
+    weights: RerankWeights | None,
+) -> list[tuple[int, float]]:
+    """Rank the candidates and cut out the requested page."""
+    order, scores = candidates.rank(params.get("vereniging_profile") or {}, weights)
+    start = params.get("from_", 0)
+    end = start + params.get("size", 10)
+    return [
+        (int(i), float(s))
+        for i, s in zip(order[start:end], scores[start:end], strict=True)
+    ]
+
+
+def _candidate_body(k: int, params: SearchParams) -> dict[str, Any]:
+    """Build and time the first-stage request of a search."""
+    with SEARCH_SECONDS.time(request="rerank", stage="build"):
+        return build_candidate_body(
+            k,
+            params.get("query"),
+            params.get("themas"),
+            params.get("gemeente"),
+            facets=params.get("facets", True),
+            matching=params.get("matching", "fuzzy"),
+        )
+
+
+def _rank(
+    first: dict[str, Any], params: SearchParams, weights: RerankWeights | None
+) -> tuple[Candidates, list[tuple[int, float]]]:
+    """Encode and re-rank the first-stage hits, timed as the `rank` stage."""
+    with SEARCH_SECONDS.time(request="rerank", stage="rank"):
+        candidates = Candidates.from_hits(first["hits"]["hits"])
+        return candidates, _page(candidates, params, weights)
+
+
+def rerank_search(
+    client: Elasticsearch,
+    ix: str = "diensten",
+    k: int = 200,
+    weights: RerankWeights | None = None,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Search in two stages: lexical top `k`, then a NumPy profile re-rank.
+
+    Results are always sorted on the combined score. Only the top `k`
+    lexical hits can appear, so pages beyond `k` are empty. Sources are
+    fetched for the returned page only.
+    """
+    body = _candidate_body(k, params)
+    with SEARCH_SECONDS.time(request="rerank", stage="roundtrip"):
+        first = client.search(index=ix, body=body).body
+    observe_took(first, "rerank")
+    candidates, page = _rank(first, params, weights)
+    ids = [candidates.ids[i] for i, _ in page]
+    with SEARCH_SECONDS.time(request="mget", stage="roundtrip"):
+        sources = _sources(client.mget(index=ix, ids=ids)["docs"]) if ids else {}
+    return _response(first, candidates, page, sources)
+
+
+async def async_rerank_search(
+    client: AsyncElasticsearch,
+    ix: str = "diensten",
+    k: int = 200,
+    weights: RerankWeights | None = None,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Search in two stages without blocking the event loop."""
+    body = _candidate_body(k, params)
+    with SEARCH_SECONDS.time(request="rerank", stage="roundtrip"):
+        response = await client.search(index=ix, body=body)
+    first = response.body
+    observe_took(first, "rerank")
+    candidates, page = _rank(first, params, weights)
+    ids = [candidates.ids[i] for i, _ in page]
+    sources = {}
+    if ids:
+        with SEARCH_SECONDS.time(request="mget", stage="roundtrip"):
+            docs = await client.mget(index=ix, ids=ids)
+        sources = _sources(docs["docs"])
+    return _response(first, candidates, page, sources)
@@ -1,14 +1,194 @@
-from typing import Any
+from collections.abc import Sequence
+from typing import Any, TypedDict, Unpack
 
-from elasticsearch import Elasticsearch
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 from rich.console import Console
 
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.lexicalsearch.mapping import INDEX_SORT, MAPPING
+from dcs.lexicalsearch.personalization import PERSONALIZATION_ENGINES, lookup_query
+from dcs.models.product import Product
+from dcs.utils.config import DEBUG, FUZZY_MIN_HITS, SORTED_TOTAL_HITS, TIERS_INDEX
+from dcs.utils.metrics import counter, histogram
+
 console = Console()
 
+SEARCH_SECONDS = histogram(
+    "dcs_search_seconds",
+    "Search time per request kind and stage: query build, round trip, "
+    "Elasticsearch took and response serialization",
+    ("request", "stage"),
+)
+SEARCH_PHASES = counter(
+    "dcs_search_phase_total",
+    "Adaptive searches per phase that answered them: exact or fuzzy",
+    ("phase",),
+)
 
-def search_diensten(  # noqa: PLR0913
-    client: Elasticsearch,
-    ix: str = "diensten",
+# Fields matched by free text and their boosts
+QUERY_FIELDS = {"naam": 3.0, "omschrijving": 1.0, "themas": 1.0}
+# How free text matches: `adaptive` tries `exact` first, then `fuzzy`
+MATCHING_MODES = ("fuzzy", "exact", "adaptive")
+
+# Sort mode -> doc-value field sorted on, and the field that breaks its ties
+SORT_FIELDS = {
+    "naam": "naam.keyword",
+    "laatste_wijzigingsdatum": "laatste_wijzigingsdatum",
+}
+SORT_TIEBREAKS = {"laatste_wijzigingsdatum": "naam.keyword"}
+
+# Facet name -> keyword field aggregated for it
+FACETS = {
+    "themas": "themas.keyword",
+    "gemeentes": "gemeente.keyword",
+    "types": "type.keyword",
+}
+
+
+class SearchParams(TypedDict, total=False):
+    """Keyword arguments accepted by `build_search_body`."""
+
+    query: str | None
+    themas: list[str] | None
+    gemeente: str | None
+    sort_by: str
+    sort_order: str
+    from_: int
+    size: int
+    vereniging_profile: dict[str, Any] | None
+    personalization: str
+    facets: bool
+    profile_id: str | None
+    matching: str
+
+
+class UnsearchableFieldError(ValueError):
+    """Raised when free text would be matched against a field that is empty."""
+
+    def __init__(self, fields: Sequence[str]) -> None:
+        """Initialize the error for `fields`."""
+        super().__init__(
+            f"Not a text field of indexed documents: {', '.join(sorted(fields))}"
+        )
+
+
+class UnknownMatchingError(ValueError):
+    """Raised for a matching mode that does not exist."""
+
+    def __init__(self, matching: str) -> None:
+        """Initialize the error for `matching`."""
+        super().__init__(
+            f"Unknown matching mode: {matching} (use {', '.join(MATCHING_MODES)})"
+        )
+
+
+def searchable_fields() -> set[str]:
+    """Return the text fields of `MAPPING` that `product_to_es_doc` writes.
+
+    A field that is mapped but never written, like `gemeente`, only costs
+    term lookups and fuzzy expansions that can never match.
+    """
+    written = product_to_es_doc(Product(id="", naam=""))
+    return {
+        name
+        for name, spec in MAPPING["mappings"]["properties"].items()
+        if spec.get("type") == "text" and name in written
+    }
+
+
+def multi_match_fields(boosts: dict[str, float]) -> list[str]:
+    """Return `boosts` as `multi_match` fields, checked against the mapping."""
+    unsearchable = set(boosts) - searchable_fields()
+    if unsearchable:
+        raise UnsearchableFieldError(list(unsearchable))
+    return [
+        name if boost == 1 else f"{name}^{boost:g}" for name, boost in boosts.items()
+    ]
+
+
+MULTI_MATCH_FIELDS = multi_match_fields(QUERY_FIELDS)
+
+
+def build_filters(
+    themas: list[str] | None = None,
+    gemeente: str | None = None,
+) -> list[dict[str, Any]]:
+    """Build the clauses that restrict diensten to the selected filters."""
+    clauses: list[dict[str, Any]] = []
+    if themas:
+        clauses.append({"terms": {"themas.keyword": themas}})
+    if gemeente:
+        clauses.append({"match_phrase": {"gemeente": gemeente}})
+    return clauses
+
+
+def build_base_query(
+    query: str | None = None,
+    themas: list[str] | None = None,
+    gemeente: str | None = None,
+    matching: str = "fuzzy",
+) -> dict[str, Any]:
+    """Build the unpersonalized query that selects matching diensten.
+
+    Only `exact` matching skips the fuzzy expansion of query terms;
+    `adaptive` is planned by `search_diensten` and builds as `fuzzy`.
+    """
+    if matching not in MATCHING_MODES:
+        raise UnknownMatchingError(matching)
+    must_clauses: list[dict[str, Any]] = []
+
+    if query:
+        multi_match: dict[str, Any] = {"query": query, "fields": MULTI_MATCH_FIELDS}
+        if matching != "exact":
+            multi_match["fuzziness"] = "AUTO"
+        must_clauses.append({"multi_match": multi_match})
+
+    must_clauses += build_filters(themas, gemeente)
+
+    return {"bool": {"must": must_clauses if must_clauses else [{"match_all": {}}]}}
+
+
+def build_facet_aggs() -> dict[str, Any]:
+    """Build the terms aggregations for every facet."""
+    return {name: {"terms": {"field": field}} for name, field in FACETS.items()}
+
+
+def build_facet_body(
+    query: str | None = None,
+    themas: list[str] | None = None,
+    gemeente: str | None = None,
+    matching: str = "fuzzy",
+) -> dict[str, Any]:
+    """Build a hits-free request that only computes facet counts.
+
+    Facets depend on the query and filters alone, not on paging, sorting or
+    the vereniging profile, so this body can be cached per filter set.
+    """
+    return {
+        "size": 0,
+        "track_total_hits": False,
+        "query": build_base_query(query, themas, gemeente, matching),
+        "aggs": build_facet_aggs(),
+    }
+
+
+def build_sort(sort_by: str, sort_order: str) -> list[dict[str, Any]]:
+    """Build the `sort` of a search on `sort_by`, with its tiebreak."""
+    if sort_by == "relevance":
+        return [{"_score": {"order": "desc"}}]
+    sort = [{SORT_FIELDS.get(sort_by, sort_by): {"order": sort_order}}]
+    if sort_by in SORT_TIEBREAKS:
+        sort.append({SORT_TIEBREAKS[sort_by]: {"order": "asc"}})
+    return sort
+
+
+def follows_index_sort(sort: list[dict[str, Any]]) -> bool:
+    """Whether `sort` is a prefix of `INDEX_SORT`, so segments end early."""
+    index_sort = [{field: {"order": order}} for field, order in INDEX_SORT]
+    return bool(sort) and sort == index_sort[: len(sort)]
+
+
+def build_search_body(  # noqa: PLR0913
     query: str | None = None,
     themas: list[str] | None = None,
     gemeente: str | None = None,
@@ -17,152 +197,247 @@ def search_diensten(  # noqa: PLR0913
     from_: int = 0,
     size: int = 10,
     vereniging_profile: dict[str, Any] | None = None,
+    personalization: str = "script",
+    facets: bool = True,  # noqa: FBT001, FBT002
+    profile_id: str | None = None,
+    matching: str = "fuzzy",
 ) -> dict[str, Any]:
-    """Search the diensten index with optional filters and sorting."""
-    must_clauses = []
+    """Build the request body for a diensten search.
 
-    if query:
-        must_clauses.append(
-            {
-                "multi_match": {
-                    "query": query,
-                    "fields": ["naam^3", "omschrijving_clean", "themas", "gemeente"],
-                    "fuzziness": "AUTO",
-                }
-            }
+    `personalization` selects how a vereniging profile is scored: `script`
+    (inline Painless) or `native` (cached filter clauses, same ranking).
+    A registered `profile_id` takes precedence and looks up its precomputed
+    tiers instead. With `facets=False` the body only fetches a page of hits;
+    facet counts can then come from `build_facet_body`. Searches sorted like
+    the index count at most `SORTED_TOTAL_HITS` hits, so they end early.
+    """
+    base_query = build_base_query(query, themas, gemeente, matching)
+
+    if profile_id:
+        query_block = lookup_query(base_query, profile_id, TIERS_INDEX)
+    elif vereniging_profile:
+        query_block = PERSONALIZATION_ENGINES[personalization](
+            base_query, vereniging_profile
         )
+    else:
+        query_block = base_query
 
-    if themas:
-        must_clauses.append({"terms": {"themas.keyword": themas}})
+    body: dict[str, Any] = {"from": from_, "size": size, "query": query_block}
+    if facets:
+        body["aggs"] = build_facet_aggs()
 
-    if gemeente:
-        must_clauses.append({"match_phrase": {"gemeente": gemeente}})
+    if sort_by:
+        body["sort"] = build_sort(sort_by, sort_order)
+        if follows_index_sort(body["sort"]):
+            body["track_total_hits"] = SORTED_TOTAL_HITS
 
-    base_query = {
-        "bool": {"must": must_clauses if must_clauses else [{"match_all": {}}]}
-    }
+    return body
 
-    if vereniging_profile:
-        query_block = {
-            "script_score": {
-                "query": base_query,
-                "script": {
-                    "source": """
-// 1. Init
-boolean hasRegio = false;
-boolean hasVorm = false;
-boolean hasThema = false;
-boolean adNominatumMatched = false;
-boolean adNominatumOther = false;
-
-// 2. Vereniging name check
-boolean verenigingFieldExists = doc.containsKey('voorwaarden_vereniging');
-if (verenigingFieldExists && doc['voorwaarden_vereniging'].size() > 0) {
-  def vs = doc['voorwaarden_vereniging'];
-  boolean anyMatch = false;
-  for (int i = 0; i < vs.length; i++) {
-    if (params.allowed_verenigingen.contains(vs[i])) {
-      anyMatch = true;
-      break;
-    }
-  }
-  if (anyMatch) {
-    adNominatumMatched = true;
-  } else {
-    adNominatumOther = true;
-  }
-}
 
-// 3. Ad nominatum logic
-if (adNominatumOther) {
-  return 0.0;
-}
-if (adNominatumMatched) {
-  return 100.0;
-}
+def observe_took(result: dict[str, Any], request: str) -> None:
+    """Record the time Elasticsearch reports it spent on a response."""
+    if result.get("took") is not None:
+        SEARCH_SECONDS.observe(result["took"] / 1000, request=request, stage="took")
 
-// 4. Regio match (voorwaarden_regio vs werkingsgebieden)
-if (doc.containsKey('voorwaarden_regio') && doc['voorwaarden_regio'].size() > 0) {
-  def regio = doc['voorwaarden_regio'];
-  for (int i = 0; i < regio.length; i++) {
-    if (params.gemeentes.contains(regio[i])) {
-      hasRegio = true;
-      break;
-    }
-  }
-}
 
-// 5. Vorm match (voorwaarden_vorm vs type_vereniging)
-if (doc.containsKey('voorwaarden_vorm') && doc['voorwaarden_vorm'].size() > 0) {
-  def vormen = doc['voorwaarden_vorm'];
-  for (int i = 0; i < vormen.length; i++) {
-    if (params.vorm.contains(vormen[i])) {
-      hasVorm = true;
-      break;
-    }
-  }
-}
+def _build(request: str, **params: Unpack[SearchParams]) -> dict[str, Any]:
+    """Build and time a search body; log it in debug mode only."""
+    with SEARCH_SECONDS.time(request=request, stage="build"):
+        body = build_search_body(**params)
+    if DEBUG:
+        console.log(f"🔎 Search body: {body}")
+    return body
 
-// 6. Thema match (themas.keyword vs hoofdactiviteiten)
-if (doc.containsKey('themas.keyword') && doc['themas.keyword'].size() > 0) {
-  def themas = doc['themas.keyword'];
-  for (int i = 0; i < themas.length; i++) {
-    if (params.themas.contains(themas[i])) {
-      hasThema = true;
-      break;
-    }
-  }
-}
 
-// 7. Scoring matrix
-if (hasRegio && hasVorm && hasThema) {
-  return 90.0;
-} else if (hasRegio && hasVorm) {
-  return 80.0;
-} else if ((hasRegio && hasThema) || (hasVorm && hasThema)) {
-  return 70.0;
-} else if (hasRegio || hasVorm) {
-  return 60.0;
-} else if (hasThema) {
-  return 20.0;
-} else {
-  return 10.0;
-}
-        """,
-                    "params": {
-                        "gemeentes": vereniging_profile.get("werkingsgebieden", []),
-                        "vorm": vereniging_profile.get("type_vereniging", []),
-                        "themas": vereniging_profile.get("hoofdactiviteiten", []),
-                        "allowed_verenigingen": list(
-                            vereniging_profile.get("namen", {}).values()
-                        ),
-                    },
-                },
-            }
-        }
-    else:
-        query_block = base_query  # type: ignore  # noqa: PGH003
-
-    body = {
-        "from": from_,
-        "size": size,
-        "query": query_block,
-        "aggs": {
-            "themas": {"terms": {"field": "themas.keyword"}},
-            "gemeentes": {"terms": {"field": "gemeente.keyword"}},
-            "types": {"terms": {"field": "type.keyword"}},
-        },
-    }
+def wants_planner(params: SearchParams) -> bool:
+    """Whether a search runs exact first and may escalate to fuzzy."""
+    return params.get("matching") == "adaptive" and bool(params.get("query"))
+
+
+def needs_fuzzy(result: dict[str, Any]) -> bool:
+    """Whether the exact phase found too few hits to stop there."""
+    return bool(result["hits"]["total"]["value"] < FUZZY_MIN_HITS)
+
+
+def _planned(result: dict[str, Any], phase: str) -> dict[str, Any]:
+    """Tag the response of an adaptive search with the phase that answered it."""
+    SEARCH_PHASES.inc(phase=phase)
+    return {**result, "phase": phase}
+
+
+def _search_once(
+    client: Elasticsearch, ix: str, params: SearchParams
+) -> dict[str, Any]:
+    body = _build("hits", **params)
+    with SEARCH_SECONDS.time(request="hits", stage="roundtrip"):
+        result = dict(client.search(index=ix, body=body).body)
+    observe_took(result, "hits")
+    return result
+
+
+def search_diensten(
+    client: Elasticsearch, ix: str = "diensten", **params: Unpack[SearchParams]
+) -> dict[str, Any]:
+    """Search the diensten index with optional filters and sorting.
+
+    `params` are the keyword arguments of `build_search_body`. With
+    `matching="adaptive"` the query runs without fuzziness first and only
+    runs fuzzy when that finds fewer than `FUZZY_MIN_HITS` diensten; the
+    response then holds the `phase` that answered it.
+    """
+    if not wants_planner(params):
+        return _search_once(client, ix, params)
+    result = _search_once(client, ix, {**params, "matching": "exact"})
+    if not needs_fuzzy(result):
+        return _planned(result, "exact")
+    return _planned(_search_once(client, ix, {**params, "matching": "fuzzy"}), "fuzzy")
+
+
+async def _async_search_once(
+    client: AsyncElasticsearch, ix: str, params: SearchParams
+) -> dict[str, Any]:
+    body = _build("hits", **params)
+    with SEARCH_SECONDS.time(request="hits", stage="roundtrip"):
+        response = await client.search(index=ix, body=body)
+    result = dict(response.body)
+    observe_took(result, "hits")
+    return result
+
+
+async def async_search_diensten(
+    client: AsyncElasticsearch, ix: str = "diensten", **params: Unpack[SearchParams]
+) -> dict[str, Any]:
+    """Search the diensten index without blocking the event loop."""
+    if not wants_planner(params):
+        return await _async_search_once(client, ix, params)
+    result = await _async_search_once(client, ix, {**params, "matching": "exact"})
+    if not needs_fuzzy(result):
+        return _planned(result, "exact")
+    fuzzy = await _async_search_once(client, ix, {**params, "matching": "fuzzy"})
+    return _planned(fuzzy, "fuzzy")
+
+
+async def async_search_facets(  # noqa: PLR0913
+    client: AsyncElasticsearch,
+    ix: str = "diensten",
+    query: str | None = None,
+    themas: list[str] | None = None,
+    gemeente: str | None = None,
+    matching: str = "fuzzy",
+) -> dict[str, Any]:
+    """Compute facet counts for a query and filter set.
+
+    The `took` of this hits-free request is the aggregation time.
+    """
+    body = build_facet_body(query, themas, gemeente, matching)
+    with SEARCH_SECONDS.time(request="facets", stage="roundtrip"):
+        response = await client.search(index=ix, body=body)
+    result = dict(response.body)
+    observe_took(result, "facets")
+    return result
+
+
+def build_msearch_body(
+    ix: str, searches: Sequence[SearchParams]
+) -> list[dict[str, Any]]:
+    """Build the header/body pairs of an `_msearch` request."""
+    lines: list[dict[str, Any]] = []
+    for params in searches:
+        lines += [{"index": ix}, build_search_body(**params)]
+    return lines
+
+
+def _first_phase(searches: Sequence[SearchParams]) -> list[SearchParams]:
+    """Run every adaptive search exact first."""
+    return [
+        {**params, "matching": "exact"} if wants_planner(params) else params
+        for params in searches
+    ]
+
+
+def _escalations(
+    searches: Sequence[SearchParams], responses: list[dict[str, Any]]
+) -> list[int]:
+    """Return the adaptive searches whose exact phase found too few hits."""
+    return [
+        i
+        for i, (params, item) in enumerate(zip(searches, responses, strict=True))
+        if wants_planner(params) and "error" not in item and needs_fuzzy(item)
+    ]
+
+
+def _merge_phases(
+    searches: Sequence[SearchParams],
+    responses: list[dict[str, Any]],
+    fuzzy: dict[int, dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Put the fuzzy responses in place and tag adaptive responses with a phase."""
+    merged = []
+    for i, (params, item) in enumerate(zip(searches, responses, strict=True)):
+        if i in fuzzy:
+            merged.append(_planned(fuzzy[i], "fuzzy"))
+        elif wants_planner(params) and "error" not in item:
+            merged.append(_planned(item, "exact"))
+        else:
+            merged.append(item)
+    return merged
+
+
+def msearch_diensten(
+    client: Elasticsearch, ix: str, searches: Sequence[SearchParams]
+) -> list[dict[str, Any]]:
+    """Run several searches in a single round trip.
+
+    Responses come back in the order of `searches`. A failed search yields
+    an item with an `error` key instead of raising, so one bad request does
+    not sink the others. Adaptive searches that need their fuzzy phase are
+    escalated together, in a second round trip.
+    """
+    if not searches:
+        return []
+    responses = _msearch(client, ix, _first_phase(searches))
+    escalate = _escalations(searches, responses)
+    retried = _msearch(
+        client, ix, [{**searches[i], "matching": "fuzzy"} for i in escalate]
+    )
+    return _merge_phases(searches, responses, dict(zip(escalate, retried, strict=True)))
+
+
+def _msearch(
+    client: Elasticsearch, ix: str, searches: Sequence[SearchParams]
+) -> list[dict[str, Any]]:
+    if not searches:
+        return []
+    with SEARCH_SECONDS.time(request="msearch", stage="build"):
+        body = build_msearch_body(ix, searches)
+    with SEARCH_SECONDS.time(request="msearch", stage="roundtrip"):
+        response = client.msearch(body=body)
+    observe_took(response.body, "msearch")
+    return [dict(item) for item in response["responses"]]
+
+
+async def async_msearch_diensten(
+    client: AsyncElasticsearch, ix: str, searches: Sequence[SearchParams]
+) -> list[dict[str, Any]]:
+    """Run several searches in a single round trip without blocking."""
+    if not searches:
+        return []
+    responses = await _async_msearch(client, ix, _first_phase(searches))
+    escalate = _escalations(searches, responses)
+    retried = await _async_msearch(
+        client, ix, [{**searches[i], "matching": "fuzzy"} for i in escalate]
+    )
+    return _merge_phases(searches, responses, dict(zip(escalate, retried, strict=True)))
 
-    if sort_by == "relevance":
-        body["sort"] = [{"_score": {"order": "desc"}}]
-    elif sort_by:
-        sort_field = (
-            f"{sort_by}.keyword"
-            if sort_by in ["naam", "laatste_wijzigingsdatum"]
-            else sort_by
-        )
-        body["sort"] = [{sort_field: {"order": sort_order}}]
 
-    console.log(f"🔎 Search body: {body}")
-    return dict(client.search(index=ix, body=body).body)
+async def _async_msearch(
+    client: AsyncElasticsearch, ix: str, searches: Sequence[SearchParams]
+) -> list[dict[str, Any]]:
+    if not searches:
+        return []
+    with SEARCH_SECONDS.time(request="msearch", stage="build"):
+        body = build_msearch_body(ix, searches)
+    with SEARCH_SECONDS.time(request="msearch", stage="roundtrip"):
+        response = await client.msearch(body=body)
+    observe_took(response.body, "msearch")
+    return [dict(item) for item in response["responses"]]
@@ -0,0 +1,290 @@
+import json
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections.abc import Iterable
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+from dcs.lexicalsearch.analysis import DUTCH_STOPWORDS
+from dcs.lexicalsearch.search import SEARCH_SECONDS, observe_took
+from dcs.models.product import Product
+from dcs.models.store import iter_products
+from dcs.utils.config import CLEANED_DIR
+
+SUGGEST_SIZE = 10
+# A product changed this many days before the newest one weighs half
+HALF_LIFE_DAYS = 365
+# Weight of a product without a change date, as if it were very old
+UNDATED_WEIGHT = 0.1
+# Matching a later word of a name, e.g. "jeugd" in "Subsidie jeugdwerking"
+INFIX_PENALTY = 0.5
+# Seconds between checks whether the suggest file was rewritten
+RELOAD_INTERVAL = 5.0
+
+_NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Fold `text` to lowercase words without accents, single-spaced."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD_RE.sub(" ", stripped).strip()
+
+
+def suggest_path(ix: str) -> Path:
+    """Return where the suggestions of index `ix` are persisted."""
+    return CLEANED_DIR / f"{ix}.suggest.json"
+
+
+def _parse_date(value: str | None) -> date | None:
+    try:
+        return date.fromisoformat(value or "")
+    except ValueError:
+        return None
+
+
+def _recency(changed: date | None, newest: date) -> float:
+    """Weigh a change date by its age relative to the newest product."""
+    if changed is None:
+        return UNDATED_WEIGHT
+    return float(0.5 ** (max((newest - changed).days, 0) / HALF_LIFE_DAYS))
+
+
+class SuggestIndex:
+    """Prefix index over product names and themes, for type-ahead.
+
+    Every suggestion is keyed on its normalized text from each word start,
+    so "jeu" finds "Subsidie voor jeugdwerking". The keys are kept sorted: a
+    prefix is a contiguous range, found with two binary searches, and the
+    best suggestions of the range are picked by weight. Names weigh by
+    recency, themes by the share of products they cover.
+    """
+
+    def __init__(self, entries: list[dict[str, Any]]) -> None:
+        """Index `entries`, dicts with `text`, `type`, `weight` and `id`."""
+        self.entries = entries
+        keyed = sorted(
+            (key, i, infix)
+            for i, entry in enumerate(entries)
+            for key, infix in self._keys(entry["text"])
+        )
+        self.keys = [key for key, _, _ in keyed]
+        self.positions = np.array([i for _, i, _ in keyed], dtype=np.int64)
+        self.weights = np.array(
+            [
+                entries[i]["weight"] * (INFIX_PENALTY if infix else 1.0)
+                for _, i, infix in keyed
+            ],
+            dtype=np.float64,
+        )
+
+    def __len__(self) -> int:
+        """Return the number of distinct suggestions."""
+        return len(self.entries)
+
+    @staticmethod
+    def _keys(text: str) -> Iterable[tuple[str, bool]]:
+        """Yield the normalized text from each word that is no stopword."""
+        words = normalize(text).split()
+        for i, word in enumerate(words):
+            if i == 0 or word not in DUTCH_STOPWORDS:
+                yield " ".join(words[i:]), i > 0
+
+    @classmethod
+    def build(cls, products: Iterable[Product]) -> "SuggestIndex":
+        """Build the index from cleaned products."""
+        dated = [(p, _parse_date(p.laatste_wijzigingsdatum)) for p in products]
+        # Relative to the newest change, so a rebuild of the same file is equal
+        newest = max((d for _, d in dated if d), default=date.min)
+
+        names: dict[str, dict[str, Any]] = {}
+        themas: dict[str, int] = {}
+        for product, changed in dated:
+            weight = _recency(changed, newest)
+            entry = names.get(product.naam)
+            if entry is None or weight > entry["weight"]:
+                names[product.naam] = {
+                    "text": product.naam,
+                    "type": "naam",
+                    "weight": weight,
+                    "id": product.id,
+                }
+            for thema in product.themas:
+                themas[thema] = themas.get(thema, 0) + 1
+
+        most = max(themas.values(), default=1)
+        entries = list(names.values()) + [
+            {"text": thema, "type": "thema", "weight": count / most, "id": None}
+            for thema, count in themas.items()
+        ]
+        return cls(entries)
+
+    def suggest(self, prefix: str, size: int = SUGGEST_SIZE) -> list[dict[str, Any]]:
+        """Return the `size` best suggestions starting with `prefix`.
+
+        Suggestions are ordered by weight, then alphabetically.
+        """
+        key = normalize(prefix)
+        if not key or size <= 0:
+            return []
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + "\uffff", lo)
+        if lo == hi:
+            return []
+
+        weights = self.weights[lo:hi]
+        # A name can match at several words, so take some spare candidates
+        # and only sort the whole range when they hold too few names
+        take = min(hi - lo, 4 * size)
+        top = (
+            np.argpartition(-weights, take - 1)[:take]
+            if take < hi - lo
+            else np.arange(hi - lo)
+        )
+        order = top[np.lexsort((top, -weights[top]))]
+        if take < hi - lo and len(set(self.positions[lo + order].tolist())) < size:
+            order = np.lexsort((np.arange(hi - lo), -weights))
+
+        seen: set[int] = set()
+        suggestions: list[dict[str, Any]] = []
+        for j in order.tolist():
+            i = int(self.positions[lo + j])
+            if i in seen:
+                continue
+            seen.add(i)
+            entry = self.entries[i]
+            suggestions.append({**entry, "weight": round(float(weights[j]), 4)})
+            if len(suggestions) == size:
+                break
+        return suggestions
+
+    def save(self, path: Path) -> None:
+        """Persist the suggestions; the keys are rebuilt on load."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: Path) -> "SuggestIndex":
+        """Load suggestions saved with `save`."""
+        with path.open(encoding="utf-8") as f:
+            return cls(json.load(f))
+
+
+def build_suggestions(file_path: Path, ix: str) -> SuggestIndex:
+    """Build and persist the suggestions of the products indexed into `ix`."""
+    index = SuggestIndex.build(iter_products(file_path))
+    index.save(suggest_path(ix))
+    return index
+
+
+class SuggestStore:
+    """The persisted suggest index, reloaded when it is rebuilt.
+
+    The file is checked at most every `interval` seconds, so a reindex shows
+    up without restarting the API and a keystroke never waits on disk.
+    """
+
+    def __init__(self, path: Path, interval: float = RELOAD_INTERVAL) -> None:
+        """Initialize the store for `path`; nothing is loaded yet."""
+        self.path = path
+        self.interval = interval
+        self._index: SuggestIndex | None = None
+        self._mtime: float | None = None
+        self._checked_at = float("-inf")
+
+    def current(self) -> SuggestIndex | None:
+        """Return the latest index, or None when none was built."""
+        now = time.monotonic()
+        if now - self._checked_at < self.interval:
+            return self._index
+        self._checked_at = now
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            self._index = self._mtime = None
+            return None
+        if mtime != self._mtime:
+            self._index, self._mtime = SuggestIndex.load(self.path), mtime
+        return self._index
+
+
+def build_suggest_body(prefix: str, size: int = SUGGEST_SIZE) -> dict[str, Any]:
+    """Build the request body for suggestions from the `naam.suggest` field.
+
+    The mirror of `SuggestIndex` for setups with several API nodes: names
+    match on word prefixes, recent products decay like `HALF_LIFE_DAYS`.
+    """
+    return {
+        "size": size,
+        "_source": ["id", "naam"],
+        "query": {
+            "function_score": {
+                "query": {
+                    "multi_match": {
+                        "query": prefix,
+                        "type": "bool_prefix",
+                        "fields": [
+                            "naam.suggest",
+                            "naam.suggest._2gram",
+                            "naam.suggest._3gram",
+                        ],
+                    }
+                },
+                "functions": [
+                    {
+                        "exp": {
+                            "laatste_wijzigingsdatum": {
+                                "origin": "now",
+                                "scale": f"{HALF_LIFE_DAYS}d",
+                                "decay": 0.5,
+                            }
+                        }
+                    }
+                ],
+                "boost_mode": "multiply",
+            }
+        },
+    }
+
+
+def _es_suggestions(result: dict[str, Any]) -> list[dict[str, Any]]:
+    return [
+        {
+            "text": hit["_source"]["naam"],
+            "type": "naam",
+            "weight": round(hit["_score"], 4),
+            "id": hit["_source"]["id"],
+        }
+        for hit in result["hits"]["hits"]
+    ]
+
+
+def suggest_es(
+    client: Elasticsearch, ix: str, prefix: str, size: int = SUGGEST_SIZE
+) -> list[dict[str, Any]]:
+    """Suggest product names from Elasticsearch."""
+    if not normalize(prefix):
+        return []
+    with SEARCH_SECONDS.time(request="suggest", stage="roundtrip"):
+        result = client.search(index=ix, body=build_suggest_body(prefix, size)).body
+    observe_took(result, "suggest")
+    return _es_suggestions(result)
+
+
+async def async_suggest_es(
+    client: AsyncElasticsearch, ix: str, prefix: str, size: int = SUGGEST_SIZE
+) -> list[dict[str, Any]]:
+    """Suggest product names from Elasticsearch without blocking."""
+    if not normalize(prefix):
+        return []
+    with SEARCH_SECONDS.time(request="suggest", stage="roundtrip"):
+        response = await client.search(index=ix, body=build_suggest_body(prefix, size))
+    observe_took(response.body, "suggest")
+    return _es_suggestions(response.body)
@@ -0,0 +1,124 @@
+from typing import TYPE_CHECKING, Any, Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+if TYPE_CHECKING:
+    from dcs.lexicalsearch.search import SearchParams
+
+SORT_MODES = {
+    "relevance": ("relevance", "desc"),
+    "date": ("laatste_wijzigingsdatum", "desc"),
+    "naam": ("naam", "asc"),
+}
+
+# Upper bound on the searches in one batch request
+MAX_BATCH_SIZE = 20
+# Upper bound on the hits of one page
+MAX_PAGE_SIZE = 100
+# Deepest offset page, Elasticsearch's default `index.max_result_window`
+MAX_RESULT_WINDOW = 10_000
+
+
+class VerenigingProfile(BaseModel):
+    """Profile for a Vereniging (Association) in the Dienstencatalogus."""
+
+    gemeente: str | None = None
+    regio: str | None = None
+    doelgroep: list[str] | None = []
+    sector: str | None = None
+    werkingsgebieden: list[str] = Field(default_factory=list)
+    type_vereniging: list[str] = Field(default_factory=list)
+    hoofdactiviteiten: list[str] = Field(default_factory=list)
+    namen: dict[str, str] = Field(default_factory=dict)
+
+    def to_search_profile(self) -> dict[str, Any]:
+        """Map the profile onto the keys used by `search_diensten`.
+
+        `gemeente` and `regio` count as werkingsgebieden and `sector` as a
+        hoofdactiviteit, so older clients keep getting personalized results.
+        """
+        werkingsgebieden = [*self.werkingsgebieden]
+        werkingsgebieden += [g for g in (self.gemeente, self.regio) if g]
+        hoofdactiviteiten = [*self.hoofdactiviteiten]
+        if self.sector:
+            hoofdactiviteiten.append(self.sector)
+        return {
+            "werkingsgebieden": werkingsgebieden,
+            "type_vereniging": self.type_vereniging,
+            "hoofdactiviteiten": hoofdactiviteiten,
+            "namen": self.namen,
+        }
+
+
+class SearchRequest(BaseModel):
+    """Request model for searching the Dienstencatalogus."""
+
+    query: str | None = None
+    filters: dict[str, object] | None = {}
+    profile: VerenigingProfile | None = None
+    profile_id: str | None = None
+    sort: str | None = "relevance"  # or "date"
+    page: int | None = Field(1, ge=1)
+    size: int | None = Field(10, ge=1, le=MAX_PAGE_SIZE)
+    facets: bool = True
+    pagination: Literal["offset", "cursor"] = "offset"
+    personalization: Literal["script", "native", "rerank"] = "script"
+    cursor: str | None = None
+    mode: Literal["lexical", "hybrid"] = "lexical"
+    matching: Literal["fuzzy", "exact", "adaptive"] = "fuzzy"
+
+    @property
+    def uses_cursor(self) -> bool:
+        """Whether the request pages with a cursor instead of `page`."""
+        return self.pagination == "cursor" or self.cursor is not None
+
+    @model_validator(mode="after")
+    def check_result_window(self) -> "SearchRequest":
+        """Reject offset pages past `MAX_RESULT_WINDOW`.
+
+        Elasticsearch refuses them, which would surface as a server error;
+        cursor pages are read with `search_after` and have no such limit.
+        """
+        if self.uses_cursor:
+            return self
+        kwargs = self.to_search_kwargs()
+        if kwargs["from_"] + kwargs["size"] > MAX_RESULT_WINDOW:
+            msg = (
+                f"page * size may not exceed {MAX_RESULT_WINDOW}; "
+                "use cursor pagination to page deeper"
+            )
+            raise ValueError(msg)
+        return self
+
+    def to_search_kwargs(self) -> "SearchParams":
+        """Translate the request into keyword arguments for `search_diensten`."""
+        filters = self.filters or {}
+        themas = filters.get("themas", filters.get("thema"))
+        if isinstance(themas, str):
+            themas = [themas]
+        gemeente = filters.get("gemeente")
+        sort_by, sort_order = SORT_MODES.get(
+            self.sort or "relevance", SORT_MODES["relevance"]
+        )
+        size = self.size or 10
+        return {
+            "query": self.query or None,
+            "themas": [str(t) for t in themas] if isinstance(themas, list) else None,
+            "gemeente": str(gemeente) if gemeente else None,
+            "sort_by": sort_by,
+            "sort_order": sort_order,
+            "from_": ((self.page or 1) - 1) * size,
+            "size": size,
+            "vereniging_profile": self.profile.to_search_profile()
+            if self.profile
+            else None,
+            "personalization": self.personalization,
+            "profile_id": self.profile_id,
+            "matching": self.matching,
+        }
+
+
+class BatchSearchRequest(BaseModel):
+    """Several searches answered in one round trip, e.g. the blocks of a page."""
+
+    searches: list[SearchRequest] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
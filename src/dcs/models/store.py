@@ -0,0 +1,226 @@
+import json
+import mmap
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Self
+
+from dcs.models.product import Product
+
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+
+
+def is_ndjson(path: Path) -> bool:
+    """Return True if `path` uses the line-delimited product format."""
+    return path.suffix in NDJSON_SUFFIXES
+
+
+def offsets_path(path: Path) -> Path:
+    """Return the path of the sidecar offset index for an NDJSON file."""
+    return path.with_name(f"{path.name}.idx")
+
+
+def temp_path(path: Path) -> Path:
+    """Return where a file is written before it replaces `path`."""
+    return path.with_name(f"{path.name}.tmp")
+
+
+class ProductWriter:
+    """Incrementally write cleaned products to NDJSON or a JSON array.
+
+    For NDJSON output the byte offset and length of every line is recorded and
+    saved, keyed on product id, to a sidecar index when the writer is closed.
+    Products go to a temporary file next to `path`, which only replaces it
+    once the writer is closed without an error: a failed run keeps the last
+    complete output.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Open `path` for writing; the format follows the file suffix."""
+        self.path = path
+        self.ndjson = is_ndjson(path)
+        self.count = 0
+        self.offsets: dict[str, tuple[int, int]] = {}
+        self._f = temp_path(path).open("wb")
+        self._pos = 0
+        self._done = False
+        if not self.ndjson:
+            self._write(b"[")
+
+    def _write(self, data: bytes) -> None:
+        self._f.write(data)
+        self._pos += len(data)
+
+    def write(self, item: dict[str, Any]) -> None:
+        """Append a single cleaned product."""
+        if self.ndjson:
+            line = json.dumps(item, ensure_ascii=False).encode() + b"\n"
+            self.offsets[item["id"]] = (self._pos, len(line))
+            self._write(line)
+        else:
+            prefix = b",\n" if self.count else b"\n"
+            dumped = json.dumps(item, indent=2, ensure_ascii=False)
+            self._write(prefix + dumped.encode())
+        self.count += 1
+
+    def write_all(self, items: Iterable[dict[str, Any]]) -> None:
+        """Append every product from `items`."""
+        for item in items:
+            self.write(item)
+
+    def close(self) -> None:
+        """Finish the file and, for NDJSON, write the offset index.
+
+        The finished files then replace the previous output. The old index is
+        removed first, so a reader in between rebuilds it rather than using
+        offsets of the old file.
+        """
+        if self._done:
+            return
+        self._done = True
+        if not self.ndjson:
+            self._write(b"\n]" if self.count else b"]")
+        self._f.close()
+        if not self.ndjson:
+            temp_path(self.path).replace(self.path)
+            return
+        index_file = offsets_path(self.path)
+        with temp_path(index_file).open("w", encoding="utf-8") as f:
+            json.dump(self.offsets, f)
+        index_file.unlink(missing_ok=True)
+        temp_path(self.path).replace(self.path)
+        temp_path(index_file).replace(index_file)
+
+    def discard(self) -> None:
+        """Drop what was written and leave the previous output untouched."""
+        if self._done:
+            return
+        self._done = True
+        self._f.close()
+        temp_path(self.path).unlink(missing_ok=True)
+
+    def __enter__(self) -> Self:
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the writer, or discard the output when an error is raised."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ProductStore:
+    """Read-only, memory-mapped view on an NDJSON product file.
+
+    Products are decoded lazily: iteration walks the mapped file line by line
+    and `get` seeks straight to a product using the offset index. The index is
+    rebuilt by a single scan when the sidecar file is missing.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Map `path` into memory; the offset index is loaded on first use."""
+        self.path = path
+        self._f = path.open("rb")
+        self._mm = (
+            mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+            if path.stat().st_size
+            else None
+        )
+        self._offsets: dict[str, tuple[int, int]] | None = None
+
+    @property
+    def offsets(self) -> dict[str, tuple[int, int]]:
+        """Byte offset and length of every product, keyed on product id."""
+        if self._offsets is None:
+            index_file = offsets_path(self.path)
+            if index_file.exists():
+                with index_file.open(encoding="utf-8") as f:
+                    self._offsets = {k: (o, n) for k, (o, n) in json.load(f).items()}
+            else:
+                self._offsets = self._scan()
+        return self._offsets
+
+    def _lines(self) -> Iterator[tuple[int, bytes]]:
+        if self._mm is None:
+            return
+        pos = 0
+        size = len(self._mm)
+        while pos < size:
+            end = self._mm.find(b"\n", pos)
+            end = size if end == -1 else end + 1
+            yield pos, self._mm[pos:end]
+            pos = end
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        return {
+            json.loads(line)["id"]: (pos, len(line))
+            for pos, line in self._lines()
+            if line.strip()
+        }
+
+    def __len__(self) -> int:
+        """Return the number of products."""
+        return len(self.offsets)
+
+    def __contains__(self, product_id: object) -> bool:
+        """Return True if a product with this id is stored."""
+        return product_id in self.offsets
+
+    def __iter__(self) -> Iterator[Product]:
+        """Yield every product in file order."""
+        for _, line in self._lines():
+            if line.strip():
+                yield Product.model_validate_json(line)
+
+    def get(self, product_id: str) -> Product | None:
+        """Return the product with `product_id`, or None if it is unknown."""
+        if self._mm is None or product_id not in self.offsets:
+            return None
+        offset, length = self.offsets[product_id]
+        return Product.model_validate_json(self._mm[offset : offset + length])
+
+    def close(self) -> None:
+        """Release the memory map and the file handle."""
+        if self._mm is not None:
+            self._mm.close()
+        self._f.close()
+
+    def __enter__(self) -> Self:
+        """Enter the runtime context."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        """Close the store."""
+        self.close()
+
+
+def iter_products(path: Path) -> Iterator[Product]:
+    """Yield products from an NDJSON file (lazily) or a JSON array file."""
+    if is_ndjson(path):
+        with ProductStore(path) as store:
+            yield from store
+        return
+
+    with path.open(encoding="utf-8") as f:
+        raw_items = json.load(f)
+    for item in raw_items:
+        yield Product(**item)
+
+
+def convert(src: Path, dst: Path) -> int:
+    """Convert a product file between the JSON array and NDJSON formats."""
+    with ProductWriter(dst) as writer:
+        writer.write_all(p.model_dump() for p in iter_products(src))
+        return writer.count
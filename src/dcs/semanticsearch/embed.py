@@ -0,0 +1,301 @@
+import hashlib
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from functools import cache, cached_property
+from itertools import pairwise
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from rich.console import Console
+
+from dcs.lexicalsearch.analysis import analyze, canonical_stem
+from dcs.lexicalsearch.map import product_to_es_doc
+from dcs.models.store import iter_products
+from dcs.utils.config import EMBEDDING_CACHE_FILE, EMBEDDING_MODEL_FILE
+
+console = Console()
+
+# Dense vector size, shared with the `embedding` field of the index mapping
+DIMS = 256
+# Hashed vocabulary size; the projection matrix is N_FEATURES x DIMS floats
+N_FEATURES = 2**14
+BATCH_SIZE = 256
+
+
+class NotFittedError(RuntimeError):
+    """Raised when an embedder is used before its IDF weights are fitted."""
+
+    def __init__(self) -> None:
+        """Initialize the error."""
+        super().__init__("Embedder is not fitted; index with --embed first")
+
+
+def document_text(doc: dict[str, Any]) -> str:
+    """Return the text of an Elasticsearch document that gets embedded."""
+    return f"{doc.get('naam') or ''}\n{doc.get('omschrijving') or ''}"
+
+
+def text_hash(text: str) -> str:
+    """Return the content hash an embedding is cached under."""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+@cache
+def _feature(term: str) -> int:
+    """Hash a term into the vocabulary, the same way in every process."""
+    digest = hashlib.blake2b(term.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % N_FEATURES
+
+
+def features(text: str) -> list[int]:
+    """Return the hashed stems and stem bigrams of `text`, with repeats.
+
+    Synonyms share the features of the first stem of their group.
+    """
+    stems = [canonical_stem(s) for s in analyze(text)]
+    terms = stems + [f"{a} {b}" for a, b in pairwise(stems)]
+    return [_feature(t) for t in terms]
+
+
+class HashedTfidfEmbedder:
+    """Embed text offline as a hashed TF-IDF vector projected to `dims`.
+
+    Terms are hashed into `n_features` buckets, weighted with a sublinear
+    term frequency and the IDF fitted on the catalogue, and multiplied with
+    a random Gaussian matrix generated from `seed`. Vectors are unit length,
+    so a dot product is their cosine similarity. Only the IDF weights are
+    persisted; the projection is regenerated.
+    """
+
+    def __init__(
+        self,
+        idf: np.ndarray | None = None,
+        dims: int = DIMS,
+        n_features: int = N_FEATURES,
+        seed: int = 0,
+    ) -> None:
+        """Initialize an embedder, fitted when `idf` is given."""
+        self.idf = idf
+        self.dims = dims
+        self.n_features = n_features
+        self.seed = seed
+
+    @cached_property
+    def projection(self) -> np.ndarray:
+        """Return the random projection from hashed terms to dense vectors."""
+        rng = np.random.default_rng(self.seed)
+        matrix = rng.standard_normal((self.n_features, self.dims), dtype=np.float32)
+        return matrix / np.float32(np.sqrt(self.dims))
+
+    @property
+    def fingerprint(self) -> str:
+        """Identify the model; cached vectors of another model are stale."""
+        if self.idf is None:
+            raise NotFittedError
+        h = hashlib.blake2b(digest_size=8)
+        h.update(f"{self.dims}:{self.n_features}:{self.seed}".encode())
+        h.update(self.idf.tobytes())
+        return h.hexdigest()
+
+    def fit(self, texts: Iterable[str]) -> "HashedTfidfEmbedder":
+        """Fit the smoothed IDF weights on a corpus."""
+        doc_freq = np.zeros(self.n_features, dtype=np.int64)
+        n = 0
+        for text in texts:
+            doc_freq[np.unique(np.array(features(text), dtype=np.int64))] += 1
+            n += 1
+        self.idf = (np.log((1 + n) / (1 + doc_freq)) + 1).astype(np.float32)
+        return self
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed a batch of texts as a (texts x dims) array.
+
+        A text without any terms, e.g. only stopwords, gives a zero vector.
+        """
+        if self.idf is None:
+            raise NotFittedError
+        rows: list[np.ndarray] = []
+        cols: list[np.ndarray] = []
+        counts: list[np.ndarray] = []
+        for i, text in enumerate(texts):
+            terms, tf = np.unique(
+                np.array(features(text), dtype=np.int64), return_counts=True
+            )
+            rows.append(np.full(len(terms), i))
+            cols.append(terms)
+            counts.append(tf)
+        if not rows:
+            return np.zeros((0, self.dims), dtype=np.float32)
+        row = np.concatenate(rows)
+        col = np.concatenate(cols)
+        weight = (1 + np.log(np.concatenate(counts))).astype(np.float32) * self.idf[col]
+
+        vectors = np.zeros((len(texts), self.dims), dtype=np.float32)
+        np.add.at(vectors, row, weight[:, None] * self.projection[col])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+    def save(self, path: Path) -> None:
+        """Persist the fitted model."""
+        if self.idf is None:
+            raise NotFittedError
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as f:
+            np.savez(
+                f,
+                idf=self.idf,
+                dims=self.dims,
+                n_features=self.n_features,
+                seed=self.seed,
+            )
+
+    @classmethod
+    def load(cls, path: Path) -> "HashedTfidfEmbedder":
+        """Load a model saved with `save`."""
+        with np.load(path) as data:
+            return cls(
+                idf=data["idf"],
+                dims=int(data["dims"]),
+                n_features=int(data["n_features"]),
+                seed=int(data["seed"]),
+            )
+
+
+def load_embedder(path: Path = EMBEDDING_MODEL_FILE) -> HashedTfidfEmbedder | None:
+    """Load the embedding model, or None when no index was embedded yet."""
+    return HashedTfidfEmbedder.load(path) if path.exists() else None
+
+
+class EmbeddingCache:
+    """Embeddings of earlier runs, keyed on the hash of the embedded text.
+
+    The cache belongs to one model: when the fingerprint differs from the
+    stored one, every entry is dropped.
+    """
+
+    def __init__(self, path: Path, fingerprint: str) -> None:
+        """Load the cache at `path`, if it exists and matches `fingerprint`."""
+        self.path = path
+        self.fingerprint = fingerprint
+        self._vectors: dict[str, np.ndarray] = {}
+        self._seen: set[str] = set()
+        if path.exists():
+            with np.load(path) as data:
+                if str(data["fingerprint"]) == fingerprint:
+                    self._vectors = dict(
+                        zip(data["keys"].tolist(), data["vectors"], strict=True)
+                    )
+
+    def __len__(self) -> int:
+        """Return the number of cached embeddings."""
+        return len(self._vectors)
+
+    def get(self, key: str) -> np.ndarray | None:
+        """Return the cached embedding for `key`, or None."""
+        self._seen.add(key)
+        return self._vectors.get(key)
+
+    def set(self, key: str, vector: np.ndarray) -> None:
+        """Store the embedding for `key`."""
+        self._seen.add(key)
+        self._vectors[key] = vector
+
+    def save(self, *, prune: bool = False) -> None:
+        """Write the cache, with `prune` only keeping the entries used this run."""
+        keys = sorted(self._seen if prune else self._vectors)
+        keys = [k for k in keys if k in self._vectors]
+        vectors = (
+            np.stack([self._vectors[k] for k in keys])
+            if keys
+            else np.zeros((0, 0), dtype=np.float32)
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("wb") as f:
+            np.savez(
+                f,
+                fingerprint=self.fingerprint,
+                keys=np.array(keys, dtype=str),
+                vectors=vectors,
+            )
+
+
+@dataclass
+class EmbeddingStage:
+    """Attach an `embedding` to bulk index actions, in batches.
+
+    Embeddings are looked up by content hash first, so a reindex only embeds
+    new and changed texts. The cache is saved once the actions are consumed;
+    with `prune` entries that were not used are evicted. Delete actions and
+    texts without terms pass through without a vector.
+    """
+
+    embedder: HashedTfidfEmbedder
+    cache: EmbeddingCache
+    batch_size: int = BATCH_SIZE
+    prune: bool = True
+    computed: int = field(default=0, init=False)
+    cached: int = field(default=0, init=False)
+
+    def _embed_batch(self, batch: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Attach embeddings to one batch of index actions."""
+        keys = [text_hash(document_text(action)) for action in batch]
+        found = {i: self.cache.get(key) for i, key in enumerate(keys)}
+        vectors = {i: v for i, v in found.items() if v is not None}
+        misses = [i for i in found if i not in vectors]
+        if misses:
+            fresh = self.embedder.embed([document_text(batch[i]) for i in misses])
+            for i, vector in zip(misses, fresh, strict=True):
+                self.cache.set(keys[i], vector)
+                vectors[i] = vector
+        self.computed += len(misses)
+        self.cached += len(batch) - len(misses)
+        return [
+            {**action, "embedding": vectors[i].tolist()} if vectors[i].any() else action
+            for i, action in enumerate(batch)
+        ]
+
+    def __call__(self, actions: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        """Yield `actions` with embeddings, keeping their order."""
+        batch: list[dict[str, Any]] = []
+        for action in actions:
+            if action.get("_op_type") == "delete":
+                yield from self._embed_batch(batch)
+                batch = []
+                yield action
+                continue
+            batch.append(action)
+            if len(batch) >= self.batch_size:
+                yield from self._embed_batch(batch)
+                batch = []
+        yield from self._embed_batch(batch)
+        self.cache.save(prune=self.prune)
+        console.print(
+            f"🧮 Embedded {self.computed} producten ({self.cached} uit de cache)"
+        )
+
+
+def embedding_stage(
+    file_path: Path,
+    *,
+    refit: bool = False,
+    prune: bool = True,
+    model_file: Path = EMBEDDING_MODEL_FILE,
+    cache_file: Path = EMBEDDING_CACHE_FILE,
+) -> EmbeddingStage:
+    """Return the embedding stage for indexing `file_path`.
+
+    The model is fitted on `file_path` when none is saved yet or `refit` is
+    set. Refitting changes every vector, so the cache is dropped and the
+    whole index should be rebuilt rather than updated incrementally.
+    """
+    embedder = None if refit else load_embedder(model_file)
+    if embedder is None:
+        embedder = HashedTfidfEmbedder().fit(
+            document_text(product_to_es_doc(p)) for p in iter_products(file_path)
+        )
+        embedder.save(model_file)
+        console.print(f"🧠 Fitted embedding model to {model_file}")
+    return EmbeddingStage(
+        embedder, EmbeddingCache(cache_file, embedder.fingerprint), prune=prune
+    )
@@ -0,0 +1,219 @@
+from collections.abc import Sequence
+from typing import Any, Unpack
+
+import numpy as np
+from elasticsearch import AsyncElasticsearch, Elasticsearch
+
+from dcs.lexicalsearch.rerank import single_stage
+from dcs.lexicalsearch.search import (
+    SEARCH_SECONDS,
+    SearchParams,
+    build_filters,
+    build_search_body,
+    observe_took,
+)
+from dcs.semanticsearch.embed import HashedTfidfEmbedder
+
+# Hits taken from each leg before fusion; pages beyond it are empty
+WINDOW = 100
+# Damping of reciprocal rank fusion, the value of the original paper
+RANK_CONSTANT = 60
+
+
+class HybridNotSupportedError(ValueError):
+    """Raised when hybrid search is used on a backend without vectors."""
+
+    def __init__(self, backend: str) -> None:
+        """Initialize the error for `backend`."""
+        super().__init__(f"Hybrid search is not supported by backend: {backend}")
+
+
+class HybridSearchError(RuntimeError):
+    """Raised when one of the legs of a hybrid search fails."""
+
+    def __init__(self, item: dict[str, Any]) -> None:
+        """Initialize the error from a failed `_msearch` item."""
+        reason = item.get("error", {}).get("reason")
+        super().__init__(f"Hybrid search leg failed: {reason}")
+
+
+def wants_hybrid(params: SearchParams, mode: str) -> bool:
+    """Whether a search should run hybrid.
+
+    Fusion needs free text to embed and only applies to relevance-sorted
+    searches; other searches stay lexical.
+    """
+    return (
+        mode == "hybrid"
+        and bool(params.get("query"))
+        and params.get("sort_by") == "relevance"
+    )
+
+
+def rrf_fuse(
+    rankings: Sequence[Sequence[str]], rank_constant: int = RANK_CONSTANT
+) -> list[tuple[str, float]]:
+    """Merge rankings of ids with reciprocal rank fusion.
+
+    An id scores the sum of 1 / (rank_constant + rank) over the rankings it
+    appears in. Returns (id, score) pairs best first; ties keep the order in
+    which ids were first seen.
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (rank_constant + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def build_knn(
+    vector: np.ndarray,
+    k: int,
+    themas: list[str] | None = None,
+    gemeente: str | None = None,
+) -> dict[str, Any]:
+    """Build the approximate kNN clause, restricted to the selected filters."""
+    knn: dict[str, Any] = {
+        "field": "embedding",
+        "query_vector": vector.tolist(),
+        "k": k,
+        "num_candidates": max(2 * k, 100),
+    }
+    filters = build_filters(themas, gemeente)
+    if filters:
+        knn["filter"] = filters
+    return knn
+
+
+def build_hybrid_msearch(
+    ix: str,
+    embedder: HashedTfidfEmbedder,
+    window: int = WINDOW,
+    **params: Unpack[SearchParams],
+) -> list[dict[str, Any]]:
+    """Build the `_msearch` lines of both legs, top `window` ids each.
+
+    The lexical leg is the regular search, personalized and with facets when
+    asked. The semantic leg is left out when the query embeds to nothing,
+    e.g. when it only holds stopwords.
+    """
+    lexical_params: SearchParams = {
+        **single_stage(params),
+        "from_": 0,
+        "size": window,
+        "sort_by": "relevance",
+    }
+    lexical = {**build_search_body(**lexical_params), "_source": False}
+    lines = [{"index": ix}, lexical]
+
+    vector = embedder.embed([params.get("query") or ""])[0]
+    if vector.any():
+        knn = build_knn(vector, window, params.get("themas"), params.get("gemeente"))
+        lines += [{"index": ix}, {"size": window, "_source": False, "knn": knn}]
+    return lines
+
+
+def _fuse(
+    responses: list[dict[str, Any]],
+    params: SearchParams,
+    window: int,
+    rank_constant: int,
+) -> tuple[list[tuple[str, float]], dict[str, Any]]:
+    """Fuse the legs and cut out the requested page.
+
+    Returns the page and the total: exact once every lexical match fits in
+    the window, else a lower bound.
+    """
+    for item in responses:
+        if "error" in item:
+            raise HybridSearchError(item)
+    rankings = [[hit["_id"] for hit in r["hits"]["hits"]] for r in responses]
+    fused = rrf_fuse(rankings, rank_constant)
+    start = params.get("from_", 0)
+    page = fused[start : start + params.get("size", 10)]
+
+    lexical_total = responses[0]["hits"]["total"]["value"]
+    total = (
+        {"value": len(fused), "relation": "eq"}
+        if lexical_total <= window
+        else {"value": lexical_total, "relation": "gte"}
+    )
+    return page, total
+
+
+def _response(
+    responses: list[dict[str, Any]],
+    page: list[tuple[str, float]],
+    total: dict[str, Any],
+    docs: list[dict[str, Any]],
+) -> dict[str, Any]:
+    """Assemble a search response from the fused page and its sources."""
+    sources = {d["_id"]: d["_source"] for d in docs if d.get("found")}
+    response: dict[str, Any] = {
+        "took": max(r.get("took", 0) for r in responses),
+        "hits": {
+            "total": total,
+            "max_score": page[0][1] if page else None,
+            "hits": [
+                {"_id": doc_id, "_score": score, "_source": sources.get(doc_id, {})}
+                for doc_id, score in page
+            ],
+        },
+    }
+    if "aggregations" in responses[0]:
+        response["aggregations"] = responses[0]["aggregations"]
+    return response
+
+
+def hybrid_search(
+    client: Elasticsearch,
+    embedder: HashedTfidfEmbedder,
+    ix: str = "diensten",
+    window: int = WINDOW,
+    rank_constant: int = RANK_CONSTANT,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Search lexically and semantically, merged with reciprocal rank fusion.
+
+    Both legs run in one `_msearch` round trip and are fused client side,
+    before pagination; Elasticsearch's own RRF retriever needs a paid
+    licence. Scores are fusion scores. Facets come from the lexical leg.
+    Sources are fetched for the returned page only.
+    """
+    with SEARCH_SECONDS.time(request="hybrid", stage="build"):
+        body = build_hybrid_msearch(ix, embedder, window, **params)
+    with SEARCH_SECONDS.time(request="hybrid", stage="roundtrip"):
+        response = client.msearch(body=body)
+    observe_took(response.body, "hybrid")
+    responses = [dict(r) for r in response["responses"]]
+    with SEARCH_SECONDS.time(request="hybrid", stage="rank"):
+        page, total = _fuse(responses, params, window, rank_constant)
+    ids = [doc_id for doc_id, _ in page]
+    with SEARCH_SECONDS.time(request="mget", stage="roundtrip"):
+        docs = client.mget(index=ix, ids=ids)["docs"] if ids else []
+    return _response(responses, page, total, docs)
+
+
+async def async_hybrid_search(
+    client: AsyncElasticsearch,
+    embedder: HashedTfidfEmbedder,
+    ix: str = "diensten",
+    window: int = WINDOW,
+    rank_constant: int = RANK_CONSTANT,
+    **params: Unpack[SearchParams],
+) -> dict[str, Any]:
+    """Search hybrid without blocking the event loop."""
+    with SEARCH_SECONDS.time(request="hybrid", stage="build"):
+        body = build_hybrid_msearch(ix, embedder, window, **params)
+    with SEARCH_SECONDS.time(request="hybrid", stage="roundtrip"):
+        response = await client.msearch(body=body)
+    observe_took(response.body, "hybrid")
+    responses = [dict(r) for r in response["responses"]]
+    with SEARCH_SECONDS.time(request="hybrid", stage="rank"):
+        page, total = _fuse(responses, params, window, rank_constant)
+    ids = [doc_id for doc_id, _ in page]
+    docs = []
+    if ids:
+        with SEARCH_SECONDS.time(request="mget", stage="roundtrip"):
+            docs = (await client.mget(index=ix, ids=ids))["docs"]
+    return _response(responses, page, total, docs)
@@ -1,6 +1,51 @@
+import os
 from pathlib import Path
 
 BASE_URL = "https://cms.verenigingsloket.be/api/aangeboden-producten-pagina"
 RAW_DIR = Path("data/raw")
 CLEANED_DIR = Path("data/cleaned")
 RAW_FILE = RAW_DIR / "aangeboden-producten.json"
+WATERMARK_FILE = RAW_DIR / "watermark.json"
+# Cleaned records of earlier runs, keyed on a hash of the raw record
+CLEAN_CACHE_FILE = CLEANED_DIR / "clean-cache.sqlite"
+
+# Log full search bodies; off by default, they include the Painless source
+DEBUG = os.getenv("DCS_DEBUG", "").lower() not in {"", "0", "false"}
+
+# Index (or alias) queried by the API
+SEARCH_INDEX = os.getenv("DCS_INDEX", "diensten")
+
+# Search result cache (per API worker)
+CACHE_MAX_ENTRIES = int(os.getenv("DCS_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.getenv("DCS_CACHE_TTL", "60"))
+
+# Adaptive matching: run the fuzzy phase below this many exact hits
+FUZZY_MIN_HITS = int(os.getenv("DCS_FUZZY_MIN_HITS", "5"))
+
+# Searches sorted like the index count at most this many hits, so they can
+# stop early; totals above it are reported as a lower bound ("gte")
+SORTED_TOTAL_HITS = int(os.getenv("DCS_SORTED_TOTAL_HITS", "1000"))
+
+# Search backend used by the API: elasticsearch or memory
+SEARCH_BACKEND = os.getenv("DCS_BACKEND", "elasticsearch")
+
+# Type-ahead suggestions: the in-process prefix index (memory) or the
+# `naam.suggest` field of the search index (elasticsearch)
+SUGGEST_BACKEND = os.getenv("DCS_SUGGEST_BACKEND", "memory")
+
+# Registered vereniging profiles and their materialized tiers
+PROFILES_FILE = CLEANED_DIR / "profiles.json"
+TIER_MATRIX_FILE = CLEANED_DIR / "tiers.npz"
+# No dash after the alias: `diensten-*` names are reindex generations
+TIERS_INDEX = os.getenv("DCS_TIERS_INDEX", "diensten_tiers")
+
+# Two-stage ranking: candidates retrieved per search and score weights
+RERANK_K = int(os.getenv("DCS_RERANK_K", "200"))
+RERANK_TIER_WEIGHT = float(os.getenv("DCS_RERANK_TIER_WEIGHT", "1.0"))
+RERANK_LEXICAL_WEIGHT = float(os.getenv("DCS_RERANK_LEXICAL_WEIGHT", "1.0"))
+
+# Hybrid retrieval: offline embedding model, its vector cache and the fusion
+EMBEDDING_MODEL_FILE = CLEANED_DIR / "embedding-model.npz"
+EMBEDDING_CACHE_FILE = CLEANED_DIR / "embedding-cache.npz"
+HYBRID_WINDOW = int(os.getenv("DCS_HYBRID_WINDOW", "100"))
+RRF_RANK_CONSTANT = int(os.getenv("DCS_RRF_RANK_CONSTANT", "60"))
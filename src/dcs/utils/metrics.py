@@ -0,0 +1,292 @@
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+# Seconds; from sub-millisecond query building up to slow bulk requests
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+Labels = tuple[str, ...]
+
+
+class LabelMismatchError(ValueError):
+    """Raised when a metric is updated with other labels than it declares."""
+
+    def __init__(self, name: str, expected: Sequence[str], got: Sequence[str]) -> None:
+        """Initialize the error for metric `name`."""
+        super().__init__(
+            f"Metric {name} takes labels {sorted(expected)}, got {sorted(got)}"
+        )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render a label set in the Prometheus text format, e.g. `{a="1"}`."""
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True))
+    return f"{{{pairs}}}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base of the metric types: a name, help text and a set of label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()) -> None:
+        """Initialize an empty metric."""
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str | int]) -> Labels:
+        if not labels and not self.labelnames:
+            return ()
+        try:
+            key = tuple(str(labels[n]) for n in self.labelnames)
+        except KeyError:
+            key = ()
+        if len(labels) != len(key):
+            raise LabelMismatchError(self.name, self.labelnames, list(labels))
+        return key
+
+    def samples(self) -> Iterator[str]:
+        """Yield the sample lines of the metric."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Render the metric with its HELP and TYPE lines."""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join([*lines, *self.samples()])
+
+
+class Counter(_Metric):
+    """A value that only goes up, per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()) -> None:
+        """Initialize a counter without samples."""
+        super().__init__(name, help_, labelnames)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str | int) -> None:
+        """Add `amount` to the counter of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str | int) -> float:
+        """Return the current value of a label set."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        """Yield one line per label set."""
+        for key, value in sorted(self._values.items()):
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """A value that is set, per label set."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str | int) -> None:
+        """Set the value of a label set."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+@dataclass
+class HistogramState:
+    """Observations of one label set: counts per bucket, their sum and count."""
+
+    buckets: list[int]
+    total: float = 0.0
+    count: int = 0
+
+    def add(self, other: "HistogramState") -> None:
+        """Merge the observations of `other` into this state."""
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets, strict=True)]
+        self.total += other.total
+        self.count += other.count
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets, per label set.
+
+    States can be drained and merged, so worker processes can ship their
+    observations back to the parent process.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize a histogram without observations."""
+        super().__init__(name, help_, labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._states: dict[Labels, HistogramState] = {}
+
+    def _state(self, key: Labels) -> HistogramState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = HistogramState([0] * (len(self.bounds) + 1))
+        return state
+
+    def observe(self, value: float, **labels: str | int) -> None:
+        """Record one observation for a label set."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._state(key)
+            state.buckets[bisect_left(self.bounds, value)] += 1
+            state.total += value
+            state.count += 1
+
+    def observe_many(self, values: Iterable[float], **labels: str | int) -> None:
+        """Record a batch of observations for a label set under one lock."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._state(key)
+            for value in values:
+                state.buckets[bisect_left(self.bounds, value)] += 1
+                state.total += value
+                state.count += 1
+
+    def time(self, **labels: str | int) -> "Timer":
+        """Observe the wall-clock seconds spent in a `with` block."""
+        return Timer(self, labels)
+
+    def count(self, **labels: str | int) -> int:
+        """Return the number of observations of a label set."""
+        state = self._states.get(self._key(labels))
+        return state.count if state else 0
+
+    def drain(self) -> dict[Labels, HistogramState]:
+        """Return every observation and reset the histogram."""
+        with self._lock:
+            states, self._states = self._states, {}
+        return states
+
+    def merge(self, states: dict[Labels, HistogramState]) -> None:
+        """Add observations returned by `drain`, e.g. in another process."""
+        with self._lock:
+            for key, state in states.items():
+                self._state(key).add(state)
+
+    def samples(self) -> Iterator[str]:
+        """Yield cumulative bucket, sum and count lines per label set."""
+        for key, state in sorted(self._states.items()):
+            cumulative = 0
+            for bound, count in zip(
+                [*self.bounds, float("inf")], state.buckets, strict=True
+            ):
+                cumulative += count
+                labels = _format_labels(
+                    (*self.labelnames, "le"), (*key, _format_value(bound))
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state.total)}"
+            yield f"{self.name}_count{labels} {state.count}"
+
+
+class Timer:
+    """Context manager that observes its duration in a histogram."""
+
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: dict[str, str | int]) -> None:
+        """Initialize a timer for one label set of `histogram`."""
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        """Start the clock."""
+        self._start = time.perf_counter()
+
+    def __exit__(self, *_: object) -> None:
+        """Observe the elapsed time, also when the block raised."""
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+
+class Registry:
+    """The metrics of a process, rendered in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._metrics: dict[str, _Metric] = {}
+
+    def register[M: _Metric](self, metric: M) -> M:
+        """Add `metric`; registering a name twice returns the first metric."""
+        existing = self._metrics.setdefault(metric.name, metric)
+        if not isinstance(existing, type(metric)):
+            raise TypeError(metric.name)
+        return existing
+
+    def render(self) -> str:
+        """Render every metric, in the text exposition format 0.0.4."""
+        return "".join(f"{m.render()}\n" for m in self._metrics.values())
+
+    def write(self, path: Path) -> None:
+        """Write the metrics to `path`, e.g. for a node exporter textfile."""
+        path.write_text(self.render(), encoding="utf-8")
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, help_: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Create and register a counter."""
+    return REGISTRY.register(Counter(name, help_, labelnames))
+
+
+def gauge(name: str, help_: str, labelnames: Sequence[str] = ()) -> Gauge:
+    """Create and register a gauge."""
+    return REGISTRY.register(Gauge(name, help_, labelnames))
+
+
+def histogram(
+    name: str,
+    help_: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Create and register a histogram."""
+    return REGISTRY.register(Histogram(name, help_, labelnames, buckets))
@@ -1,11 +1,55 @@
+import html
+import re
+from html.entities import html5
+
 from bs4 import BeautifulSoup
 
+# Only well-formed start/end tags; anything else that looks like markup
+# (comments, doctypes, CDATA, stray angle brackets) goes to BeautifulSoup.
+_TAG_RE = re.compile(r"</?[A-Za-z][^<>]*>")
+_RAW_TEXT_RE = re.compile(r"<(?:script|style|template|textarea|title)\b", re.IGNORECASE)
+# Character references; a bare "&" (last alternative) marks a malformed one.
+_ENTITY_RE = re.compile(r"&(?:#[0-9]+|#[xX][0-9a-fA-F]+|([A-Za-z][A-Za-z0-9]*));|&")
+
 
 def strip_html(text: str) -> str:
-    """Remove HTML tags from a string and return plain text."""
+    """Remove HTML tags from a string and return plain text.
+
+    Simple markup is handled by a regex tokenizer; malformed or unusual markup
+    falls back to a full BeautifulSoup parse with the same output.
+    """
+    fast = _strip_html_fast(text)
+    return fast if fast is not None else strip_html_soup(text)
+
+
+def strip_html_soup(text: str) -> str:
+    """Remove HTML tags by parsing the string with BeautifulSoup."""
     return BeautifulSoup(text, "html.parser").get_text(separator=" ", strip=True)
 
 
+def _strip_html_fast(text: str) -> str | None:
+    """Strip tags with a regex tokenizer, or return None if markup is unusual."""
+    if _RAW_TEXT_RE.search(text):
+        return None
+    parts = []
+    for chunk in _TAG_RE.split(text):
+        if "<" in chunk or ">" in chunk or not _entities_ok(chunk):
+            return None
+        part = html.unescape(chunk).strip()
+        if part:
+            parts.append(part)
+    return " ".join(parts)
+
+
+def _entities_ok(chunk: str) -> bool:
+    """Check that every character reference in `chunk` is well formed."""
+    for match in _ENTITY_RE.finditer(chunk):
+        name = match.group(1)
+        if match.group(0) == "&" or (name and f"{name};" not in html5):
+            return False
+    return True
+
+
 def extract_keywords(text: str) -> list[str]:
     """Extract keywords from a given text."""
     return [f"term-{text[0]}", f"term-{text[1]}"]
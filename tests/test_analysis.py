@@ -0,0 +1,59 @@
+"""The Dutch stemmer of the in-process index stems like Snowball.
+
+Compared against the `snowballstemmer` package when it is installed. Its
+`dutch_porter` stemmer is the original Snowball Dutch algorithm that the
+Elasticsearch `dutch` analyzer runs; Snowball 3 named a newer algorithm
+`dutch`.
+"""
+
+import pytest
+
+from dcs.bench.catalogue import WORDS, synthetic_records
+from dcs.lexicalsearch.analysis import stem, tokenize
+
+snowballstemmer = pytest.importorskip("snowballstemmer")
+
+# Words that reach every step of the algorithm, accents and diaereses included
+EDGE_CASES = [
+    "gemeenten",
+    "mogelijkheden",
+    "werkzaamheden",
+    "lichamelijk",
+    "maatschappelijke",
+    "betaalbaar",
+    "vriendelijke",
+    "opheffing",
+    "lopende",
+    "jaarlijks",
+    "kinderen",
+    "aanvragen",
+    "gebouwen",
+    "toelagen",
+    "bijeenkomsten",
+    "verenigingen",
+    "duurzaamheid",
+    "één",
+    "café",
+    "beëindiging",
+    "ruïne",
+]
+
+
+def _corpus() -> list[str]:
+    """Return the words of the synthetic catalogue and the edge cases."""
+    words = {*WORDS, *EDGE_CASES}
+    for record in synthetic_records(200, seed=0):
+        product = record["product"]
+        words.update(tokenize(f"{product['naam']} {product['omschrijving']}"))
+    return sorted(w for w in words if w.isalpha())
+
+
+def test_stem_matches_snowball() -> None:
+    """Every word stems exactly as Snowball's Dutch stemmer does."""
+    snowball = snowballstemmer.stemmer("dutch_porter")
+    mismatches = {
+        word: (stem(word), snowball.stemWord(word))
+        for word in _corpus()
+        if stem(word) != snowball.stemWord(word)
+    }
+    assert mismatches == {}
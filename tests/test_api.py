@@ -0,0 +1,82 @@
+"""The search API against a fake Elasticsearch client, without a cluster."""
+
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from dcs.api import app
+from dcs.lexicalsearch.cache import MemoryBackend, SearchCache
+
+PROFILE = {"werkingsgebieden": ["Leuven"], "hoofdactiviteiten": ["Welzijn"]}
+
+
+class FakeElasticsearch:
+    """Answer point-in-time searches with an empty page and keep the bodies."""
+
+    def __init__(self) -> None:
+        """Start without searches."""
+        self.bodies: list[dict[str, Any]] = []
+
+    async def open_point_in_time(self, **_: Any) -> dict[str, str]:  # noqa: ANN401
+        """Open a point in time."""
+        return {"id": "pit"}
+
+    async def close_point_in_time(self, **_: Any) -> None:  # noqa: ANN401
+        """Close a point in time."""
+
+    async def search(self, body: dict[str, Any]) -> SimpleNamespace:
+        """Return an empty page."""
+        self.bodies.append(body)
+        return SimpleNamespace(
+            body={"took": 1, "hits": {"total": {"value": 0}, "hits": []}}
+        )
+
+
+@pytest.fixture
+def es() -> FakeElasticsearch:
+    """Point the API at a fake Elasticsearch client."""
+    client = FakeElasticsearch()
+    app.state.es = client
+    app.state.memory = None
+    app.state.embedder = None
+    app.state.cache = SearchCache(MemoryBackend())
+    app.state.facet_cache = SearchCache(MemoryBackend())
+    return client
+
+
+def test_cursor_search_with_rerank_uses_the_native_engine(
+    es: FakeElasticsearch,
+) -> None:
+    """Cursor pages cannot rerank, so they are scored by the native engine."""
+    response = TestClient(app).post(
+        "/search",
+        json={
+            "query": "subsidie",
+            "profile": PROFILE,
+            "personalization": "rerank",
+            "pagination": "cursor",
+            "facets": False,
+        },
+    )
+
+    assert response.status_code == 200  # noqa: PLR2004
+    assert response.json()["next_cursor"] is None
+    (body,) = es.bodies
+    assert body["query"]["function_score"]["score_mode"] == "first"
+
+
+@pytest.mark.parametrize(
+    "paging",
+    [{"size": 0}, {"size": 101}, {"page": 0}, {"page": 1001, "size": 10}],
+    ids=str,
+)
+def test_out_of_range_paging_is_rejected(
+    es: FakeElasticsearch, paging: dict[str, int]
+) -> None:
+    """Pages Elasticsearch would refuse, or silently replace, are a 422."""
+    response = TestClient(app).post("/search", json={"facets": False, **paging})
+
+    assert response.status_code == 422  # noqa: PLR2004
+    assert es.bodies == []
@@ -0,0 +1,233 @@
+"""The fetcher against a mocked CMS: retries, page order and the end page."""
+
+import asyncio
+from collections.abc import Callable, Coroutine
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime
+from typing import Any
+
+import httpx
+import pytest
+
+from dcs.ingest.fetcher import (
+    fetch_all,
+    fetch_all_concurrent,
+    fetch_changed_since,
+    fetch_page,
+    retry_after,
+)
+
+Handler = Callable[[httpx.Request], Coroutine[None, None, httpx.Response]]
+PER_PAGE = 5
+
+
+def _record(i: int) -> dict[str, Any]:
+    return {"product": {"id": f"p{i}"}}
+
+
+def _page(items: list[dict[str, Any]]) -> httpx.Response:
+    return httpx.Response(200, json={"inhoud": {"elementen": items}})
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Record the backoff delays instead of waiting them out."""
+    delays: list[float] = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    return delays
+
+
+@pytest.fixture
+def cms(monkeypatch: pytest.MonkeyPatch) -> Callable[[Handler], None]:
+    """Route the AsyncClients the fetcher opens to a handler."""
+    real_client = httpx.AsyncClient
+
+    def route(handler: Handler) -> None:
+        def client(**kwargs: Any) -> httpx.AsyncClient:  # noqa: ANN401
+            return real_client(transport=httpx.MockTransport(handler), **kwargs)
+
+        monkeypatch.setattr(httpx, "AsyncClient", client)
+
+    return route
+
+
+async def _fetch(handler: Handler, retries: int) -> list[dict[str, Any]]:
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        return await fetch_page(client, 1, PER_PAGE, retries=retries)
+
+
+@pytest.mark.usefixtures("sleeps")
+@pytest.mark.parametrize(
+    "failure",
+    [
+        httpx.ConnectError("refused"),
+        httpx.ReadError("connection reset"),
+        httpx.RemoteProtocolError("peer closed connection"),
+        httpx.ReadTimeout("timed out"),
+        httpx.Response(503),
+        httpx.Response(429),
+    ],
+    ids=lambda failure: type(failure).__name__
+    if isinstance(failure, Exception)
+    else str(failure.status_code),
+)
+def test_transient_failures_are_retried(failure: object) -> None:
+    """Transport errors, 5xx and 429 are retried until the page comes back."""
+    calls = 0
+
+    async def handler(_: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls < 3:  # noqa: PLR2004
+            if isinstance(failure, Exception):
+                raise failure
+            return failure  # type: ignore[return-value]
+        return _page([_record(1)])
+
+    assert asyncio.run(_fetch(handler, retries=2)) == [_record(1)]
+    assert calls == 3  # noqa: PLR2004
+
+
+@pytest.mark.usefixtures("sleeps")
+def test_retries_run_out() -> None:
+    """After `retries` retries the last error is raised."""
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused", request=request)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(_fetch(handler, retries=2))
+    assert calls == 3  # noqa: PLR2004
+
+
+def test_client_errors_are_not_retried(sleeps: list[float]) -> None:
+    """A 404 is not transient: it fails at once."""
+
+    async def handler(_: httpx.Request) -> httpx.Response:
+        return httpx.Response(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_fetch(handler, retries=3))
+    assert sleeps == []
+
+
+def test_rate_limit_honours_retry_after(sleeps: list[float]) -> None:
+    """A 429 waits at least as long as its Retry-After header asks."""
+    responses = [httpx.Response(429, headers={"Retry-After": "7"}), _page([])]
+
+    async def handler(_: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    assert asyncio.run(_fetch(handler, retries=1)) == []
+    assert sleeps[0] >= 7  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("3", 3.0), ("-1", 0.0), ("soon", None), ("", None)],
+)
+def test_retry_after_seconds(value: str, expected: float | None) -> None:
+    """Retry-After in seconds; anything unparsable is ignored."""
+    response = httpx.Response(429, headers={"Retry-After": value})
+    assert retry_after(response) == expected
+
+
+def test_retry_after_date() -> None:
+    """Retry-After as an HTTP date is the time left until then."""
+    when = datetime.now(UTC) + timedelta(seconds=30)
+    response = httpx.Response(429, headers={"Retry-After": format_datetime(when)})
+    assert 25 < (retry_after(response) or 0) <= 30  # noqa: PLR2004
+
+
+def test_concurrent_fetch_keeps_page_order_and_stops_at_the_end(
+    cms: Callable[[Handler], None],
+) -> None:
+    """Pages finish out of order but come back in order; the end page stops it.
+
+    The catalogue has five full pages, so page 6 is empty. Later pages that
+    were already requested are cancelled or discarded, and no page near
+    `max_pages` is ever requested.
+    """
+    catalogue = [_record(i) for i in range(5 * PER_PAGE)]
+    requested: list[int] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["index"])
+        requested.append(page)
+        # Every third page answers at once, the others a bit later
+        await asyncio.sleep((page % 3) * 0.01)
+        return _page(catalogue[(page - 1) * PER_PAGE : page * PER_PAGE])
+
+    cms(handler)
+    items = asyncio.run(
+        fetch_all_concurrent(max_pages=50, per_page=PER_PAGE, start_at=1, concurrency=4)
+    )
+
+    assert items == catalogue
+    assert set(range(1, 7)) <= set(requested)
+    assert max(requested) < 6 + 2 * 4
+
+
+def _catalogue_handler(
+    catalogue: list[dict[str, Any]], requested: list[int]
+) -> Handler:
+    """Serve `catalogue` in pages of `PER_PAGE`, noting the pages asked for."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["index"])
+        requested.append(page)
+        return _page(catalogue[(page - 1) * PER_PAGE : page * PER_PAGE])
+
+    return handler
+
+
+def test_sequential_fetch_is_rate_limited(
+    cms: Callable[[Handler], None], sleeps: list[float]
+) -> None:
+    """`rate_limit` spaces out the requests of a one-by-one fetch too."""
+    catalogue = [_record(i) for i in range(2 * PER_PAGE)]
+    requested: list[int] = []
+    cms(_catalogue_handler(catalogue, requested))
+
+    items = asyncio.run(fetch_all(50, PER_PAGE, 1, rate_limit=10))
+
+    assert items == catalogue
+    assert requested == [1, 2, 3]
+    # The first request goes out at once, the others wait for their slot;
+    # waits are not slept, so the slots pile up 0.1s apart
+    assert sleeps == pytest.approx([0.1, 0.2], abs=0.05)
+
+
+def test_incremental_fetch_stops_at_the_watermark(
+    cms: Callable[[Handler], None], sleeps: list[float]
+) -> None:
+    """Windows of pages are fetched at once, rate limited, up to the watermark."""
+    newest = datetime(2025, 1, 1, tzinfo=UTC)
+    catalogue = [
+        {"product": {"id": f"p{i}", "metadata": {"laatsteWijzigingsdatum": d}}}
+        for i, d in enumerate(
+            (newest - timedelta(days=i)).isoformat() for i in range(6 * PER_PAGE)
+        )
+    ]
+    requested: list[int] = []
+    cms(_catalogue_handler(catalogue, requested))
+    watermark = newest - timedelta(days=12)
+
+    changed, reached = asyncio.run(
+        fetch_changed_since(watermark, 50, PER_PAGE, 1, concurrency=2, rate_limit=10)
+    )
+
+    assert changed == catalogue[:12]
+    assert reached
+    # Page 3 holds the watermark; page 4 came in the same window
+    assert sorted(requested) == [1, 2, 3, 4]
+    assert sleeps
@@ -0,0 +1,158 @@
+"""The native engine ranks like the Painless script, checked without a cluster.
+
+`native_query` is evaluated the way Elasticsearch evaluates `function_score`
+with `score_mode: first`: the weight of the first function whose filter
+matches. The script is transliterated statement by statement, with the
+doc-values semantics it runs on: a missing field and an empty array are the
+same, and a `terms` clause with no terms matches nothing.
+"""
+
+import random
+from typing import Any
+
+import pytest
+
+from dcs.lexicalsearch.personalization import (
+    PAINLESS_SOURCE,
+    native_query,
+    profile_params,
+    profile_score,
+)
+
+REGIOS = ["Leuven", "Gent", "Antwerpen", "Vlaams-Brabant", "Vlaanderen"]
+VORMEN = ["VZW", "Vereniging", "Feitelijke vereniging"]
+THEMAS = ["Cultuur, Sport en Vrije Tijd", "Economie en Werk", "Welzijn"]
+VERENIGINGEN = ["LIGHT MODELS AERO CLUB", "L.M.A.C.", "Joris Zwanzeleer"]
+# Document fields and the values they are drawn from
+FIELDS = {
+    "voorwaarden_regio": REGIOS,
+    "voorwaarden_vorm": VORMEN,
+    "themas": THEMAS,
+    "voorwaarden_vereniging": VERENIGINGEN,
+}
+
+
+def _values(doc: dict[str, Any], field: str) -> list[str]:
+    """Return the doc values of `field`; `.keyword` reads the same array."""
+    return doc.get(field.removesuffix(".keyword")) or []
+
+
+def _matches(clause: dict[str, Any], doc: dict[str, Any]) -> bool:
+    """Evaluate the filter clauses `native_query` uses against a flat doc."""
+    if "terms" in clause:
+        ((field, terms),) = clause["terms"].items()
+        return bool(set(terms).intersection(_values(doc, field)))
+    if "exists" in clause:
+        return bool(_values(doc, clause["exists"]["field"]))
+    query = clause["bool"]
+    should = query.get("should", [])
+    return all(_matches(c, doc) for c in query.get("filter", [])) and (
+        not should
+        or sum(_matches(c, doc) for c in should) >= query["minimum_should_match"]
+    )
+
+
+def native_score(doc: dict[str, Any], profile: dict[str, Any]) -> float:
+    """Score `doc` with the first matching function of `native_query`."""
+    function_score = native_query({"match_all": {}}, profile)["function_score"]
+    assert function_score["score_mode"] == "first"
+    assert function_score["boost_mode"] == "replace"
+    for function in function_score["functions"]:
+        if "filter" not in function or _matches(function["filter"], doc):
+            return float(function["weight"])
+    pytest.fail("no function matched")
+
+
+def painless_score(doc: dict[str, Any], params: dict[str, list[str]]) -> float:  # noqa: C901, PLR0911, PLR0912
+    """Run `PAINLESS_SOURCE`, transliterated, on `doc`."""
+    has_regio = has_vorm = has_thema = False
+    ad_nominatum_matched = ad_nominatum_other = False
+
+    vs = _values(doc, "voorwaarden_vereniging")
+    if vs:
+        if any(v in params["allowed_verenigingen"] for v in vs):
+            ad_nominatum_matched = True
+        else:
+            ad_nominatum_other = True
+
+    if ad_nominatum_other:
+        return 0.0
+    if ad_nominatum_matched:
+        return 100.0
+
+    if any(r in params["gemeentes"] for r in _values(doc, "voorwaarden_regio")):
+        has_regio = True
+    if any(v in params["vorm"] for v in _values(doc, "voorwaarden_vorm")):
+        has_vorm = True
+    if any(t in params["themas"] for t in _values(doc, "themas.keyword")):
+        has_thema = True
+
+    if has_regio and has_vorm and has_thema:
+        return 90.0
+    if has_regio and has_vorm:
+        return 80.0
+    if (has_regio and has_thema) or (has_vorm and has_thema):
+        return 70.0
+    if has_regio or has_vorm:
+        return 60.0
+    if has_thema:
+        return 20.0
+    return 10.0
+
+
+def _sample(rng: random.Random, values: list[str]) -> list[str] | None:
+    """Return a random subset of `values`; sometimes absent or empty."""
+    kind = rng.random()
+    if kind < 0.1:  # noqa: PLR2004
+        return None
+    return rng.sample(values, rng.randint(0, min(2, len(values))))
+
+
+def random_doc(rng: random.Random) -> dict[str, Any]:
+    """Build a flat document with random voorwaarden."""
+    doc = {field: _sample(rng, values) for field, values in FIELDS.items()}
+    # Most products are not ad nominatum
+    if rng.random() < 0.7:  # noqa: PLR2004
+        doc["voorwaarden_vereniging"] = None
+    return {k: v for k, v in doc.items() if v is not None}
+
+
+def random_profile(rng: random.Random) -> dict[str, Any]:
+    """Build a random vereniging profile."""
+    namen = _sample(rng, VERENIGINGEN) or []
+    return {
+        "werkingsgebieden": _sample(rng, REGIOS) or [],
+        "type_vereniging": _sample(rng, VORMEN) or [],
+        "hoofdactiviteiten": _sample(rng, THEMAS) or [],
+        "namen": dict(zip(("nl", "fr"), namen, strict=False)),
+    }
+
+
+def test_transliteration_covers_every_score() -> None:
+    """Every score the transliteration returns is one of the script's."""
+    scores = {"0.0", "100.0", "90.0", "80.0", "70.0", "60.0", "20.0", "10.0"}
+    assert all(f"return {score};" in PAINLESS_SOURCE for score in scores)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_native_query_scores_like_painless(seed: int) -> None:
+    """On random doc/profile pairs all three scorers agree."""
+    rng = random.Random(seed)  # noqa: S311
+    for _ in range(50):
+        profile = random_profile(rng)
+        params = profile_params(profile)
+        for _ in range(100):
+            doc = random_doc(rng)
+            expected = painless_score(doc, params)
+            assert native_score(doc, profile) == expected, (doc, profile)
+            assert profile_score(doc, params) == expected, (doc, profile)
+
+
+def test_every_tier_is_exercised() -> None:
+    """The random pairs reach every branch of the scoring matrix."""
+    rng = random.Random(0)  # noqa: S311
+    seen = set()
+    for _ in range(2000):
+        profile = random_profile(rng)
+        seen.add(painless_score(random_doc(rng), profile_params(profile)))
+    assert seen == {0.0, 100.0, 90.0, 80.0, 70.0, 60.0, 20.0, 10.0}
@@ -0,0 +1,144 @@
+"""A reindex that fails before the alias swap leaves no generation behind."""
+
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from dcs.lexicalsearch import reindex as reindex_module
+from dcs.lexicalsearch.bulk import BulkReport
+from dcs.lexicalsearch.reindex import TooManyFailuresError, reindex
+
+ALIAS = "diensten"
+OLD = f"{ALIAS}-20250101000000"
+FILE = Path("products.ndjson")
+
+
+class FakeIndices:
+    """The index APIs a reindex calls, keeping the indices in a set."""
+
+    def __init__(self, fail_on: str | None) -> None:
+        """Start with no indices; `fail_on` names the call that raises."""
+        self.fail_on = fail_on
+        self.names: set[str] = set()
+        self.aliases: dict[str, str] = {}
+
+    def _call(self, name: str) -> None:
+        if name == self.fail_on:
+            raise RuntimeError(name)
+
+    def exists(self, index: str) -> bool:
+        """Whether `index` is a concrete index."""
+        return index in self.names
+
+    def exists_alias(self, name: str) -> bool:
+        """Whether the alias `name` exists."""
+        return name in self.aliases
+
+    def get_alias(self, name: str) -> Any:  # noqa: ANN401
+        """Return the index behind the alias `name`."""
+        return type("Response", (), {"body": {self.aliases[name]: {}}})
+
+    def get(self, **_: Any) -> Any:  # noqa: ANN401
+        """List every index."""
+        return type("Response", (), {"body": dict.fromkeys(self.names)})
+
+    def delete(self, index: str, **_: Any) -> None:  # noqa: ANN401
+        """Delete an index."""
+        self.names.discard(index)
+
+    def put_settings(self, **_: Any) -> None:  # noqa: ANN401
+        """Restore the settings."""
+        self._call("put_settings")
+
+    def refresh(self, **_: Any) -> None:  # noqa: ANN401
+        """Refresh."""
+        self._call("refresh")
+
+    def forcemerge(self, **_: Any) -> None:  # noqa: ANN401
+        """Force-merge."""
+        self._call("forcemerge")
+
+    def update_aliases(self, actions: list[dict[str, Any]]) -> None:
+        """Point the alias at the index of the last action."""
+        self._call("update_aliases")
+        add = actions[-1]["add"]
+        self.aliases[add["alias"]] = add["index"]
+
+
+class FakeClient:
+    """An Elasticsearch client with only the index APIs."""
+
+    def __init__(self, fail_on: str | None) -> None:
+        """Start with no indices."""
+        self.indices = FakeIndices(fail_on)
+
+    def options(self, **_: Any) -> "FakeClient":  # noqa: ANN401
+        """Return the same client."""
+        return self
+
+
+@pytest.fixture
+def es(monkeypatch: pytest.MonkeyPatch) -> Callable[..., FakeClient]:
+    """Return a factory of fake clients that already serve one generation."""
+
+    def install(fail_on: str | None = None, failed: int = 0) -> FakeClient:
+        client = FakeClient(fail_on)
+        client.indices.names.add(OLD)
+        client.indices.aliases[ALIAS] = OLD
+
+        def create_index(client: FakeClient, index_name: str, **_: Any) -> None:  # noqa: ANN401
+            client.indices.names.add(index_name)
+
+        def index_file(*_: Any) -> BulkReport:  # noqa: ANN401
+            if fail_on == "index_file":
+                raise RuntimeError(fail_on)
+            return BulkReport(failed=[{"id": str(i)} for i in range(failed)])
+
+        monkeypatch.setattr(reindex_module, "get_client", lambda: client)
+        monkeypatch.setattr(reindex_module, "create_index", create_index)
+        monkeypatch.setattr(reindex_module, "index_file", index_file)
+        return client
+
+    return install
+
+
+@pytest.mark.parametrize(
+    "fail_on", ["index_file", "put_settings", "forcemerge", "update_aliases"]
+)
+def test_failed_reindex_drops_the_new_generation(
+    es: Callable[..., FakeClient], fail_on: str
+) -> None:
+    """The half-built generation is deleted and the alias is unchanged."""
+    client = es(fail_on)
+
+    with pytest.raises(RuntimeError, match=fail_on):
+        reindex(ALIAS, FILE)
+
+    assert client.indices.names == {OLD}
+    assert client.indices.aliases == {ALIAS: OLD}
+
+
+def test_too_many_failures_drops_the_new_generation(
+    es: Callable[..., FakeClient],
+) -> None:
+    """Failed documents over the limit also drop the new generation."""
+    client = es(failed=1)
+
+    with pytest.raises(TooManyFailuresError):
+        reindex(ALIAS, FILE)
+
+    assert client.indices.names == {OLD}
+
+
+def test_successful_reindex_keeps_the_new_generation(
+    es: Callable[..., FakeClient],
+) -> None:
+    """After the swap the new generation is live and the old one is kept."""
+    client = es()
+
+    new = reindex(ALIAS, FILE)
+
+    assert client.indices.aliases == {ALIAS: new}
+    assert client.indices.names == {OLD, new}
@@ -0,0 +1,23 @@
+"""Cold start of the CLI commands and the API stays within its budget.
+
+Every probe starts a fresh interpreter under `python -X importtime`, as
+`dcs bench startup` does. On a slow machine the budgets can be scaled with
+`DCS_STARTUP_SCALE`, like the `--scale` option of that command.
+"""
+
+import os
+
+import pytest
+
+from dcs.bench.startup import PROBES, Probe, run_probe
+
+SCALE = float(os.getenv("DCS_STARTUP_SCALE", "1.0"))
+
+
+@pytest.mark.parametrize("probe", PROBES, ids=lambda probe: probe.name)
+def test_startup_within_budget(probe: Probe) -> None:
+    """The median import time is within budget and no heavy module is loaded."""
+    row = run_probe(probe, runs=3)
+
+    assert row["forbidden"] == "", f"{probe.name} imports {row['forbidden']}"
+    assert row["import_ms"] <= probe.budget_ms * SCALE, row